@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from lexer import lexer
+from parse import Parser
+from expression import parse_expression
+from node import *
+from tokens import *
+from const import *
+
+# Đo thời gian parse biểu thức lồng sâu với Pratt parser (expression.parse_expression)
+# so với build_expression_tree cũ, vốn copy token trong ngoặc của mỗi lời gọi hàm
+# ra list con rồi gọi đệ quy. Thời gian / token của Pratt parser phải gần như
+# không đổi khi độ sâu tăng (tuyến tính), của bản cũ tăng theo độ sâu.
+#
+#   python benchmarks/compiler/expression_bench.py
+
+# Cây sâu cần nhiều tầng đệ quy
+sys.setrecursionlimit(100000)
+
+# === PARSER CŨ (tham chiếu) ===
+
+def reference_precedence(op):
+    if op.operator in (Operators.multiply, Operators.divide):
+        return 2
+    if op.operator in (Operators.add, Operators.subtract):
+        return 1
+    return 0
+
+def reference_build_expression_tree(tokens):
+    node_stack = []
+    op_stack = []
+    
+    expecting_operand = True 
+
+    i = 0
+    size = len(tokens)
+
+    while i < size:
+        tk = tokens[i]
+
+        if tk.type == TokType.number:
+            node_stack.append(num_from_token(tk))
+            expecting_operand = False 
+        
+        elif tk.type == TokType.string:
+            node_stack.append(Str(tk.string_value, tk.line))
+            expecting_operand = False
+
+        elif tk.type == TokType.identifier:
+            if i + 1 < size and tokens[i+1].type == TokType.operator and tokens[i+1].operator == Operators.left_paren:
+                # Bắt đầu parse hàm gọi
+                fn_call_node = Call(tk.func, [], tk.line) # Tên hàm
+                
+                i += 2 # Bỏ qua ID và '('
+                
+                paren_count = 1
+                inner_tokens = []
+                while i < size and paren_count > 0:
+                    t = tokens[i]
+                    if t.type == TokType.operator and t.operator == Operators.left_paren: paren_count += 1
+                    if t.type == TokType.operator and t.operator == Operators.right_paren: paren_count -= 1
+                    
+                    if paren_count > 0:
+                        if t.kw == Keyword.comma_tok:
+                            if inner_tokens:
+                                fn_call_node.args.extend(reference_build_expression_tree(inner_tokens))
+                            inner_tokens = []
+                        else:
+                            inner_tokens.append(t)
+                        i += 1
+                
+                if inner_tokens:
+                    fn_call_node.args.extend(reference_build_expression_tree(inner_tokens))
+                
+                node_stack.append(fn_call_node)
+                expecting_operand = False
+                # i bây giờ đang ở vị trí dấu ')', vòng lặp chính sẽ i += 1 tiếp
+            else:
+                node_stack.append(Var(tk.func, tk.line))
+                expecting_operand = False
+
+        elif tk.type == TokType.operator and tk.operator == Operators.left_paren:
+            op_stack.append(tk)
+            expecting_operand = True 
+
+        elif tk.type == TokType.operator and tk.operator == Operators.right_paren:
+            while op_stack and not (op_stack[-1].type == TokType.operator and op_stack[-1].operator == Operators.left_paren):
+                reference_apply_operator(node_stack, op_stack)
+            if op_stack:
+                op_stack.pop()
+            expecting_operand = False 
+
+        elif tk.type == TokType.operator:
+            if tk.operator == Operators.subtract and expecting_operand:
+                node_stack.append(Num(0))
+            
+            while (op_stack and 
+                   op_stack[-1].type == TokType.operator and 
+                   reference_precedence(op_stack[-1]) >= reference_precedence(tk)):
+                reference_apply_operator(node_stack, op_stack)
+            
+            op_stack.append(tk)
+            expecting_operand = True
+            
+        i += 1
+
+    while op_stack:
+        reference_apply_operator(node_stack, op_stack)
+
+    return node_stack
+
+def reference_apply_operator(node_stack, op_stack):
+    if len(node_stack) < 2: return
+    op = op_stack.pop()
+    right = node_stack.pop()
+    left = node_stack.pop()
+
+    node_stack.append(BinOp(op.operator, left, right, op.line))
+
+
+# === BENCHMARK ===
+
+def nested_calls(depth):
+    # fib(n - 1 + fib(n - 1 + ... fib(n) ...))
+    return "fib(n - 1 + " * depth + "fib(n)" + ")" * depth
+
+def nested_parens(depth):
+    return "(" * depth + "1" + " + 2) * 3" * depth
+
+def flat_chain(length):
+    return " + ".join(f"a{i} * {i} - b ^ 2" for i in range(length))
+
+cases = [
+    ("nested calls", nested_calls, [25, 50, 100, 200, 400]),
+    ("nested parens", nested_parens, [50, 100, 200, 400, 800]),
+    ("flat chain", flat_chain, [250, 500, 1000, 2000, 4000]),
+]
+
+def time_pratt(tokens, repeat):
+    best = None
+    for _ in range(repeat):
+        parser = Parser(tokens)
+        start = time.perf_counter()
+        parse_expression(parser)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_reference(tokens, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reference_build_expression_tree(tokens)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    print(f"{'case':<14} {'size':>6} {'tokens':>7} {'pratt ns/tok':>13} {'ref ns/tok':>11}")
+    for name, make, sizes in cases:
+        for size in sizes:
+            tokens = [t for t in lexer(make(size) + "\n") if t.type != TokType.end_line]
+            pratt = time_pratt(tokens, 5) / len(tokens) * 1e9
+            ref = time_reference(tokens, 3) / len(tokens) * 1e9
+            print(f"{name:<14} {size:>6} {len(tokens):>7} {pratt:>13.0f} {ref:>11.0f}")
+
+if __name__ == "__main__":
+    main()
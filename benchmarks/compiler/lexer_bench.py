@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from lexer import lexer, data_types
+from tokens import *
+from const import *
+
+# Đo throughput (tokens/sec) của lexer mới so với lexer cũ (duyệt từng ký tự),
+# đồng thời kiểm tra hai lexer cho ra cùng một chuỗi token.
+#
+#   python benchmarks/compiler/lexer_bench.py [số_dòng]
+
+# === LEXER CŨ (tham chiếu) ===
+
+class RefToken:
+    """Token của lexer cũ: giữ bản copy của chuỗi"""
+    __slots__ = ("type", "text", "operator")
+
+    def __init__(self, type, text=None, operator=None):
+        self.type = type
+        self.text = text
+        self.operator = operator
+
+def add_identifier(tokens:list[RefToken], id_type: str):
+    if id_type in data_types:
+        new_tok  = RefToken(TokType.Type, id_type)
+        tokens.append(new_tok)
+    else:
+        new_tok  = RefToken(TokType.identifier, id_type)
+        tokens.append(new_tok)
+    return tokens
+
+def add_number(tokens:list[RefToken], value: str):
+    new_tok  = RefToken(TokType.number, value)
+    tokens.append(new_tok)
+    return tokens
+
+def add_operator(tokens:list[RefToken], op: str):
+    new_tok  = RefToken(TokType.operator, None, operators_[op])
+    tokens.append(new_tok)
+    return tokens
+
+def reference_lexer(code:str):
+    tokens:list[RefToken] = []
+    tok = ""
+
+    state = TokType.identifier
+    curr_char = ""
+
+    pre_tok = ""
+    is_command = False
+
+    for c in code:
+        curr_char = c
+        if state == TokType.string:
+            if (c == "\""):
+                new_tok = RefToken(TokType.string, tok)
+                tokens.append(new_tok)
+                state = TokType.identifier
+                tok = ""
+                curr_char = ""
+        elif is_command == True:
+            if c == "\n":
+                curr_char = ""
+                tok = ""
+                is_command = False
+        else:
+            if (c == "\""):
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                curr_char = ""
+                tok = ""
+                state = TokType.string
+            if (c == ","):
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                curr_char = ""
+                tok = ""
+                new_tok = RefToken(TokType.identifier, ",")
+                tokens.append(new_tok)
+
+                state = TokType.identifier
+            if (c == "#"):
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                tok = ""
+                state = TokType.identifier
+            if c == "(":
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                curr_char = ""
+                tok = ""
+
+                new_tok = RefToken(TokType.operator, None, Operators.left_paren)
+                tokens.append(new_tok)
+                state = TokType.identifier
+            if c == ")":
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                curr_char = ""
+                tok = ""
+
+                new_tok = RefToken(TokType.operator, None, Operators.right_paren)
+                tokens.append(new_tok)
+                state = TokType.identifier
+            if (c == "\n" or c == " "):
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+                
+                if c == "\n":
+                    tokens.append(RefToken(TokType.end_line))
+                tok = ""
+                curr_char = ""
+                state = TokType.identifier
+            elif (
+                    c == "+" or c == "-" or c == "*" or \
+                    c == "/" or c == "=" or c == "<" or \
+                    c == ">" or c == "%" or c == "^"
+                ):
+                if tok != "":
+                    if state == TokType.identifier:
+                        tokens = add_identifier(tokens,tok)
+                    elif state == TokType.number:
+                        tokens = add_number(tokens,tok)
+
+                if c == "=" and pre_tok == "=":
+                    tokens.pop(-1)
+
+                    same_tok = RefToken(TokType.operator, None, Operators.same)
+
+                    tokens.append(same_tok)
+                elif c == "=" and pre_tok == "<":
+                    tokens.pop(-1)
+
+                    same_tok = RefToken(TokType.operator, None, Operators.less_same)
+
+                    tokens.append(same_tok)
+                elif c == "=" and pre_tok == ">":
+                    tokens.pop(-1)
+
+                    same_tok = RefToken(TokType.operator, None, Operators.greater_same)
+
+                    tokens.append(same_tok)
+                else:
+                    tokens = add_operator(tokens, c)
+                
+                tok = ""
+                curr_char = ""
+                state = TokType.identifier
+
+            elif (
+                    c == "1" or c == "2" or c == "3" or \
+                    c == "4" or c == "5" or c == "6" or \
+                    c == "7" or c == "8" or c == "9" or \
+                    c == "0"
+                ) and tok == "":
+                state = TokType.number
+
+            elif c == "#" and tok == "":
+                is_command = True
+
+    
+        tok += curr_char
+
+        pre_tok = c
+    return tokens
+
+
+# === BENCHMARK ===
+
+def token_key(tok: Token):
+    if tok.type == TokType.string:
+        return (tok.type, tok.string_value, tok.operator)
+    if tok.type in (TokType.identifier, TokType.Type, TokType.number):
+        return (tok.type, tok.text, tok.operator)
+    return (tok.type, None, tok.operator)
+
+def reference_key(tok: RefToken):
+    return (tok.type, tok.text, tok.operator)
+
+def load_source(min_lines):
+    sources = []
+    for folder in ["18-jan-26-benchmarks", "first-benchmarks"]:
+        path = os.path.join(ROOT, "benchmarks", folder)
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".lae") or name.endswith(".txt"):
+                sources.append(open(os.path.join(path, name), "r").read() + "\n")
+    for name in sorted(os.listdir(os.path.join(ROOT, "example"))):
+        sources.append(open(os.path.join(ROOT, "example", name), "r").read() + "\n")
+
+    # Thêm các trường hợp đặc biệt: comment, chuỗi, so sánh ghép, tab
+    sources.append('# comment\nx = "a b, (c)" # cuối dòng\nif x <= 3 then y == 2 end\n\tz=1>=2\n')
+
+    code = "".join(sources)
+    lines = code.count("\n")
+    return code * max(1, min_lines // lines + 1)
+
+def bench(func, code, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = func(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+def main():
+    min_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    code = load_source(min_lines)
+
+    new_tokens, new_time = bench(lexer, code)
+    old_tokens, old_time = bench(reference_lexer, code)
+
+    same = [token_key(t) for t in new_tokens] == [reference_key(t) for t in old_tokens]
+
+    print(f"lines:      {code.count(chr(10))}")
+    print(f"tokens:     {len(new_tokens)}")
+    print(f"reference:  {len(old_tokens) / old_time:>12.0f} tokens/sec ({old_time:.4f}s)")
+    print(f"lexer:      {len(new_tokens) / new_time:>12.0f} tokens/sec ({new_time:.4f}s)")
+    print(f"speedup:    {old_time / new_time:.2f}x")
+    print(f"same stream: {same}")
+
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
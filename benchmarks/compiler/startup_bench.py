@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+MAIN = os.path.join(ROOT, "src", "main.py")
+SAMPLE = os.path.join(ROOT, "example", "function.txt")
+
+# Thời gian khởi động của laetus khi không sinh mã: -p / -help / -version phải
+# không import llvmlite và chỉ chậm hơn một process Python rỗng trong giới hạn
+# cho trước (mặc định 100 ms). Vượt giới hạn thì trả về 1 (dùng được trong CI).
+#
+#   python benchmarks/compiler/startup_bench.py [giới_hạn_ms] [số_lần]
+
+# Module không được xuất hiện trong -X importtime của các lệnh trên
+FORBIDDEN = ("llvmlite", "llvm_code_gen", "runtime", "cache", "lazy_jit")
+
+commands = {
+    "-p":       [MAIN, SAMPLE, "-p"],
+    "-help":    [MAIN, "-help"],
+    "-version": [MAIN, "-version"],
+}
+
+def wall_time(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def imported_modules(args):
+    """(tên module, thời gian tích lũy µs, có phải import top-level) theo -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Mỗi cấp import lồng thụt thêm 2 khoảng trắng
+        modules.append((name.strip(), int(cumulative), not name[1:].startswith(" ")))
+    return modules
+
+def main():
+    budget = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.100
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    python = wall_time(["-c", "pass"], runs)
+    print(f"python -c pass      {python * 1000:>7.1f} ms (median of {runs})")
+
+    failed = False
+    for name, args in commands.items():
+        elapsed = wall_time(args, runs)
+        overhead = elapsed - python
+        modules = imported_modules(args)
+        heavy = sorted({m for m, _, _ in modules if m.split(".")[0] in FORBIDDEN})
+        ok = overhead <= budget and not heavy
+        failed = failed or not ok
+        print(f"laetus {name:<12} {elapsed * 1000:>7.1f} ms (+{overhead * 1000:.1f} ms)  {'ok' if ok else 'FAIL'}")
+        if heavy:
+            print(f"    imports {', '.join(heavy)}")
+
+    # Module tốn thời gian nhất của -p, để biết nên cắt ở đâu khi vượt giới hạn
+    top = sorted((m for m in imported_modules(commands["-p"]) if m[2]), key=lambda m: m[1], reverse=True)[:8]
+    print("slowest top-level imports of -p:")
+    for name, cumulative, _ in top:
+        print(f"    {name:<20} {cumulative / 1000:>7.1f} ms")
+
+    print(f"budget:             +{budget * 1000:.0f} ms over python -c pass")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from llvmlite import ir
+from lexer import lexer
+from parse import parse
+from type_infer import infer_types
+from llvm_code_gen import emit_llvm, compile_object
+from linker import link
+
+# Đọc N số nguyên từ stdin và in tổng: bộ đọc của runtime (đọc stdin theo khối)
+# so với đường scanf("%lld") cho từng giá trị như codegen cũ.
+#
+#   python benchmarks/runtime/input_bench.py [N]      (mặc định 10 000 000)
+
+program = """
+input int n
+s = 0
+i = 0
+while i < n do
+    input int x
+    s = s + x
+    i = i + 1
+end
+println s
+"""
+
+# === ĐƯỜNG SCANF CŨ (tham chiếu) ===
+
+def reference_scanf_module():
+    """Cùng chương trình, mỗi giá trị một lần scanf như visit_input trước đây"""
+    i8_ptr = ir.IntType(8).as_pointer()
+    i64 = ir.IntType(64)
+    module = ir.Module(name="scanf_reference")
+
+    scanf = ir.Function(module, ir.FunctionType(ir.IntType(32), [i8_ptr], var_arg=True), name="scanf")
+    printf = ir.Function(module, ir.FunctionType(ir.IntType(32), [i8_ptr], var_arg=True), name="printf")
+
+    def global_string(name, value):
+        data = bytearray((value + "\0").encode("utf-8"))
+        ty = ir.ArrayType(ir.IntType(8), len(data))
+        var = ir.GlobalVariable(module, ty, name=name)
+        var.linkage = "internal"
+        var.global_constant = True
+        var.initializer = ir.Constant(ty, data)
+        return var.bitcast(i8_ptr)
+
+    scan_int = global_string("scan_int", "%lld")
+    fmt_int_nl = global_string("fmt_int_nl", "%lld\n")
+
+    main = ir.Function(module, ir.FunctionType(ir.IntType(32), []), name="main")
+    builder = ir.IRBuilder(main.append_basic_block("entry"))
+    n_ptr = builder.alloca(i64)
+    x_ptr = builder.alloca(i64)
+    builder.store(ir.Constant(i64, 0), n_ptr)
+    builder.call(scanf, [scan_int, n_ptr])
+    n = builder.load(n_ptr)
+
+    entry = builder.block
+    cond = main.append_basic_block("cond")
+    body = main.append_basic_block("body")
+    done = main.append_basic_block("done")
+    builder.branch(cond)
+
+    builder.position_at_end(cond)
+    i = builder.phi(i64)
+    s = builder.phi(i64)
+    i.add_incoming(ir.Constant(i64, 0), entry)
+    s.add_incoming(ir.Constant(i64, 0), entry)
+    builder.cbranch(builder.icmp_signed("<", i, n), body, done)
+
+    builder.position_at_end(body)
+    builder.call(scanf, [scan_int, x_ptr])
+    i.add_incoming(builder.add(i, ir.Constant(i64, 1)), body)
+    s.add_incoming(builder.add(s, builder.load(x_ptr)), body)
+    builder.branch(cond)
+
+    builder.position_at_end(done)
+    builder.call(printf, [fmt_int_nl, s])
+    builder.ret(ir.Constant(ir.IntType(32), 0))
+    return module
+
+# === BENCH ===
+
+def build(module, exe_path):
+    object_path = exe_path + ".o"
+    with open(object_path, "wb") as f:
+        f.write(compile_object(module))
+    link(object_path, exe_path)
+    os.remove(object_path)
+
+def make_input(path, count):
+    rng = random.Random(12345)
+    total = 0
+    with open(path, "w") as f:
+        f.write(f"{count}\n")
+        chunk = []
+        for _ in range(count):
+            value = rng.randint(-10**9, 10**9)
+            total += value
+            chunk.append(str(value))
+            if len(chunk) == 100000:
+                f.write("\n".join(chunk) + "\n")
+                chunk = []
+        if chunk:
+            f.write("\n".join(chunk) + "\n")
+    return total
+
+def run(exe_path, input_path, repeat=3):
+    best = None
+    output = None
+    for _ in range(repeat):
+        with open(input_path, "rb") as stdin:
+            start = time.perf_counter()
+            output = subprocess.run([exe_path], stdin=stdin, capture_output=True, check=True).stdout
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return output.decode().strip(), best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    with tempfile.TemporaryDirectory(prefix="laetus_input_bench_") as tmp:
+        input_path = os.path.join(tmp, "numbers.txt")
+        expected = make_input(input_path, count)
+        size_mb = os.path.getsize(input_path) / (1024 * 1024)
+
+        ast = parse(lexer(program + "\n"))
+        runtime_exe = os.path.join(tmp, "runtime_reader.exe")
+        build(emit_llvm(ast, infer_types(ast)), runtime_exe)
+
+        scanf_exe = os.path.join(tmp, "scanf_reader.exe")
+        build(reference_scanf_module(), scanf_exe)
+
+        runtime_out, runtime_time = run(runtime_exe, input_path)
+        scanf_out, scanf_time = run(scanf_exe, input_path)
+
+    same = runtime_out == scanf_out == str(expected)
+
+    print(f"integers:   {count} ({size_mb:.1f} MiB)")
+    print(f"scanf:      {count / scanf_time / 1e6:>8.2f} M ints/sec ({scanf_time:.3f}s)")
+    print(f"runtime:    {count / runtime_time / 1e6:>8.2f} M ints/sec ({runtime_time:.3f}s)")
+    print(f"speedup:    {scanf_time / runtime_time:.2f}x")
+    print(f"same sum:   {same}")
+
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
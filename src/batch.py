@@ -0,0 +1,257 @@
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import subprocess
+import tempfile
+import time
+import sys
+import io
+import os
+from lexer import lexer
+from parse import parse
+from type_infer import infer_types
+from simplify import simplify
+from llvm_code_gen import emit_llvm, compile_object, create_target_machine
+from cache import open_cache, cache_key
+from optimize import OptOptions
+from memo import MemoOptions, check_memo
+from check import check_functions
+from linker import link
+
+# === BATCH BUILD (laetus build a.lae b.lae ... -j N) ===
+# Biên dịch nhiều file trong một lần gọi. Mỗi worker của pool (process) khởi
+# tạo LLVM, target machine và compile cache một lần rồi dùng lại cho mọi file
+# nó nhận; worker được fork từ process đã import llvmlite nên khởi động nhanh.
+#
+#   -j <n>          số worker (mặc định: số core)
+#   -o <dir>        thư mục đặt output (mặc định cạnh file source)
+#   -c / -s         object (.o) / assembly (.s) thay vì exe (.exe)
+#
+# Các flag tối ưu / memo / -line-buffered / -arena / -profile / -no-cache giống khi biên
+# dịch một file và áp dụng cho mọi file. Cuối cùng in bảng thời gian của từng
+# file (front end, LLVM, link); có file lỗi thì trả về 1.
+#
+# -pgo-gen / -pgo-use bị từ chối: profile gắn với một chương trình, hãy biên
+# dịch từng file bằng laetus <file>.
+
+output_suffixes = {"exe": ".exe", "object": ".o", "assembly": ".s"}
+
+
+class BuildSettings:
+    def __init__(self, flags, opt_options: OptOptions, memo_options: MemoOptions):
+        self.opt = opt_options
+        self.memo = memo_options
+        self.line_buffered = "-line-buffered" in flags
+        self.arena = "-arena" in flags
+        self.use_cache = "-no-cache" not in flags
+        self.profile = "-profile" in flags
+        if "-s" in flags: self.kind = "assembly"
+        elif "-c" in flags: self.kind = "object"
+        else: self.kind = "exe"
+
+
+class BuildResult:
+    def __init__(self, source, output):
+        self.source = source
+        self.output = output
+        self.error = None
+        self.cached = False
+        # Thời gian (giây) của từng bước
+        self.front = 0.0
+        self.codegen = 0.0
+        self.link = 0.0
+        self.total = 0.0
+
+
+# ================= WORKER =================
+
+# (BuildSettings, target machine, CompileCache hoặc None) của process worker
+worker = None
+
+def init_worker(settings: BuildSettings):
+    global worker
+    cache = open_cache() if settings.use_cache else None
+    worker = (settings, create_target_machine(settings.opt.level), cache)
+
+def build_file(source, output):
+    settings, target_machine, cache = worker
+    result = BuildResult(source, output)
+    start = time.perf_counter()
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            build_steps(result, settings, target_machine, cache)
+    except FileNotFoundError:
+        result.error = "File not found"
+    except RuntimeError as e:
+        result.error = f"LLVM Error: {e}"
+    except (OSError, subprocess.CalledProcessError) as e:
+        result.error = f"Link failed: {e}"
+    except Exception as e:
+        # Một file hỏng không được làm dừng cả batch
+        result.error = f"{type(e).__name__}: {e}"
+    result.total = time.perf_counter() - start
+    # Lỗi codegen được in ra stdout (ví dụ gọi hàm chưa định nghĩa)
+    if result.error is None and messages.getvalue().strip():
+        result.error = messages.getvalue().strip().splitlines()[0]
+    return result
+
+def build_steps(result: BuildResult, settings: BuildSettings, target_machine, cache):
+    with open(result.source, "r") as f:
+        file_content = f.read() + "\n"
+
+    output = compile_source(file_content, result, settings, target_machine, cache)
+    if output is None: return
+    step = time.perf_counter()
+
+    if settings.kind == "assembly":
+        with open(result.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    elif settings.kind == "object":
+        with open(result.output, "wb") as f:
+            f.write(output)
+    else:
+        fd, object_file = tempfile.mkstemp(suffix=".o", prefix="laetus_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(output)
+            link(object_file, result.output)
+        finally:
+            os.remove(object_file)
+    result.link = time.perf_counter() - step
+
+def compile_source(file_content, result: BuildResult, settings: BuildSettings, target_machine, cache):
+    """Object (bytes), hoặc assembly (str) nếu settings.kind là "assembly".
+    None nếu source có lỗi (result.error). Ghi thời gian các bước vào result"""
+    step = time.perf_counter()
+    key = None
+    if cache is not None and settings.kind != "assembly":
+        parts = [settings.opt.key(), settings.memo.key(), str(settings.line_buffered)]
+        if settings.profile: parts.append("profile")
+        key = cache_key(file_content, parts, "obj")
+        object_data = cache.get(key)
+        if object_data is not None:
+            result.cached = True
+            return object_data
+
+    ast = parse(lexer(file_content), arena=settings.arena)
+    errors = check_functions(ast) or check_memo(ast)
+    if errors:
+        result.error = errors[0]
+        return None
+    if settings.opt.is_on("fold", settings.opt.level > 0 or settings.opt.size_level > 0):
+        ast = simplify(ast)
+    module = emit_llvm(ast, infer_types(ast), settings.line_buffered, settings.memo, settings.profile)
+    now = time.perf_counter()
+    result.front = now - step
+    step = now
+
+    if settings.kind == "assembly":
+        output = compile_object(module, settings.opt, assembly=True, target_machine=target_machine)
+    else:
+        output = compile_object(module, settings.opt, target_machine=target_machine)
+        if key is not None:
+            cache.put(key, output)
+    result.codegen = time.perf_counter() - step
+    return output
+
+
+# ================= DRIVER =================
+
+# Flag chỉ dùng được khi biên dịch một file (laetus <file>), build và serve từ chối
+single_file_flags = ["-pgo-gen", "-pgo-use"]
+
+def single_file_flag(flags):
+    """Lỗi nếu flags có flag chỉ dùng cho một file, không thì None"""
+    for flag in single_file_flags:
+        if any(f == flag or f.startswith(flag + "=") for f in flags):
+            return f"{flag} is not supported here, compile the file with: laetus <file> {flag}"
+    return None
+
+def output_path(source, kind, directory=None):
+    name = os.path.splitext(source)[0] + output_suffixes[kind]
+    if directory is not None:
+        name = os.path.join(directory, os.path.basename(name))
+    return name
+
+def parse_build_args(args):
+    """Trả về (list source, flags, số worker, thư mục output, lỗi hoặc None)"""
+    sources = []
+    flags = {}
+    jobs = None
+    directory = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-j", "-o"):
+            if i + 1 >= len(args):
+                return sources, flags, jobs, directory, f"Missing value after {arg}"
+            value = args[i + 1]
+            i += 1
+            if arg == "-o":
+                directory = value
+            elif not value.isdigit() or int(value) < 1:
+                return sources, flags, jobs, directory, f"Invalid number of jobs '{value}'"
+            else:
+                jobs = int(value)
+        elif arg.startswith("-j") and arg[2:].isdigit() and int(arg[2:]) >= 1:
+            jobs = int(arg[2:])
+        elif arg.startswith("-"):
+            flags[arg] = {}
+        else:
+            sources.append(arg)
+        i += 1
+    error = single_file_flag(flags)
+    if error:
+        return sources, flags, jobs, directory, error
+    if not sources:
+        return sources, flags, jobs, directory, "No input file."
+    return sources, flags, jobs, directory, None
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+def print_summary(results, wall):
+    width = max(len("file"), max(len(r.source) for r in results))
+    print(f"{'file':<{width}}  {'front':>9}  {'llvm':>9}  {'link':>9}  {'total':>9}  status")
+    for r in results:
+        status = f"error: {r.error}" if r.error else "cached" if r.cached else "ok"
+        print(f"{r.source:<{width}}  {format_seconds(r.front):>9}  {format_seconds(r.codegen):>9}  "
+              f"{format_seconds(r.link):>9}  {format_seconds(r.total):>9}  {status}")
+    failed = sum(1 for r in results if r.error)
+    busy = sum(r.total for r in results)
+    print(f"{len(results)} files, {failed} failed, {format_seconds(wall)} wall ({format_seconds(busy)} in workers)")
+
+def run_build(args):
+    sources, flags, jobs, directory, error = parse_build_args(args)
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    opt_options, error = OptOptions.from_flags(flags)
+    if error:
+        print("ERROR:", error)
+        return 1
+    memo_options, error = MemoOptions.from_flags(flags)
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    settings = BuildSettings(flags, opt_options, memo_options)
+    outputs = [output_path(source, settings.kind, directory) for source in sources]
+    seen = {}
+    for source, output in zip(sources, outputs):
+        if output in seen:
+            print("ERROR:", f"'{source}' and '{seen[output]}' both write '{output}'")
+            return 1
+        seen[output] = source
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    jobs = min(jobs or os.cpu_count() or 1, len(sources))
+    # Worker được fork: buffer stdout chưa ghi sẽ bị in lại bởi mỗi worker
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(settings,)) as pool:
+        results = list(pool.map(build_file, sources, outputs))
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(r.error for r in results) else 0
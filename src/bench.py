@@ -0,0 +1,471 @@
+import statistics
+import subprocess
+import threading
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+from const import VERSION
+
+# === RUNTIME BENCHMARKS (laetus bench) ===
+# Tìm các bộ <tên>.lae / <tên>.py / <tên>.cpp trong thư mục benchmark (mặc định
+# benchmarks/18-jan-26-benchmarks), chạy mỗi chương trình theo từng mode:
+#
+#   jit     laetus <tên>.lae -jit -no-cache     (wall gồm cả thời gian biên dịch;
+#                                               compile đo riêng bằng -c)
+#   exe     laetus <tên>.lae -o <tên>.exe, rồi chạy exe
+#   py      python <tên>.py
+#   cpp     c++ -O2 <tên>.cpp, rồi chạy exe
+#
+# Mỗi bước được chạy <warmup> lần bỏ qua rồi <runs> lần đo; báo cáo median và
+# độ lệch (stdev, min / max) của wall time, compile time và peak RSS. Output
+# của mọi mode phải giống nhau (bỏ các dòng "Time: ..." các bản .py tự in).
+#
+#   -runs <n> / -warmup <n>     số lần đo / làm nóng (mặc định 5 / 1)
+#   -modes=<m1,m2,...>          mode cần chạy (mặc định: tất cả)
+#   -json <file> / -tsv <file>  ghi kết quả
+#   -baseline <file>            so với kết quả JSON đã lưu: mode jit / exe chậm
+#                               hơn quá -tolerance=<pct> (mặc định 10%) thì lỗi
+#   -save-baseline              ghi kết quả lần này vào file baseline
+#   -timeout=<s>                giới hạn mỗi lần chạy (mặc định 300)
+#
+# Các flag khác (-O3, -fno-gvn, ...) được truyền cho laetus. Trả về 1 nếu có
+# lỗi, output khác nhau hoặc chậm hơn baseline.
+
+modes = ["jit", "exe", "py", "cpp"]
+laetus_modes = ["jit", "exe"]
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+                                 "benchmarks", "18-jan-26-benchmarks")
+DEFAULT_TOLERANCE = 10.0
+# Chênh lệch dưới mức này (giây) được coi là nhiễu, không tính là chậm đi
+NOISE_FLOOR = 0.02
+
+
+class BenchSettings:
+    def __init__(self):
+        self.runs = 5
+        self.warmup = 1
+        self.modes = list(modes)
+        self.flags = []
+        self.json_file = None
+        self.tsv_file = None
+        self.baseline = None
+        self.save_baseline = False
+        self.tolerance = DEFAULT_TOLERANCE
+        self.timeout = 300.0
+
+
+class Sample:
+    """Kết quả một lần chạy process"""
+    def __init__(self, seconds, rss_kb, returncode, stdout, stderr):
+        self.seconds = seconds
+        self.rss_kb = rss_kb
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def compiler_command():
+    # Bản đóng gói (PyInstaller) tự là compiler
+    if getattr(sys, "frozen", False):
+        return [sys.executable]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.realpath(__file__)), "main.py")]
+
+def cpp_compiler():
+    return shutil.which("clang++") or shutil.which("g++") or shutil.which("c++")
+
+# === LAUNCHER ===
+# Linux giữ peak RSS qua fork + exec: process con tính cả bộ nhớ của process đã
+# fork ra nó. Harness lớn dần trong lúc chạy, nên process được đo không được
+# fork từ harness mà từ một launcher nhỏ (python -S chỉ import os / sys / json /
+# time / signal) chạy suốt lần bench: harness gửi mỗi lệnh qua stdin của
+# launcher (một dòng JSON), launcher fork + exec, chờ bằng os.wait4 và trả về
+# [giây, peak RSS, exit code]. Bộ nhớ của launcher không đổi, rss_floor() đo
+# một lần là đủ.
+LAUNCHER = r'''
+import json, os, signal, sys, time
+child = 0
+def on_alarm(signum, frame):
+    if child: os.kill(child, signal.SIGKILL)
+signal.signal(signal.SIGALRM, on_alarm)
+for line in sys.stdin:
+    request = json.loads(line)
+    start = time.perf_counter()
+    child = os.fork()
+    if child == 0:
+        try:
+            if request["cwd"]: os.chdir(request["cwd"])
+            os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+            os.dup2(os.open(request["stdout"], os.O_WRONLY), 1)
+            os.dup2(os.open(request["stderr"], os.O_WRONLY), 2)
+            os.execvp(request["command"][0], request["command"])
+        except OSError as e:
+            os.write(2, str(e).encode())
+        os._exit(127)
+    signal.setitimer(signal.ITIMER_REAL, request["timeout"])
+    _, status, usage = os.wait4(child, 0)
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    seconds = time.perf_counter() - start
+    child = 0
+    print(json.dumps([seconds, usage.ru_maxrss, os.waitstatus_to_exitcode(status)]), flush=True)
+'''
+
+launcher = None
+
+def start_launcher():
+    """Khởi động launcher nếu hệ điều hành có fork / wait4 (không có trên Windows)"""
+    global launcher
+    if not (hasattr(os, "fork") and hasattr(os, "wait4")) or getattr(sys, "frozen", False):
+        return
+    launcher = subprocess.Popen([sys.executable, "-S", "-c", LAUNCHER], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, text=True)
+
+def stop_launcher():
+    global launcher
+    if launcher is not None:
+        launcher.stdin.close()
+        launcher.wait()
+        launcher = None
+
+def measure(command, timeout, cwd=None):
+    """Chạy command (stdin rỗng), trả về Sample. Peak RSS lấy từ rusage của
+    riêng process đó (os.wait4 trong launcher), None nếu không có launcher"""
+    with tempfile.NamedTemporaryFile() as out, tempfile.NamedTemporaryFile() as err:
+        rss_kb = None
+        if launcher is not None:
+            request = {"command": command, "cwd": cwd, "stdout": out.name, "stderr": err.name, "timeout": timeout}
+            launcher.stdin.write(json.dumps(request) + "\n")
+            launcher.stdin.flush()
+            seconds, rss_kb, returncode = json.loads(launcher.stdout.readline())
+            # Linux: KB, macOS: byte
+            if sys.platform == "darwin": rss_kb //= 1024
+        else:
+            start = time.perf_counter()
+            proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=out, stderr=err, cwd=cwd)
+            timer = threading.Timer(timeout, proc.kill)
+            timer.start()
+            try:
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+            seconds = time.perf_counter() - start
+        out.seek(0)
+        err.seek(0)
+        stderr = err.read().decode("utf-8", "replace")
+        if seconds >= timeout:
+            stderr += f"\ntimed out after {timeout:g}s"
+        return Sample(seconds, rss_kb, returncode, out.read().decode("utf-8", "replace"), stderr)
+
+def rss_floor(settings: BenchSettings):
+    """Peak RSS (KB) của một process không làm gì được chạy qua launcher,
+    None nếu không đo được"""
+    command = [shutil.which("true")] if shutil.which("true") else [sys.executable, "-c", "pass"]
+    return measure(command, settings.timeout).rss_kb
+
+def normalize_output(text):
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    return "\n".join(line for line in lines if not line.startswith("Time:"))
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "median": statistics.median(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+        "min": min(values),
+        "max": max(values),
+        "samples": values,
+    }
+
+
+# ================= BENCHMARK =================
+
+def find_benchmarks(paths):
+    """{tên: {"lae": file, "py": file, "cpp": file}}, theo thứ tự tên"""
+    found = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(os.path.abspath(path), name) for name in sorted(os.listdir(path))]
+        else:
+            files = [os.path.abspath(path)]
+        for file in files:
+            base, ext = os.path.splitext(file)
+            if ext in (".lae", ".py", ".cpp"):
+                found.setdefault(os.path.basename(base), {})[ext[1:]] = file
+    # Chỉ giữ benchmark có bản .lae
+    return {name: files for name, files in sorted(found.items()) if "lae" in files}
+
+def build_commands(mode, files, directory, settings: BenchSettings):
+    """(command build hoặc None, command chạy), None nếu thiếu file của mode"""
+    source = files.get("py" if mode == "py" else "cpp" if mode == "cpp" else "lae")
+    if source is None:
+        return None
+    exe = os.path.join(directory, f"{mode}.exe")
+    if mode == "jit":
+        build = compiler_command() + [source, "-c", "-no-cache", "-o", os.path.join(directory, "jit.o")] + settings.flags
+        return build, compiler_command() + [source, "-jit", "-no-cache"] + settings.flags
+    if mode == "exe":
+        return compiler_command() + [source, "-no-cache", "-o", exe] + settings.flags, [exe]
+    if mode == "py":
+        return None, [sys.executable, source]
+    compiler = cpp_compiler()
+    if compiler is None:
+        return None
+    return [compiler, "-O2", source, "-o", exe], [exe]
+
+def repeat(command, settings: BenchSettings, directory):
+    """Chạy warmup + runs lần; trả về (các Sample được đo, lỗi hoặc None)"""
+    samples = []
+    for i in range(settings.warmup + settings.runs):
+        # -jit vẫn link a.exe vào thư mục hiện tại
+        sample = measure(command, settings.timeout, cwd=directory)
+        if sample.returncode != 0:
+            message = (sample.stderr.strip() or sample.stdout.strip()).splitlines()
+            return samples, f"exit code {sample.returncode}" + (f": {message[-1]}" if message else "")
+        if i >= settings.warmup:
+            samples.append(sample)
+    return samples, None
+
+def run_mode(mode, files, settings: BenchSettings):
+    """Kết quả của một mode: {"wall", "compile", "rss_kb", "output", "error"}"""
+    with tempfile.TemporaryDirectory(prefix="laetus_bench_") as directory:
+        commands = build_commands(mode, files, directory, settings)
+        if commands is None:
+            return None
+        build, run = commands
+        result = {"wall": None, "compile": None, "rss_kb": None, "output": None, "error": None}
+
+        if build is not None:
+            samples, error = repeat(build, settings, directory)
+            output = build[build.index("-o") + 1]
+            # Lỗi của source đã làm laetus trả về 1; phòng khi build thành công
+            # mà không ghi ra output
+            if error is None and not os.path.exists(output):
+                error = (samples[-1].stdout.strip().splitlines() or ["no output file"])[0]
+            if error:
+                result["error"] = f"build failed: {error}"
+                return result
+            result["compile"] = summarize([s.seconds for s in samples])
+
+        samples, error = repeat(run, settings, directory)
+        if error:
+            result["error"] = f"run failed: {error}"
+            return result
+        result["wall"] = summarize([s.seconds for s in samples])
+        result["rss_kb"] = summarize([s.rss_kb for s in samples])
+        result["output"] = normalize_output(samples[-1].stdout)
+        return result
+
+def run_benchmark(files, settings: BenchSettings):
+    results = {}
+    for mode in settings.modes:
+        result = run_mode(mode, files, settings)
+        if result is not None:
+            results[mode] = result
+    outputs = {r["output"] for r in results.values() if r["output"] is not None}
+    return {"modes": results, "outputs_match": len(outputs) <= 1}
+
+
+# ================= BASELINE =================
+
+def regressions(results, baseline, tolerance):
+    """List mô tả các mode jit / exe chậm hơn baseline quá tolerance (%)"""
+    found = []
+    for name, bench in results["benchmarks"].items():
+        old_bench = baseline.get("benchmarks", {}).get(name)
+        if old_bench is None: continue
+        for mode in laetus_modes:
+            new, old = bench["modes"].get(mode), old_bench["modes"].get(mode)
+            if not new or not old: continue
+            for metric in ("wall", "compile"):
+                if not new[metric] or not old[metric]: continue
+                now, before = new[metric]["median"], old[metric]["median"]
+                if now > before * (1 + tolerance / 100) and now - before > NOISE_FLOOR:
+                    found.append(f"{name} {mode} {metric}: {before:.3f}s -> {now:.3f}s "
+                                 f"(+{(now / before - 1) * 100:.1f}%)")
+    return found
+
+
+# ================= OUTPUT =================
+
+def short(output, width=30):
+    output = output.replace("\n", " ")
+    return output if len(output) <= width else output[:width - 3] + "..."
+
+def format_stats(stats, unit="s", floor=None):
+    if stats is None:
+        return "-"
+    if unit == "KB":
+        # Không phân biệt được với bộ nhớ sẵn có của launcher (xem LAUNCHER)
+        if floor is not None and stats["median"] <= floor * 1.05:
+            return f"<{floor / 1024:.0f}MB"
+        return f"{stats['median'] / 1024:.1f}MB"
+    return f"{stats['median']:.3f}±{stats['stdev']:.3f}"
+
+def print_results(results, settings: BenchSettings):
+    benchmarks = results["benchmarks"]
+    width = max([len("benchmark")] + [len(name) for name in benchmarks])
+    print(f"{'benchmark':<{width}}  " + "  ".join(f"{mode + ' wall(s)':>13}" for mode in settings.modes) + "  output")
+    for name, bench in benchmarks.items():
+        cells = []
+        for mode in settings.modes:
+            result = bench["modes"].get(mode)
+            cells.append(f"{'error' if result and result['error'] else format_stats(result and result['wall']):>13}")
+        print(f"{name:<{width}}  " + "  ".join(cells) + f"  {'ok' if bench['outputs_match'] else 'MISMATCH'}")
+
+    print()
+    print(f"{'benchmark':<{width}}  {'mode':<4}  {'compile(s)':>13}  {'peak rss':>9}  output")
+    for name, bench in benchmarks.items():
+        for mode, result in bench["modes"].items():
+            if result["error"]:
+                detail = result["error"]
+            else:
+                detail = short(result["output"])
+            print(f"{name:<{width}}  {mode:<4}  {format_stats(result['compile']):>13}  "
+                  f"{format_stats(result['rss_kb'], 'KB', results['rss_floor_kb']):>9}  {detail}")
+
+def write_tsv(results, settings: BenchSettings, file):
+    columns = ["Benchmark"]
+    for mode in settings.modes:
+        columns += [f"{mode} wall(s)", f"{mode} stdev(s)", f"{mode} compile(s)", f"{mode} rss(KB)"]
+    columns.append("Outputs match")
+    with open(file, "w", encoding="utf-8") as f:
+        f.write("\t".join(columns) + "\n")
+        for name, bench in results["benchmarks"].items():
+            row = [name]
+            for mode in settings.modes:
+                result = bench["modes"].get(mode) or {}
+                wall, compile_, rss = result.get("wall"), result.get("compile"), result.get("rss_kb")
+                row += [f"{wall['median']:.6f}" if wall else "",
+                        f"{wall['stdev']:.6f}" if wall else "",
+                        f"{compile_['median']:.6f}" if compile_ else "",
+                        f"{rss['median']:.0f}" if rss else ""]
+            row.append("yes" if bench["outputs_match"] else "no")
+            f.write("\t".join(row) + "\n")
+
+def write_json(results, file):
+    with open(file, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+# ================= DRIVER =================
+
+def parse_bench_args(args):
+    """Trả về (list thư mục / file, BenchSettings, lỗi hoặc None)"""
+    paths = []
+    settings = BenchSettings()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-runs", "-warmup", "-json", "-tsv", "-baseline"):
+            if i + 1 >= len(args):
+                return paths, settings, f"Missing value after {arg}"
+            value = args[i + 1]
+            i += 1
+            if arg in ("-runs", "-warmup"):
+                if not value.isdigit() or (arg == "-runs" and int(value) < 1):
+                    return paths, settings, f"Invalid number of {arg[1:]} '{value}'"
+                setattr(settings, arg[1:], int(value))
+            elif arg == "-json": settings.json_file = value
+            elif arg == "-tsv": settings.tsv_file = value
+            else: settings.baseline = value
+        elif arg.startswith("-modes="):
+            settings.modes = [mode for mode in arg[len("-modes="):].split(",") if mode]
+            unknown = [mode for mode in settings.modes if mode not in modes]
+            if unknown or not settings.modes:
+                return paths, settings, f"Unknown mode '{','.join(unknown)}' (modes: {', '.join(modes)})"
+        elif arg.startswith("-tolerance=") or arg.startswith("-timeout="):
+            name, value = arg[1:].split("=", 1)
+            try:
+                setattr(settings, name, float(value))
+            except ValueError:
+                return paths, settings, f"Invalid {name} '{value}'"
+        elif arg == "-save-baseline":
+            settings.save_baseline = True
+        elif arg.startswith("-"):
+            settings.flags.append(arg)
+        else:
+            paths.append(arg)
+        i += 1
+    if settings.save_baseline and settings.baseline is None:
+        return paths, settings, "-save-baseline needs -baseline <file>"
+    return paths or [DEFAULT_DIRECTORY], settings, None
+
+def collect_results(benchmarks, settings: BenchSettings):
+    results = {
+        "version": VERSION,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": settings.runs,
+        "warmup": settings.warmup,
+        "flags": settings.flags,
+        "rss_floor_kb": rss_floor(settings),
+        "benchmarks": {},
+    }
+    for name, files in benchmarks.items():
+        print(f"running {name} ...", flush=True)
+        results["benchmarks"][name] = run_benchmark(files, settings)
+    return results
+
+def run_bench(args):
+    paths, settings, error = parse_bench_args(args)
+    if error:
+        print("ERROR:", error)
+        return 1
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        print("ERROR:", f"'{missing[0]}' not found")
+        return 1
+    benchmarks = find_benchmarks(paths)
+    if not benchmarks:
+        print("ERROR:", "No .lae benchmark found")
+        return 1
+    if "cpp" in settings.modes and cpp_compiler() is None:
+        print("warning: no C++ compiler found, skipping cpp")
+        settings.modes.remove("cpp")
+
+    start_launcher()
+    try:
+        results = collect_results(benchmarks, settings)
+    finally:
+        stop_launcher()
+    print()
+    print_results(results, settings)
+
+    if settings.json_file: write_json(results, settings.json_file)
+    if settings.tsv_file: write_tsv(results, settings, settings.tsv_file)
+
+    failed = False
+    for name, bench in results["benchmarks"].items():
+        for mode, result in bench["modes"].items():
+            if result["error"]:
+                print(f"error: {name} {mode}: {result['error']}")
+                failed = True
+        if not bench["outputs_match"]:
+            outputs = ", ".join(f"{mode}={short(r['output'])!r}" for mode, r in bench["modes"].items()
+                                if r["output"] is not None)
+            print(f"mismatch: {name}: {outputs}")
+            failed = True
+
+    if settings.baseline is not None:
+        if settings.save_baseline:
+            write_json(results, settings.baseline)
+            print(f"baseline saved to {settings.baseline}")
+        elif not os.path.exists(settings.baseline):
+            print("ERROR:", f"Baseline '{settings.baseline}' not found (create it with -save-baseline)")
+            return 1
+        else:
+            with open(settings.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            slower = regressions(results, baseline, settings.tolerance)
+            for line in slower:
+                print(f"regression: {line}")
+            if slower:
+                failed = True
+            else:
+                print(f"no regression against {settings.baseline} (tolerance {settings.tolerance:g}%)")
+    return 1 if failed else 0
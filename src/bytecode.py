@@ -0,0 +1,686 @@
+import math
+import os
+import re
+import sys
+from const import *
+from node import *
+from check import collect_functions
+
+# === BYTECODE INTERPRETER (tier 1 của -jit-tiered) ===
+# AST của mỗi scope (main, từng hàm) được dịch sang bytecode thanh ghi rồi chạy
+# ngay, không cần tới llvmlite. Lệnh là tuple (opcode, a, b, c, ...), toán hạng là
+# chỉ số thanh ghi trong frame của scope:
+#
+#   [biến ...][hằng số ...][thanh ghi tạm ...]
+#
+# Frame mới là bản sao của template (biến = 0, hằng số đã điền sẵn), nên đọc biến
+# hay hằng số đều chỉ là R[i].
+#
+# Giá trị là int (luôn nằm trong i64), float, str hoặc None (tag NONE) và phải
+# cho đúng kết quả như code native: phép tính i64 tràn vòng, chia nguyên cắt về 0,
+# ^ qua pow(), điều kiện chỉ xét phần int, print dùng định dạng của runtime.py.
+# Biến được đọc trước phép gán đầu tiên theo thứ tự sinh code luôn là 0 như
+# trong codegen (ở đó slot của biến chưa tồn tại), AST được sửa lại tại chỗ
+# thành Num(0) để tier 2 thấy cùng một chương trình.
+#
+# Mỗi scope có bộ đếm (heat): mỗi lời gọi cộng CALL_WEIGHT, mỗi back edge cộng 1.
+# Lớp con (tiered.py) quyết định làm gì khi một hàm hay một vòng lặp của main
+# nóng lên; Interpreter ở đây chỉ thông dịch.
+
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+CALL_WEIGHT = 10
+
+# --- OPCODES ---
+# Mọi lệnh là tuple 4 phần tử (op, a, b, c), đích nhảy luôn nằm ở c:
+#   MOVE a b            R[a] = R[b]
+#   ADD..GE a b c       R[a] = R[b] op R[c]
+#   TOINT a b           R[a] = phần int của R[b]
+#   JUMP - - t          nhảy tới t
+#   JUMPF a - t         nhảy khi R[a] sai (phần int bằng 0)
+#   JNEQ..JNGE a b t    nhảy khi R[a] op R[b] sai (so sánh + nhảy gộp cho if / while)
+#   LOOP i - t          back edge của while (i: câu lệnh top-level của main, -1 nếu không)
+#   FORPREP a - t       R[a], R[a+1], R[a+2] = start, stop, step; nhảy khi không vào vòng lặp
+#   FORLOOP a i t       R[a] += step, quay lại t khi chưa qua stop
+#   CALL a f s          R[a] = f(*R[s]) (s là slice của các thanh ghi đối số)
+#   PRINT a nl          in R[a] (và xuống dòng)
+#   INPUT a kind        đọc vào R[a]
+#   RET a               trả về R[a]
+(MOVE, ADD, SUB, MUL, DIV, MOD, POW, EQ, NE, LT, GT, LE, GE,
+ JUMP, JUMPF, JNEQ, JNNE, JNLT, JNGT, JNLE, JNGE,
+ TOINT, LOOP, FORPREP, FORLOOP, CALL, PRINT, FLUSH, INPUT, RET) = range(30)
+
+opcode_names = ["MOVE", "ADD", "SUB", "MUL", "DIV", "MOD", "POW", "EQ", "NE", "LT", "GT", "LE", "GE",
+                "JUMP", "JUMPF", "JNEQ", "JNNE", "JNLT", "JNGT", "JNLE", "JNGE",
+                "TOINT", "LOOP", "FORPREP", "FORLOOP", "CALL", "PRINT", "FLUSH", "INPUT", "RET"]
+
+binary_opcodes = {
+    Operators.add: ADD, Operators.subtract: SUB, Operators.multiply: MUL,
+    Operators.divide: DIV, Operators.remainder: MOD, Operators.power: POW,
+    Operators.equals: EQ, Operators.same: EQ, Operators.different: NE,
+    Operators.less: LT, Operators.greater: GT, Operators.less_same: LE, Operators.greater_same: GE,
+}
+
+# Phép so sánh -> lệnh so sánh + nhảy khi sai
+jump_opcodes = {EQ: JNEQ, NE: JNNE, LT: JNLT, GT: JNGT, LE: JNLE, GE: JNGE}
+
+input_kinds = {"int": TYPE_INT, "float": TYPE_FLOAT, "str": TYPE_STR}
+
+
+class LaetusRuntimeError(Exception):
+    pass
+
+# ================= VALUE SEMANTICS =================
+
+def wrap(value):
+    return ((value - INT_MIN) & ((1 << 64) - 1)) + INT_MIN
+
+def fptosi(x):
+    """fptosi như trên x86: nan / ngoài khoảng i64 cho INT_MIN"""
+    if x != x or not -9223372036854775808.0 <= x < 9223372036854775808.0: return INT_MIN
+    return int(x)
+
+def to_int(v):
+    """Phần int của giá trị (như _val_to_int): float bị cắt, str / None là 0"""
+    if type(v) is int: return v
+    if type(v) is float: return fptosi(v)
+    return 0
+
+def is_odd_int(y):
+    return math.isfinite(y) and y == math.floor(y) and math.fmod(y, 2.0) != 0
+
+def c_pow(x, y):
+    """pow() của C: trả inf / nan thay vì ném lỗi"""
+    try:
+        return math.pow(x, y)
+    except OverflowError:
+        return -math.inf if x < 0 and is_odd_int(y) else math.inf
+    except ValueError:
+        if x == 0: return math.copysign(math.inf, x) if is_odd_int(y) else math.inf
+        return math.nan
+
+def int_binary(op, a, b):
+    if op == ADD: return wrap(a + b)
+    if op == SUB: return wrap(a - b)
+    if op == MUL: return wrap(a * b)
+    if op == DIV or op == MOD:
+        # sdiv / srem trên x86 dừng chương trình khi chia cho 0 hoặc INT_MIN / -1
+        if b == 0 or (a == INT_MIN and b == -1): raise LaetusRuntimeError("integer division by zero or overflow")
+        q = abs(a) // abs(b)
+        if (a < 0) != (b < 0): q = -q
+        return q if op == DIV else a - b * q
+    if op == POW: return fptosi(c_pow(float(a), float(b)))
+    return compare(op, a, b)
+
+def float_binary(op, x, y):
+    if op == ADD: return x + y
+    if op == SUB: return x - y
+    if op == MUL: return x * y
+    if op == DIV:
+        if y == 0:
+            if x == 0 or x != x: return math.nan
+            return math.copysign(math.inf, x) * math.copysign(1.0, y)
+        return x / y
+    if op == MOD:
+        try:
+            return math.fmod(x, y)
+        except ValueError:
+            return math.nan
+    if op == POW: return c_pow(x, y)
+    # fcmp ordered: nan so với gì cũng sai
+    if x != x or y != y: return 0
+    return compare(op, x, y)
+
+def compare(op, a, b):
+    if op == EQ: return 1 if a == b else 0
+    if op == NE: return 1 if a != b else 0
+    if op == LT: return 1 if a < b else 0
+    if op == GT: return 1 if a > b else 0
+    if op == LE: return 1 if a <= b else 0
+    return 1 if a >= b else 0
+
+def binary(op, a, b):
+    """Phép toán hai ngôi tổng quát: str / None tham gia như int 0"""
+    if type(a) is not int and type(a) is not float: a = 0
+    if type(b) is not int and type(b) is not float: b = 0
+    if type(a) is float or type(b) is float:
+        return float_binary(op, float(a), float(b))
+    return int_binary(op, a, b)
+
+def format_float(x):
+    """Giống put_float của runtime ("%.8g", nan có dấu như glibc)"""
+    if x != x: return "-nan" if math.copysign(1.0, x) < 0 else "nan"
+    return "%.8g" % x
+
+def format_value(v):
+    if type(v) is int: return str(v)
+    if type(v) is float: return format_float(v)
+    if type(v) is str: return v
+    return ""
+
+# ================= INPUT =================
+
+class StdinReader:
+    """Tách token trên stdin giống laetus_read_* của runtime: đọc không được
+    (hết input, sai định dạng) thì biến giữ nguyên phần tương ứng"""
+
+    def __init__(self):
+        self.data = b""
+        self.pos = 0
+
+    def peek(self):
+        if self.pos >= len(self.data):
+            self.data = os.read(0, 1 << 16)
+            self.pos = 0
+            if not self.data: return -1
+        return self.data[self.pos]
+
+    def skip_space(self):
+        c = self.peek()
+        while c >= 0 and c in b" \t\n\v\f\r":
+            self.pos += 1
+            c = self.peek()
+        return c
+
+    def read_int(self, old):
+        c = self.skip_space()
+        negative = False
+        if c >= 0 and c in b"+-":
+            negative = c == ord("-")
+            self.pos += 1
+        value = 0
+        digits = 0
+        c = self.peek()
+        while 48 <= c <= 57:
+            value = wrap(value * 10 + c - 48)
+            digits += 1
+            self.pos += 1
+            c = self.peek()
+        if digits: return wrap(-value) if negative else value
+        return old if type(old) is int else 0
+
+    def read_float(self, old):
+        self.skip_space()
+        token = bytearray()
+        c = self.peek()
+        while c >= 0 and (48 <= c <= 57 or 97 <= (c | 0x20) <= 122 or c in b"+-.") and len(token) < 63:
+            token.append(c)
+            self.pos += 1
+            c = self.peek()
+        value = strtod(token.decode("latin-1"))
+        if value is not None: return value
+        return old if type(old) is float else 0.0
+
+    def read_str(self, old):
+        c = self.skip_space()
+        if c < 0: return old
+        token = bytearray()
+        while c >= 0 and c not in b" \t\n\v\f\r":
+            token.append(c)
+            self.pos += 1
+            c = self.peek()
+        return token.decode("utf-8", errors="replace")
+
+def strtod(token):
+    """Giá trị của tiền tố dài nhất đọc được của token, None nếu không có"""
+    match = re.match(r"[+-]?(inf(inity)?|nan|(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?)", token, re.IGNORECASE)
+    if match is None: return None
+    return float(match.group(0))
+
+# ================= COMPILER =================
+
+class Code:
+    """Bytecode của một scope"""
+    __slots__ = ("name", "def_node", "instrs", "template", "var_regs", "param_regs", "statements",
+                 "heat", "dispatch", "promotable", "callees", "reads_input", "prints", "nested")
+
+    def __init__(self, name, def_node=None):
+        self.name = name
+        self.def_node = def_node
+        self.instrs = []
+        self.template = []
+        self.var_regs = {}
+        self.param_regs = []
+        # Câu lệnh top-level (không kể FuncDef) của main, cho OSR
+        self.statements = []
+        self.heat = 0
+        # Bảng dispatch: tuple kiểu đối số -> hàm native (tier 2)
+        self.dispatch = {}
+        self.promotable = True
+        self.callees = set()
+        self.reads_input = False
+        self.prints = False
+        self.nested = False
+
+    def dump(self):
+        lines = [f"{self.name}: {len(self.template)} registers"]
+        for pc, ins in enumerate(self.instrs):
+            lines.append(f"  {pc:4} {opcode_names[ins[0]]:8} " + " ".join(str(x) for x in ins[1:]))
+        return "\n".join(lines)
+
+
+class Compiler:
+    def __init__(self, functions: dict, line_buffered=False):
+        # Tên hàm -> Code (được điền thân sau, nên hàm gọi được hàm định nghĩa sau nó)
+        self.functions = functions
+        self.line_buffered = line_buffered
+
+    def compile(self, code: Code, params, body, main=False):
+        self.code = code
+        self.main = main
+        self.declared = set()
+        self.consts = {}
+
+        names = dict.fromkeys(params)
+        for n in walk(body):
+            kind = type(n)
+            if kind is Assign: names.setdefault(n.name)
+            elif kind is For: names.setdefault(n.var)
+            elif kind is Input:
+                names.setdefault(n.name)
+                code.reads_input = True
+                code.prints = code.prints or n.prompt is not None
+            elif kind is Print: code.prints = True
+            elif kind is Call: code.callees.add(n.name)
+            elif kind is FuncDef: code.nested = True
+
+        code.var_regs = {name: i for i, name in enumerate(names)}
+        code.param_regs = list(range(len(params)))
+        self.declared.update(params)
+        code.template = [0] * len(names)
+
+        # Mọi hằng số nằm trước vùng thanh ghi tạm
+        self.zero = self.const(0)
+        self.none = self.const(None)
+        for n in walk(body):
+            if type(n) is Num: self.const(self.number(n))
+            elif type(n) is Str: self.const(n.value)
+            elif type(n) is Input and n.prompt is not None: self.const(n.prompt)
+
+        self.first_temp = len(code.template)
+        self.top = self.first_temp
+        self.max_top = self.top
+
+        if main:
+            code.statements = [stmt for stmt in body if type(stmt) is not FuncDef]
+            for index, stmt in enumerate(code.statements):
+                self.statement(stmt, index)
+            self.emit(RET, self.zero)
+        else:
+            self.body(body)
+            # Rơi khỏi cuối hàm: TYPE_NONE
+            self.emit(RET, self.none)
+
+        code.template.extend([None] * (self.max_top - self.first_temp))
+        return code
+
+    @staticmethod
+    def number(node: Num):
+        if node.is_float: return float(node.value)
+        return wrap(int(node.value))
+
+    def const(self, value):
+        key = (type(value), repr(value))
+        reg = self.consts.get(key)
+        if reg is None:
+            reg = len(self.code.template)
+            self.code.template.append(value)
+            self.consts[key] = reg
+        return reg
+
+    def emit(self, op, a=None, b=None, c=None):
+        self.code.instrs.append((op, a, b, c))
+        return len(self.code.instrs) - 1
+
+    def patch(self, at, target):
+        op, a, b, _ = self.code.instrs[at]
+        self.code.instrs[at] = (op, a, b, target)
+
+    def jump_if_false(self, cond):
+        """Lệnh nhảy (chưa có đích) khi điều kiện sai"""
+        if type(cond) is BinOp and binary_opcodes.get(cond.op) in jump_opcodes:
+            lhs = self.operand(cond.lhs)
+            rhs = self.operand(cond.rhs)
+            return self.emit(jump_opcodes[binary_opcodes[cond.op]], lhs, rhs)
+        return self.emit(JUMPF, self.operand(cond))
+
+    def temp(self):
+        reg = self.top
+        self.top += 1
+        self.max_top = max(self.max_top, self.top)
+        return reg
+
+    # ================= EXPRESSIONS =================
+
+    def fix(self, node):
+        """Đổi biến chưa được tạo (đọc trước phép gán đầu tiên) thành Num(0)"""
+        if node is None: return None
+        kind = type(node)
+        if kind is Var:
+            return node if node.name in self.declared else Num(0, False, node.line)
+        if kind is BinOp:
+            node.lhs = self.fix(node.lhs)
+            node.rhs = self.fix(node.rhs)
+        elif kind is Call:
+            node.args = [self.fix(arg) for arg in node.args]
+        return node
+
+    def expr(self, node, dst=None):
+        """Thanh ghi chứa giá trị của node (dst nếu có), None khi không có giá trị
+        (gọi hàm chưa định nghĩa, như visit_call_func)"""
+        if node is None: return None
+        kind = type(node)
+
+        if kind is Num or kind is Str or kind is Var:
+            if kind is Var: reg = self.code.var_regs[node.name]
+            elif kind is Num: reg = self.const(self.number(node))
+            else: reg = self.const(node.value)
+            if dst is None or dst == reg: return reg
+            self.emit(MOVE, dst, reg)
+            return dst
+
+        if kind is BinOp:
+            lhs = self.operand(node.lhs)
+            rhs = self.operand(node.rhs)
+            out = self.temp() if dst is None else dst
+            self.emit(binary_opcodes.get(node.op, EQ), out, lhs, rhs)
+            return out
+
+        if kind is Call:
+            callee = self.functions.get(node.name)
+            if callee is None:
+                print(f"Error: Function '{node.name}' not defined.")
+                return None
+            base = self.top
+            for _ in node.args: self.temp()
+            for i, arg in enumerate(node.args):
+                if self.expr(arg, base + i) is None: self.emit(MOVE, base + i, self.zero)
+            out = self.temp() if dst is None else dst
+            self.emit(CALL, out, callee, slice(base, base + len(node.args)))
+            return out
+
+        return None
+
+    def operand(self, node):
+        reg = self.expr(node)
+        return self.zero if reg is None else reg
+
+    # ================= STATEMENTS =================
+
+    def body(self, stmts):
+        for stmt in stmts: self.statement(stmt)
+
+    def statement(self, node, index=-1):
+        """index: vị trí câu lệnh top-level của main (điểm OSR), -1 nếu không phải"""
+        saved_top = self.top
+        kind = type(node)
+
+        if kind is Assign:
+            node.value = self.fix(node.value)
+            reg = self.code.var_regs[node.name]
+            if self.expr(node.value, reg) is not None:
+                if node.type_name == "int": self.emit(TOINT, reg, reg)
+                self.declared.add(node.name)
+
+        elif kind is Input:
+            if node.prompt is not None: self.emit(PRINT, self.const(node.prompt), False)
+            self.emit(INPUT, self.code.var_regs[node.name], input_kinds.get(node.type_name))
+            self.declared.add(node.name)
+
+        elif kind is Print:
+            node.args = [self.fix(arg) for arg in node.args]
+            for arg in node.args:
+                reg = self.expr(arg)
+                if reg is not None: self.emit(PRINT, reg, node.newline)
+            if self.line_buffered: self.emit(FLUSH)
+
+        elif kind is Call:
+            self.expr(self.fix(node))
+
+        elif kind is Return:
+            node.value = self.fix(node.value)
+            reg = self.expr(node.value)
+            # return ở main kết thúc chương trình (RET của main)
+            self.emit(RET, self.zero if reg is None else reg)
+
+        elif kind is If:
+            node.cond = self.fix(node.cond)
+            jump_else = self.jump_if_false(node.cond)
+            self.top = saved_top
+            self.body(node.then_body)
+            if node.else_body is not None:
+                jump_end = self.emit(JUMP)
+                self.patch(jump_else, len(self.code.instrs))
+                self.body(node.else_body)
+                self.patch(jump_end, len(self.code.instrs))
+            else:
+                self.patch(jump_else, len(self.code.instrs))
+
+        elif kind is While:
+            node.cond = self.fix(node.cond)
+            start = len(self.code.instrs)
+            jump_end = self.jump_if_false(node.cond)
+            self.top = saved_top
+            self.body(node.body)
+            self.emit(LOOP, index, None, start)
+            self.patch(jump_end, len(self.code.instrs))
+
+        elif kind is For:
+            for field in ("start", "stop", "step"):
+                setattr(node, field, self.fix(getattr(node, field)))
+            counter, stop, step = self.temp(), self.temp(), self.temp()
+            for reg, expr in ((counter, node.start), (stop, node.stop), (step, node.step)):
+                if self.expr(expr, reg) is None: self.emit(MOVE, reg, self.zero)
+            prep = self.emit(FORPREP, counter)
+            self.declared.add(node.var)
+            var = self.code.var_regs[node.var]
+            body_start = self.emit(MOVE, var, counter)
+            self.body(node.body)
+            self.emit(FORLOOP, counter, index, body_start)
+            self.patch(prep, len(self.code.instrs))
+            # Giá trị của biến lặp sau vòng lặp (lần kiểm tra cuối)
+            self.emit(MOVE, var, counter)
+
+        self.top = saved_top
+
+# ================= INTERPRETER =================
+
+class Interpreter:
+    def __init__(self, program: Program, line_buffered=False):
+        self.program = program
+        self.line_buffered = line_buffered
+        self.stdin = StdinReader()
+        self.out = sys.stdout
+
+        def_nodes = collect_functions(program)
+        top_names = {stmt.name for stmt in program.body if type(stmt) is FuncDef}
+        self.functions = {name: Code(name, def_node) for name, def_node in def_nodes.items()}
+        for code in self.functions.values():
+            code.promotable = code.def_node.name in top_names
+
+        compiler = Compiler(self.functions, line_buffered)
+        self.main = compiler.compile(Code("main"), [], program.body, main=True)
+        for code in self.functions.values():
+            compiler.compile(code, code.def_node.params, code.def_node.body)
+
+    def run(self):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 200000))
+        try:
+            self.execute(self.main, self.main.template.copy())
+        except LaetusRuntimeError as e:
+            self.out.flush()
+            print(f"Runtime Error: {e}", file=sys.stderr)
+            return 1
+        except RecursionError:
+            self.out.flush()
+            print("Runtime Error: recursion too deep", file=sys.stderr)
+            return 1
+        finally:
+            sys.setrecursionlimit(limit)
+            self.out.flush()
+        return 0
+
+    # --- Tier 2 (tiered.py ghi đè) ---
+
+    def promote(self, code: Code, args):
+        """Hàm native thay cho code với các đối số này, hoặc None"""
+        code.promotable = False
+        return None
+
+    def on_hot_loop(self, code: Code, index, regs, for_state):
+        """Vòng lặp top-level thứ index của main đang nóng. Trả về True nếu phần
+        còn lại của chương trình đã được chạy ở nơi khác"""
+        return False
+
+    # --- Thông dịch ---
+
+    def call(self, callee: Code, args):
+        if callee.dispatch:
+            native = callee.dispatch.get(tuple(map(type, args)))
+            if native is not None: return native(*args)
+
+        callee.heat += CALL_WEIGHT
+        if callee.heat >= self.hot_threshold(callee) and callee.promotable:
+            native = self.promote(callee, args)
+            if native is not None: return native(*args)
+
+        regs = callee.template.copy()
+        for reg, value in zip(callee.param_regs, args):
+            regs[reg] = value
+        return self.execute(callee, regs)
+
+    def hot_threshold(self, code: Code):
+        return math.inf
+
+    def execute(self, code: Code, R):
+        instrs = code.instrs
+        write = self.out.write
+        osr_at = self.hot_threshold(code) if code is self.main else math.inf
+        heat = 0
+        pc = 0
+        lo = INT_MIN
+        hi = INT_MAX
+
+        # Nhánh được xếp theo tần suất gặp trong vòng lặp
+        while True:
+            op, a, b, c = instrs[pc]
+            pc += 1
+
+            if op == ADD:
+                x = R[b]; y = R[c]
+                if type(x) is int and type(y) is int:
+                    v = x + y
+                    R[a] = v if lo <= v <= hi else wrap(v)
+                else:
+                    R[a] = binary(ADD, x, y)
+
+            elif op == JNLT:
+                x = R[a]; y = R[b]
+                if type(x) is int and type(y) is int:
+                    if not x < y: pc = c
+                elif not binary(LT, x, y): pc = c
+
+            elif op == LOOP:
+                heat += 1
+                pc = c
+                if heat >= osr_at and a >= 0:
+                    code.heat += heat
+                    heat = 0
+                    if self.on_hot_loop(code, a, R, None): return None
+                    osr_at = math.inf
+
+            elif op == FORLOOP:
+                step = R[a + 2]
+                i = R[a] + step
+                if not lo <= i <= hi: i = wrap(i)
+                R[a] = i
+                heat += 1
+                if heat >= osr_at and b >= 0:
+                    code.heat += heat
+                    heat = 0
+                    if self.on_hot_loop(code, b, R, (i, R[a + 1], step)): return None
+                    osr_at = math.inf
+                if (i <= R[a + 1]) if step > 0 else (i >= R[a + 1]): pc = c
+
+            elif op == MOVE:
+                R[a] = R[b]
+
+            elif op == SUB:
+                x = R[b]; y = R[c]
+                if type(x) is int and type(y) is int:
+                    v = x - y
+                    R[a] = v if lo <= v <= hi else wrap(v)
+                else:
+                    R[a] = binary(SUB, x, y)
+
+            elif op == MUL:
+                x = R[b]; y = R[c]
+                if type(x) is int and type(y) is int:
+                    v = x * y
+                    R[a] = v if lo <= v <= hi else wrap(v)
+                else:
+                    R[a] = binary(MUL, x, y)
+
+            elif op <= GE:
+                # DIV MOD POW và các phép so sánh
+                x = R[b]; y = R[c]
+                if type(x) is int and type(y) is int:
+                    R[a] = int_binary(op, x, y)
+                else:
+                    R[a] = binary(op, x, y)
+
+            elif op <= JNGE:
+                # JUMP JUMPF và các lệnh so sánh + nhảy còn lại
+                if op == JUMP:
+                    pc = c
+                elif op == JUMPF:
+                    v = R[a]
+                    if type(v) is not int or v == 0: pc = c
+                else:
+                    x = R[a]; y = R[b]
+                    if type(x) is int and type(y) is int:
+                        if not compare(op - JNEQ + EQ, x, y): pc = c
+                    elif not binary(op - JNEQ + EQ, x, y): pc = c
+
+            elif op == CALL:
+                # osr_at tính theo heat cục bộ nên lùi theo phần đã chuyển vào code.heat
+                code.heat += heat
+                osr_at -= heat
+                heat = 0
+                R[a] = self.call(b, R[c])
+
+            elif op == PRINT:
+                v = R[a]
+                if type(v) is int: write(str(v))
+                elif type(v) is float: write(format_float(v))
+                elif type(v) is str: write(v)
+                if b: write("\n")
+
+            elif op == RET:
+                code.heat += heat
+                return R[a]
+
+            elif op == TOINT:
+                R[a] = to_int(R[b])
+
+            elif op == FORPREP:
+                i = R[a] = to_int(R[a])
+                stop = R[a + 1] = to_int(R[a + 1])
+                step = R[a + 2] = to_int(R[a + 2])
+                if not ((i <= stop) if step > 0 else (i >= stop)): pc = c
+
+            elif op == INPUT:
+                # Output (kể cả prompt) phải hiện ra trước khi đọc
+                self.out.flush()
+                if b == TYPE_INT: R[a] = self.stdin.read_int(R[a])
+                elif b == TYPE_FLOAT: R[a] = self.stdin.read_float(R[a])
+                elif b == TYPE_STR: R[a] = self.stdin.read_str(R[a])
+
+            elif op == FLUSH:
+                self.out.flush()
+
+
+def run_interpreter(program: Program, line_buffered=False):
+    return Interpreter(program, line_buffered).run()
@@ -0,0 +1,252 @@
+import contextlib
+import tempfile
+import hashlib
+import json
+import glob
+import os
+import llvmlite
+from llvmlite import binding
+from const import VERSION
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# === COMPILE CACHE ===
+# Thư mục cache lưu object đã tối ưu, khóa bằng sha256 của
+# (source, phiên bản compiler, flag ảnh hưởng tới codegen, target triple).
+# Trúng cache thì bỏ qua toàn bộ lex -> parse -> codegen -> tối ưu,
+# chỉ còn link (exe) hoặc nạp object vào JIT.
+#
+# Dung lượng bị giới hạn, entry được dùng lâu nhất (theo mtime) bị xóa trước.
+#
+# Nhiều process (build -j, serve, các lần chạy song song) dùng chung một thư
+# mục: file luôn được ghi ra file tạm rồi os.replace, bộ đếm trong stats.json
+# được cộng dưới khóa (flock) của stats.lock nên không mất lần đếm nào.
+# Không tạo được thư mục cache (HOME chỉ đọc, ...) thì open_cache trả về None
+# và compiler chạy như -no-cache.
+#
+# JIT còn có tầng cache thứ hai (JITObjectCache) theo hash của module đã tối ưu,
+# nối vào MCJIT qua set_object_cache: source khác nhưng IR giống nhau thì chỉ
+# còn front end, không chạy codegen của LLVM.
+
+DEFAULT_LIMIT = 256 * 1024 * 1024
+STATS_FILE = "stats.json"
+STATS_LOCK = "stats.lock"
+
+def default_cache_dir():
+    if "LAETUS_CACHE_DIR" in os.environ:
+        return os.environ["LAETUS_CACHE_DIR"]
+    if os.name == 'nt':
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        return os.path.join(base, "laetus", "cache")
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "laetus")
+
+def default_limit():
+    try:
+        return int(os.environ.get("LAETUS_CACHE_SIZE", DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+_compiler_id = None
+
+def compiler_id():
+    """Phiên bản laetus + llvmlite + LLVM, cộng thêm hash mã nguồn compiler
+    khi chạy từ source để sửa compiler cũng làm mất hiệu lực cache"""
+    global _compiler_id
+    if _compiler_id is None:
+        h = hashlib.sha256()
+        h.update(f"{VERSION}|{llvmlite.__version__}|{binding.llvm_version_info}".encode())
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(src_dir, "*.py"))):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        _compiler_id = h.hexdigest()
+    return _compiler_id
+
+def cache_key(source: str, flags: list, kind: str):
+    h = hashlib.sha256()
+    h.update(compiler_id().encode())
+    h.update(binding.get_default_triple().encode())
+    h.update(kind.encode())
+    h.update("\0".join(sorted(flags)).encode())
+    h.update(b"\0")
+    h.update(source.encode("utf-8"))
+    return h.hexdigest()
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Khóa độc quyền (giữa các process) trên file path"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield
+            return
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def open_cache(directory=None, limit=None):
+    """CompileCache, hoặc None nếu không dùng được thư mục cache"""
+    try:
+        return CompileCache(directory, limit)
+    except OSError:
+        return None
+
+
+class CompileCache:
+    def __init__(self, directory=None, limit=None):
+        self.directory = directory or default_cache_dir()
+        self.limit = default_limit() if limit is None else limit
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".o")
+
+    def get(self, key, counter=""):
+        """bytes của object đã cache, None nếu chưa có.
+        counter là tiền tố của bộ đếm hit/miss (ví dụ "jit_")"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._count(counter + "misses")
+            return None
+
+        # Đánh dấu vừa dùng cho LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(counter + "hits")
+        return data
+
+    def put(self, key, data: bytes):
+        # Không ghi được (đĩa đầy, thư mục bị xóa, ...) thì chỉ bỏ qua lần lưu này
+        try:
+            self._write(self._path(key), data)
+        except OSError:
+            return
+        self.evict()
+
+    def _write(self, path, data: bytes):
+        # Ghi ra file tạm (tên riêng cho mỗi lần ghi, kể cả giữa các thread) rồi
+        # rename để build song song không đọc phải file dở
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    def entries(self):
+        result = []
+        for path in glob.glob(os.path.join(self.directory, "*.o")):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            result.append((st.st_mtime, st.st_size, path))
+        return result
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.limit: return
+
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.limit: break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        self._count("evictions", evicted)
+
+    # --- STATS ---
+
+    def _stats_path(self):
+        return os.path.join(self.directory, STATS_FILE)
+
+    def load_stats(self):
+        try:
+            with open(self._stats_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _count(self, name, n=1):
+        if n == 0: return
+        try:
+            with file_lock(os.path.join(self.directory, STATS_LOCK)):
+                stats = self.load_stats()
+                stats[name] = stats.get(name, 0) + n
+                self._write(self._stats_path(), json.dumps(stats).encode("utf-8"))
+        except OSError:
+            pass
+
+    def report(self):
+        stats = self.load_stats()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        return (
+f"""Cache directory:    {self.directory}
+Entries:            {len(entries)}
+Size:               {total / 1024:.1f} KiB / {self.limit / 1024:.1f} KiB
+Source hits:        {hit_rate(stats, "")}
+JIT object hits:    {hit_rate(stats, "jit_")}
+Evictions:          {stats.get("evictions", 0)}""")
+
+
+def hit_rate(stats, counter):
+    hits = stats.get(counter + "hits", 0)
+    misses = stats.get(counter + "misses", 0)
+    lookups = hits + misses
+    rate = 100.0 * hits / lookups if lookups else 0.0
+    return f"{hits} hits, {misses} misses ({rate:.1f}%)"
+
+
+class JITObjectCache:
+    """Object cache cho MCJIT (ExecutionEngine.set_object_cache).
+    Khóa là hash của module đã tối ưu, nên vẫn trúng cache khi source đổi
+    mà IR không đổi (comment, định dạng, sửa compiler không ảnh hưởng IR)."""
+
+    def __init__(self, cache: CompileCache, codegen_key: str):
+        self.cache = cache
+        self.codegen_key = codegen_key
+
+        # Object vừa nạp hoặc vừa sinh, main lưu tiếp vào cache theo source
+        self.object_data = None
+        self._keys = {}
+
+    def key(self, llvm_module):
+        name = llvm_module.name
+        if name not in self._keys:
+            h = hashlib.sha256()
+            h.update(f"jit|{binding.llvm_version_info}|{binding.get_default_triple()}|{self.codegen_key}".encode())
+            h.update(str(llvm_module).encode("utf-8"))
+            self._keys[name] = h.hexdigest()
+        return self._keys[name]
+
+    def getbuffer(self, llvm_module):
+        self.object_data = self.cache.get(self.key(llvm_module), "jit_")
+        return self.object_data
+
+    def notify(self, llvm_module, data: bytes):
+        self.object_data = data
+        self.cache.put(self.key(llvm_module), data)
@@ -0,0 +1,36 @@
+from node import *
+
+# === FRONT-END CHECKS ===
+# Kiểm tra trên AST sau parse, trước mọi backend: lỗi ở đây được in ra dạng
+# "ERROR: ..." và chương trình không được biên dịch.
+#
+# Mỗi tên hàm chỉ được định nghĩa một lần trong cả chương trình (kể cả hàm
+# lồng trong câu lệnh khác): các backend tra hàm theo tên, nên không backend
+# nào phải tự chọn một trong hai thân hàm.
+
+def all_functions(root):
+    """Mọi FuncDef của chương trình, kể cả FuncDef lồng trong câu lệnh khác"""
+    found = []
+    for func_defs in (True, False):
+        stack = list(top_level(root, func_defs))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, FuncDef):
+                found.append(node)
+            stack.extend(node.children())
+    return found
+
+def collect_functions(root):
+    """Tên hàm -> FuncDef (check_functions đã bảo đảm mỗi tên chỉ có một FuncDef)"""
+    return {node.name: node for node in all_functions(root)}
+
+def check_functions(root):
+    """Lỗi của các hàm bị định nghĩa lại (list rỗng nếu không có)"""
+    first = {}
+    errors = []
+    for node in sorted(all_functions(root), key=lambda node: node.line):
+        if node.name in first:
+            errors.append(f"line {node.line}: function '{node.name}' is already defined at line {first[node.name].line}")
+        else:
+            first[node.name] = node
+    return errors
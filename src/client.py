@@ -0,0 +1,150 @@
+import tempfile
+import socket
+import struct
+import json
+import sys
+import os
+
+# === COMPILE SERVER CLIENT ===
+# Client mỏng của laetus serve (server.py): chỉ dùng thư viện chuẩn, không import
+# llvmlite, nên mỗi lần biên dịch chỉ còn chi phí khởi động Python.
+#
+#   python client.py <file> [-jit | -c | -s] [-o <file>] [-socket <path>] [flags]
+#   python client.py -stop [-socket <path>]
+#
+# Output mặc định giống laetus: a.exe / a.o / a.s; -jit in output của chương
+# trình (stdin được đọc hết và gửi kèm trước khi chạy, không dùng cho chương
+# trình tương tác).
+#
+# Giao thức: mỗi message là (độ dài header, độ dài payload) dạng 2 số uint32
+# big-endian, header JSON rồi payload bytes.
+#
+#   request     {"source", "name", "flags", "mode"} + stdin của chương trình
+#               hoặc {"command": "stop"}
+#   response    {"status", "messages", "cached", "timings"} + exe / object /
+#               assembly / output của lần chạy JIT
+
+modes = ["exe", "object", "assembly", "run"]
+default_outputs = {"exe": "a.exe", "object": "a.o", "assembly": "a.s"}
+
+frame = struct.Struct(">II")
+
+
+def default_socket_path():
+    if "LAETUS_SOCKET" in os.environ:
+        return os.environ["LAETUS_SOCKET"]
+    if "XDG_RUNTIME_DIR" in os.environ:
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "laetus.sock")
+    return os.path.join(tempfile.gettempdir(), f"laetus-{os.getuid()}.sock")
+
+def recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def send_message(sock, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(frame.pack(len(data), len(payload)) + data + payload)
+
+def recv_message(sock):
+    header_size, payload_size = frame.unpack(recv_exact(sock, frame.size))
+    header = json.loads(recv_exact(sock, header_size).decode("utf-8"))
+    return header, recv_exact(sock, payload_size)
+
+def request(header: dict, payload: bytes = b"", path=None):
+    """Gửi một request, trả về (header, payload) của response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path or default_socket_path())
+        send_message(sock, header, payload)
+        return recv_message(sock)
+
+
+def parse_client_args(args):
+    """Trả về (file, flags của compiler, mode, file output, socket, lỗi hoặc None)"""
+    source = None
+    flags = []
+    mode = "exe"
+    output = None
+    path = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-o", "-socket"):
+            if i + 1 >= len(args):
+                return source, flags, mode, output, path, f"Missing value after {arg}"
+            if arg == "-o": output = args[i + 1]
+            else: path = args[i + 1]
+            i += 1
+        elif arg == "-jit": mode = "run"
+        elif arg == "-c" and mode != "run": mode = "object"
+        elif arg == "-s" and mode != "run": mode = "assembly"
+        elif arg.startswith("-"): flags.append(arg)
+        elif source is None: source = arg
+        i += 1
+    return source, flags, mode, output, path, None
+
+def main(args):
+    if not hasattr(socket, "AF_UNIX"):
+        print("ERROR:", "The compile server needs Unix sockets")
+        return 1
+
+    source, flags, mode, output, path, error = parse_client_args(args)
+    path = path or default_socket_path()
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    if "-stop" in flags:
+        header, payload = {"command": "stop"}, b""
+    elif source is None:
+        print("ERROR:", "No input file.")
+        return 1
+    else:
+        try:
+            with open(source, "r") as f:
+                content = f.read()
+        except FileNotFoundError:
+            print("Error:", "File not found")
+            return 1
+        stdin = b""
+        if mode == "run" and not sys.stdin.isatty():
+            stdin = sys.stdin.buffer.read()
+        header = {"source": content, "name": source, "flags": flags, "mode": mode}
+        payload = stdin
+
+    try:
+        response, data = request(header, payload, path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("ERROR:", f"No laetus server at {path} (start one with: laetus serve)")
+        return 1
+
+    status = response.get("status", 1)
+    if status != 0 and mode == "run" and data:
+        # Output chương trình đã ghi trước khi chết (crash, quá thời gian)
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    sys.stdout.write(response.get("messages", ""))
+    sys.stdout.flush()
+    if status != 0 or "command" in header:
+        return status
+
+    if mode == "run":
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return 0
+
+    output = output or default_outputs[mode]
+    with open(output, "wb") as f:
+        f.write(data)
+    if mode == "exe":
+        os.chmod(output, 0o755)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -47,8 +47,43 @@ class Operators(enum.Enum):
 
 class Identifier(enum.Enum):
     print_tok      = "print"
+
+
+class Keyword(enum.IntEnum):
+    none            = 0
+    print_tok       = 1
+    println_tok     = 2
+    if_tok          = 3
+    then_tok        = 4
+    else_tok        = 5
+    end_tok         = 6
+    while_tok       = 7
+    do_tok          = 8
+    for_tok         = 9
+    func_tok        = 10
+    return_tok      = 11
+    input_tok       = 12
+    comma_tok       = 13
+    memo_tok        = 14
     
 
+keywords_ = {
+    "print":    Keyword.print_tok,
+    "println":  Keyword.println_tok,
+    "if":       Keyword.if_tok,
+    "then":     Keyword.then_tok,
+    "else":     Keyword.else_tok,
+    "end":      Keyword.end_tok,
+    "while":    Keyword.while_tok,
+    "do":       Keyword.do_tok,
+    "for":      Keyword.for_tok,
+    "func":     Keyword.func_tok,
+    "return":   Keyword.return_tok,
+    "input":    Keyword.input_tok,
+    "memo":     Keyword.memo_tok,
+}
+
+
 operators_ = {
     "+": Operators.add,
     "-": Operators.subtract,
@@ -94,4 +129,17 @@ compare_operators = [
     Operators.greater,
     Operators.greater_same,
     Operators.different,
-]
\ No newline at end of file
+]
+
+# === VALUE TYPE TAGS ===
+# Tag stored in field 0 of the dynamic variable struct
+TYPE_NONE = 0
+TYPE_INT = 1
+TYPE_FLOAT = 2
+TYPE_STR = 3
+
+# Only used at compile time: the variable's type changes at runtime
+TYPE_DYN = 4
+
+# Phiên bản compiler (khớp FileVersion trong version.txt)
+VERSION = "1.0.0"
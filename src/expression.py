@@ -1,125 +1,137 @@
 from const import *
-from node import Node
+from node import *
 from tokens import *
 
-def precedence(op):
-    if op.operator in (Operators.multiply, Operators.divide):
-        return 2
-    if op.operator in (Operators.add, Operators.subtract):
-        return 1
-    return 0
-
-def create_zero_node():
-    return Node(NumToken("0"))
-
-from const import *
-from node import Node
-from tokens import *
-
-def precedence(op):
-    if op.operator in (Operators.multiply, Operators.divide):
-        return 2
-    if op.operator in (Operators.add, Operators.subtract):
-        return 1
-    return 0
-
-def create_zero_node():
-    return Node(NumToken("0"))
-
-def build_expression_tree(tokens):
-    node_stack = []
-    op_stack = []
-    
-    expecting_operand = True 
-
-    i = 0
-    size = len(tokens)
-
-    while i < size:
-        tk = tokens[i]
-
-        if tk.type == TokType.number:
-            node_stack.append(Node(tk))
-            expecting_operand = False 
-        
-        elif tk.type == TokType.string:
-            node_stack.append(Node(tk))
-            expecting_operand = False
-
-        elif tk.type == TokType.identifier:
-            if i + 1 < size and tokens[i+1].type == TokType.operator and tokens[i+1].operator == Operators.left_paren:
-                # Bắt đầu parse hàm gọi
-                fn_call_node = Node(FunctionToken())
-                fn_call_node.add_children(Node(tk)) # Tên hàm
-                
-                params_node = Node(ParameterToken())
-                i += 2 # Bỏ qua ID và '('
-                
-                paren_count = 1
-                inner_tokens = []
-                while i < size and paren_count > 0:
-                    t = tokens[i]
-                    if t.type == TokType.operator and t.operator == Operators.left_paren: paren_count += 1
-                    if t.type == TokType.operator and t.operator == Operators.right_paren: paren_count -= 1
-                    
-                    if paren_count > 0:
-                        if t.type == TokType.identifier and t.func == "Comma":
-                            if inner_tokens:
-                                params_node.children.extend(build_expression_tree(inner_tokens))
-                            inner_tokens = []
-                        else:
-                            inner_tokens.append(t)
-                        i += 1
-                
-                if inner_tokens:
-                    params_node.children.extend(build_expression_tree(inner_tokens))
-                
-                fn_call_node.add_children(params_node)
-                node_stack.append(fn_call_node)
-                expecting_operand = False
-                # i bây giờ đang ở vị trí dấu ')', vòng lặp chính sẽ i += 1 tiếp
-            else:
-                node_stack.append(Node(tk))
-                expecting_operand = False
-
-        elif tk.type == TokType.operator and tk.operator == Operators.left_paren:
-            op_stack.append(tk)
-            expecting_operand = True 
-
-        elif tk.type == TokType.operator and tk.operator == Operators.right_paren:
-            while op_stack and not (op_stack[-1].type == TokType.operator and op_stack[-1].operator == Operators.left_paren):
-                apply_operator(node_stack, op_stack)
-            if op_stack:
-                op_stack.pop()
-            expecting_operand = False 
-
-        elif tk.type == TokType.operator:
-            if tk.operator == Operators.subtract and expecting_operand:
-                node_stack.append(create_zero_node())
-            
-            while (op_stack and 
-                   op_stack[-1].type == TokType.operator and 
-                   precedence(op_stack[-1]) >= precedence(tk)):
-                apply_operator(node_stack, op_stack)
-            
-            op_stack.append(tk)
-            expecting_operand = True
-            
-        i += 1
-
-    while op_stack:
-        apply_operator(node_stack, op_stack)
-
-    return node_stack
-
-def apply_operator(node_stack, op_stack):
-    if len(node_stack) < 2: return
-    op = op_stack.pop()
-    right = node_stack.pop()
-    left = node_stack.pop()
-
-    op_node = Node(op)
-    op_node.add_children(left)
-    op_node.add_children(right)
-    node_stack.append(op_node)
-
+# === PRATT PARSER ===
+# Biểu thức được parse trực tiếp trên con trỏ token của Parser (parser.pos),
+# không tách token ra list con, nên mỗi token chỉ được đọc đúng một lần.
+#
+# Binding power (trái, phải) trong binary_power, lớn hơn = ưu tiên cao hơn.
+# Toán tử kết hợp trái có phải = trái + 1, kết hợp phải có phải < trái:
+#   == != < > <= >= =   (1, 2)    (trái)
+#   + -                 (3, 4)    (trái)
+#   * / %               (5, 6)    (trái)
+#   - (một ngôi)        7         (unary_power: -2*3 = (-2)*3)
+#   ^                   (10, 9)   (phải: 2^3^2 = 2^(3^2), -2^2 = -(2^2))
+
+binary_power = {
+    Operators.equals:       (1, 2),
+    Operators.same:         (1, 2),
+    Operators.different:    (1, 2),
+    Operators.less:         (1, 2),
+    Operators.greater:      (1, 2),
+    Operators.less_same:    (1, 2),
+    Operators.greater_same: (1, 2),
+
+    Operators.add:          (3, 4),
+    Operators.subtract:     (3, 4),
+
+    Operators.multiply:     (5, 6),
+    Operators.divide:       (5, 6),
+    Operators.remainder:    (5, 6),
+
+    Operators.power:        (10, 9),
+}
+
+unary_power = 7
+
+def infix_power(tok: Token):
+    if tok.type != TokType.operator: return None
+    return binary_power.get(tok.operator)
+
+def parse_expression(parser, min_power=0):
+    """Parse một biểu thức bắt đầu tại parser.pos, dừng trước token đầu tiên
+    không thuộc biểu thức (xuống dòng, từ khóa, dấu phẩy, ')' ...).
+    Trả về None nếu không có biểu thức nào."""
+    lhs = parse_prefix(parser)
+    if lhs is None: return None
+
+    while parser.pos < parser.size:
+        op_tok = parser.tokens[parser.pos]
+        power = infix_power(op_tok)
+        if power is None: break
+
+        left_power, right_power = power
+        if left_power < min_power: break
+
+        parser.pos += 1
+        rhs = parse_expression(parser, right_power)
+        if rhs is None:
+            # Thiếu toán hạng bên phải: bỏ qua toán tử
+            break
+        lhs = BinOp(op_tok.operator, lhs, rhs, op_tok.line)
+
+    return lhs
+
+def parse_prefix(parser):
+    if parser.pos >= parser.size: return None
+    tok = parser.tokens[parser.pos]
+
+    if tok.type == TokType.number:
+        parser.pos += 1
+        return num_from_token(tok)
+
+    if tok.type == TokType.string:
+        parser.pos += 1
+        return Str(tok.string_value, tok.line)
+
+    if tok.type == TokType.identifier and tok.kw == Keyword.none:
+        parser.pos += 1
+        if parser.pos < parser.size and parser.tokens[parser.pos].operator == Operators.left_paren:
+            return parse_call(parser, tok)
+        return Var(tok.func, tok.line)
+
+    if tok.type == TokType.operator:
+        if tok.operator == Operators.left_paren:
+            parser.pos += 1
+            inner = parse_expression(parser)
+            if parser.pos < parser.size and parser.tokens[parser.pos].operator == Operators.right_paren:
+                parser.pos += 1
+            return inner
+
+        if tok.operator == Operators.subtract:
+            parser.pos += 1
+            operand = parse_expression(parser, unary_power)
+            if operand is None: return None
+            # -x được biểu diễn như 0 - x
+            return BinOp(Operators.subtract, Num(0, False, tok.line), operand, tok.line)
+
+    return None
+
+def parse_call(parser, name_tok: Token):
+    """Gọi hàm name(arg, ...): parser.pos đang ở '('"""
+    parser.pos += 1
+    args = []
+
+    while parser.pos < parser.size:
+        tok = parser.tokens[parser.pos]
+        if tok.operator == Operators.right_paren:
+            parser.pos += 1
+            break
+        if tok.kw == Keyword.comma_tok:
+            parser.pos += 1
+            continue
+        if tok.type == TokType.end_line:
+            break
+
+        arg = parse_expression(parser)
+        if arg is None:
+            # Token không thuộc biểu thức nào: bỏ qua để không lặp vô hạn
+            parser.pos += 1
+            continue
+        args.append(arg)
+
+    return Call(name_tok.func, args, name_tok.line)
+
+def parse_expression_list(parser):
+    """Danh sách biểu thức cách nhau bởi dấu phẩy (print a, b, c)"""
+    exprs = []
+    while True:
+        expr = parse_expression(parser)
+        if expr is None: break
+        exprs.append(expr)
+        if parser.pos < parser.size and parser.tokens[parser.pos].kw == Keyword.comma_tok:
+            parser.pos += 1
+            continue
+        break
+    return exprs
@@ -0,0 +1,143 @@
+from llvmlite import ir
+from runtime import Runtime
+
+# === PROFILE (-profile) ===
+# LLVMCodeGen chèn thêm bộ đếm vào chương trình:
+#
+#   function    số lần vào mỗi hàm (đầu thân của mọi bản chuyên biệt hóa)
+#   loop        số lần quay lại đầu mỗi vòng while / for (back edge)
+#   call        số lần gọi và số cycle (llvm.readcyclecounter, rdtsc trên x86)
+#               trôi qua trong lời gọi, theo từng chỗ gọi
+#
+# Mỗi bộ đếm là một global i64, tăng bằng load / add / store thường
+# (chương trình chạy một luồng): trong vòng lặp không có lời gọi LLVM giữ bộ
+# đếm trong thanh ghi nên chi phí gần như bằng 0; mỗi lời gọi tốn thêm hai lần
+# đọc cycle counter. Lời gọi đệ quy trực tiếp (hàm gọi chính nó) không được đo
+# gì cả: số lần gọi của nó là số lần vào hàm trừ đi các lời gọi từ hàm khác
+# (một dòng cho mỗi hàm, ở chỗ gọi đệ quy đầu tiên); cycle của một hàm là tổng
+# của các chỗ gọi nó từ hàm khác, đã gồm cả các tầng đệ quy bên trong.
+#
+# Khi main kết thúc, bảng được ghi ra stderr (qua buffer output của runtime),
+# mỗi dòng một bộ đếm, các cột cách nhau bởi tab:
+#
+#   kind  name  line  count  cycles  in
+#
+# name là tên hàm (function), loại vòng lặp (loop) hoặc hàm được gọi (call);
+# in là hàm chứa vòng lặp / chỗ gọi ("main" cho phần top-level).
+
+i64 = ir.IntType(64)
+
+header = "# laetus profile\n# kind\tname\tline\tcount\tcycles\tin\n"
+
+
+class Profiler:
+    def __init__(self, module: ir.Module, runtime: Runtime, global_string):
+        self.module = module
+        self.runtime = runtime
+        self.global_string = global_string
+        self.count = 0
+
+        # tên hàm -> (dòng, bộ đếm)
+        self.functions = {}
+        # (loại, dòng, hàm chứa) -> bộ đếm
+        self.loops = {}
+        # (hàm được gọi, dòng, hàm gọi) -> (bộ đếm lời gọi, bộ đếm cycle)
+        self.calls = {}
+        # tên hàm -> dòng của lời gọi đệ quy trực tiếp đầu tiên
+        self.recursive = {}
+
+        self.cycle_counter = module.declare_intrinsic("llvm.readcyclecounter", fnty=ir.FunctionType(i64, []))
+        # Thân hàm được sinh sau cùng (finish), khi đã biết mọi bộ đếm
+        self.report = ir.Function(module, ir.FunctionType(ir.VoidType(), []), name="laetus_profile_report")
+        self.report.linkage = "internal"
+
+    def _counter(self):
+        # Không internal: -jit-lazy tách hàm sang thư viện khác, dùng chung bộ đếm theo tên
+        var = ir.GlobalVariable(self.module, i64, name=f"laetus_prof_{self.count}")
+        var.initializer = ir.Constant(i64, 0)
+        self.count += 1
+        return var
+
+    def _bump(self, builder, counter, amount=None):
+        amount = amount if amount is not None else ir.Constant(i64, 1)
+        builder.store(builder.add(builder.load(counter), amount), counter)
+
+    # ================= INSTRUMENTATION =================
+
+    def enter_function(self, builder, name, line):
+        if name not in self.functions:
+            self.functions[name] = (line, self._counter())
+        self._bump(builder, self.functions[name][1])
+
+    def back_edge(self, builder, kind, line, func_name):
+        key = (kind, line, func_name)
+        if key not in self.loops:
+            self.loops[key] = self._counter()
+        self._bump(builder, self.loops[key])
+
+    def call(self, builder, callee, line, caller, emit_call):
+        """Sinh lời gọi bằng emit_call() kèm bộ đếm / cycle timer, trả về kết quả của nó"""
+        if callee == caller:
+            self.recursive.setdefault(callee, line)
+            return emit_call()
+        key = (callee, line, caller)
+        if key not in self.calls:
+            self.calls[key] = (self._counter(), self._counter())
+        count, cycles = self.calls[key]
+        self._bump(builder, count)
+        start = builder.call(self.cycle_counter, [])
+        result = emit_call()
+        self._bump(builder, cycles, builder.sub(builder.call(self.cycle_counter, []), start))
+        return result
+
+    # ================= REPORT =================
+
+    def finish(self):
+        """Sinh thân laetus_profile_report (được gọi trước khi main kết thúc)"""
+        rt = self.runtime
+        builder = ir.IRBuilder(self.report.append_basic_block("entry"))
+
+        def text(value):
+            builder.call(rt.put_str, [self.global_string(value)])
+
+        def number(value):
+            builder.call(rt.put_int, [value if isinstance(value, ir.Value) else ir.Constant(i64, value)])
+
+        def row(kind, name, line, count, cycles, where):
+            text(f"{kind}\t{name}\t{line}\t")
+            number(count)
+            text("\t")
+            if cycles is not None:
+                number(cycles)
+            text(f"\t{where}\n")
+
+        # Output của chương trình ra trước, bảng ghi vào stderr
+        builder.call(rt.flush, [])
+        builder.store(ir.Constant(ir.IntType(32), 2), rt.out_fd)
+        text(header)
+
+        def total(index, name):
+            """Tổng bộ đếm thứ index của các chỗ gọi name từ hàm khác, None nếu không có"""
+            result = None
+            for (callee, _, _), counters in self.calls.items():
+                if callee != name: continue
+                value = builder.load(counters[index])
+                result = value if result is None else builder.add(result, value)
+            return result
+
+        for name, (line, counter) in self.functions.items():
+            row("function", name, line, builder.load(counter), total(1, name), "")
+        for (kind, line, where), counter in self.loops.items():
+            row("loop", kind, line, builder.load(counter), None, where)
+        for (callee, line, caller), (counter, cycles) in self.calls.items():
+            row("call", callee, line, builder.load(counter), builder.load(cycles), caller)
+        for name, line in self.recursive.items():
+            if name not in self.functions: continue
+            calls = builder.load(self.functions[name][1])
+            outside = total(0, name)
+            if outside is not None: calls = builder.sub(calls, outside)
+            row("call", name, line, calls, None, name)
+
+        builder.call(rt.flush, [])
+        builder.store(ir.Constant(ir.IntType(32), 1), rt.out_fd)
+        builder.ret_void()
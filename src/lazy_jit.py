@@ -0,0 +1,194 @@
+from llvmlite import ir, binding
+from llvm_code_gen import create_target_machine, to_binding_module
+from optimize import OptOptions, run_passes
+from runtime import RUNTIME_PREFIX
+import threading
+import ctypes
+import sys
+import os
+
+# === LAZY ORC JIT (-jit-lazy) ===
+# MCJIT (run_jit) biên dịch cả module trước khi main chạy. Ở chế độ này module
+# được tách theo hàm và nạp vào LLJIT:
+#
+#   thư viện "program": main(), runtime + một stub cho mỗi hàm của người dùng
+#   thư viện "fn_<i>":  thân hàm thứ i, chỉ được tối ưu và biên dịch khi cần
+#
+# Stub của f giữ địa chỉ thật trong global f.jit_addr. Lần gọi đầu tiên địa chỉ
+# còn null, stub gọi ngược về Python (laetus_jit_compile) để biên dịch f rồi ghi
+# địa chỉ lại; các lần sau stub nhảy thẳng vào f. Lời gọi đệ quy trong f đi thẳng
+# tới định nghĩa trong cùng thư viện, không qua stub.
+#
+# llvmlite chưa có CompileOnDemandLayer / lazy reexports của ORC nên stub được
+# sinh bằng IR ở đây. Với -jit-bg một thread nền biên dịch trước các hàm theo
+# thứ tự trong source, lời gọi đầu tiên thường thấy hàm đã sẵn sàng.
+
+COMPILE_CALLBACK = "laetus_jit_compile"
+
+# LLJIT đã dùng tên "main" cho thư viện mặc định của nó
+MAIN_LIBRARY = "program"
+
+compile_callback_ty = ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_int32)
+
+i8_ptr = ir.IntType(8).as_pointer()
+
+
+def declaration(func: ir.Function):
+    """Dòng 'declare' cho một hàm (kể cả hàm đã có thân)"""
+    scratch = ir.Module()
+    return str(ir.Function(scratch, func.ftype, func.name))
+
+def callees(func: ir.Function):
+    """Các hàm của người dùng mà func gọi tới (trừ chính nó)"""
+    result = {}
+    for block in func.blocks:
+        for instr in block.instructions:
+            if isinstance(instr, ir.CallInstr) and isinstance(instr.callee, ir.Function):
+                callee = instr.callee
+                if callee is not func and not callee.is_declaration:
+                    result[callee.name] = callee
+    return list(result.values())
+
+
+class SplitModule:
+    """Module được tách thành thư viện program và thân từng hàm.
+    IR của mỗi hàm chỉ được dựng khi hàm đó được biên dịch."""
+
+    def __init__(self, module: ir.Module):
+        defined = [f for f in module.functions if f.name != "main" and not f.is_declaration]
+        self.functions = [f for f in defined if not f.name.startswith(RUNTIME_PREFIX)]
+        self.runtime = [f for f in defined if f.name.startswith(RUNTIME_PREFIX)]
+        self.main_func = module.get_global("main")
+
+        # Chuỗi hằng (internal) và hàm C được lặp lại trong mọi thư viện.
+        # Global ghi được (buffer output) chỉ định nghĩa trong thư viện program,
+        # các thư viện hàm khai báo external để dùng chung một bản.
+        global_vars = [g for g in module.global_values if isinstance(g, ir.GlobalVariable)]
+        constants = [str(g) for g in global_vars if g.global_constant]
+        self.mutable = "\n".join(str(g) for g in global_vars if not g.global_constant)
+        scratch = ir.Module()
+        self.mutable_decls = "\n".join(
+            str(ir.GlobalVariable(scratch, g.value_type, g.name)) for g in global_vars if not g.global_constant)
+        extern_decls = [str(f) for f in module.functions if f.is_declaration]
+        self.shared = "\n".join(constants + extern_decls)
+
+    def main_ir(self):
+        stubs = ir.Module()
+        callback = ir.Function(stubs, ir.FunctionType(i8_ptr, [ir.IntType(32)]), name=COMPILE_CALLBACK)
+
+        for index, func in enumerate(self.functions):
+            addr = ir.GlobalVariable(stubs, i8_ptr, name=f"{func.name}.jit_addr")
+            addr.linkage = "internal"
+            addr.initializer = ir.Constant(i8_ptr, None)
+
+            stub = ir.Function(stubs, func.ftype, name=func.name)
+            entry = stub.append_basic_block("entry")
+            compile_block = stub.append_basic_block("compile")
+            call_block = stub.append_basic_block("call")
+
+            builder = ir.IRBuilder(entry)
+            known = builder.load(addr)
+            ready = builder.icmp_unsigned("!=", known, ir.Constant(i8_ptr, None))
+            builder.cbranch(ready, call_block, compile_block)
+
+            builder.position_at_end(compile_block)
+            compiled = builder.call(callback, [ir.Constant(ir.IntType(32), index)])
+            builder.store(compiled, addr)
+            builder.branch(call_block)
+
+            builder.position_at_end(call_block)
+            target = builder.phi(i8_ptr)
+            target.add_incoming(known, entry)
+            target.add_incoming(compiled, compile_block)
+            result = builder.call(builder.bitcast(target, func.ftype.as_pointer()), list(stub.args))
+            if isinstance(func.ftype.return_type, ir.VoidType):
+                builder.ret_void()
+            else:
+                builder.ret(result)
+
+        runtime = [str(f) for f in self.runtime]
+        return "\n".join([str(stubs), self.shared, self.mutable] + runtime + [str(self.main_func)])
+
+    def function_ir(self, index):
+        func = self.functions[index]
+        others = [declaration(f) for f in callees(func)]
+        return "\n".join([self.shared, self.mutable_decls] + others + [str(func)])
+
+
+class LazyJIT:
+    def __init__(self, module: ir.Module, options: OptOptions = None, background=False):
+        self.options = options or OptOptions()
+        self.target_machine = create_target_machine(self.options.level)
+        self.lljit = binding.create_lljit_compiler(self.target_machine)
+
+        self.split = SplitModule(module)
+        self.addresses = [None] * len(self.split.functions)
+        self.trackers = []
+        self.lock = threading.Lock()
+
+        # Giữ tham chiếu tới callback, nếu không ctypes sẽ giải phóng nó
+        self.callback = compile_callback_ty(self._on_first_call)
+
+        self.background = None
+        if background and self.split.functions:
+            self.background = threading.Thread(target=self._compile_all, daemon=True)
+
+    def _optimized(self, text):
+        llvm_module = to_binding_module(text, self.target_machine)
+        return run_passes(llvm_module, self.target_machine, self.options)
+
+    def compile_function(self, index):
+        with self.lock:
+            if self.addresses[index] is not None:
+                return self.addresses[index]
+
+            name = self.split.functions[index].name
+            tracker = (
+                binding.JITLibraryBuilder()
+                .add_ir(self._optimized(self.split.function_ir(index)))
+                .add_current_process()
+                .add_jit_library(MAIN_LIBRARY)
+                .export_symbol(name)
+                .link(self.lljit, f"fn_{index}")
+            )
+            self.trackers.append(tracker)
+            self.addresses[index] = tracker[name]
+            return self.addresses[index]
+
+    def _on_first_call(self, index):
+        try:
+            return self.compile_function(index)
+        except Exception as e:
+            # Không thể trả lỗi về code JIT: dừng hẳn thay vì nhảy vào địa chỉ null
+            print(f"LLVM Error: {e}", file=sys.stderr)
+            sys.stderr.flush()
+            os._exit(1)
+
+    def _compile_all(self):
+        for index in range(len(self.split.functions)):
+            self.compile_function(index)
+
+    def run(self):
+        if os.name == 'nt':
+            binding.load_library_permanently("msvcrt.dll")
+
+        tracker = (
+            binding.JITLibraryBuilder()
+            .add_ir(self._optimized(self.split.main_ir()))
+            .add_current_process()
+            .import_symbol(COMPILE_CALLBACK, ctypes.cast(self.callback, ctypes.c_void_p).value)
+            .export_symbol("main")
+            .link(self.lljit, MAIN_LIBRARY)
+        )
+        self.trackers.append(tracker)
+
+        if self.background is not None:
+            self.background.start()
+
+        c_main = ctypes.CFUNCTYPE(ctypes.c_int32)(tracker["main"])
+        sys.stdout.flush()
+        return c_main()
+
+
+def run_lazy_jit(module: ir.Module, options: OptOptions = None, background=False):
+    return LazyJIT(module, options, background).run()
@@ -1,3 +1,4 @@
+import re
 from tokens import *
 from const import *
 
@@ -7,167 +8,90 @@ data_types = [
     "str",
 ]
 
-def add_identifier(tokens:list[Token], id_type: str):
-    if id_type in data_types:
-        new_tok  = TypeToken(id_type)
-        new_tok.set_id(id_type)
-        tokens.append(new_tok)
-    else:
-        new_tok  = IdToken(id_type)
-        new_tok.set_id(id_type)
-        new_tok.func = id_type
-        tokens.append(new_tok)
-    return tokens
-
-def add_number(tokens:list[Token], value: int|float):
-    new_tok  = NumToken(value)
-    tokens.append(new_tok)
-    return tokens
-
-def add_operator(tokens:list[Token], op: str):
-    new_tok  = OperatorToken(operators_[op])
-    tokens.append(new_tok)
-    return tokens
+# === SCANNER ===
+# Một regex duy nhất, mỗi nhánh là một lớp token. Token chỉ ghi lại offset
+# (m.start(), m.end()) trong source thay vì cộng dồn từng ký tự.
+#
+# Ký tự phân tách: ' ', '\n', '"', ',', '#', '(', ')' và các toán tử.
+# Mọi ký tự khác (kể cả tab, '.', và '!' không đứng trước '=') thuộc về word đang đọc.
+# Một chuỗi '=' đứng sau '<', '>' hoặc '=' gộp thành một toán tử so sánh, "!=" là khác.
+#
+# Dấu cách đứng trước token được nuốt luôn trong cùng một match ("[ ]*"), nên
+# vòng lặp Python không phải đi qua các match chỉ có dấu cách. Nhánh được nhận
+# ra bằng m.lastindex (số thứ tự group, xem các hằng bên dưới) thay vì so
+# sánh tên trong m.lastgroup.
+token_re = re.compile(r"""[ ]*(?:
+      (?P<number>[0-9](?:[^ \n",\#()\-+*/%^<>=!]|!(?!=))*)
+    | (?P<word>(?:[^ \n",\#()\-+*/%^<>=!]+|!(?!=))+)
+    | (?P<newline>\n)
+    | (?P<operator>[<>=]=+|!=|[-+*/%^<>=()])
+    | (?P<comma>,)
+    | (?P<string>"[^"]*")
+    | (?P<comment>\#[^\n]*\n?)
+    | (?P<unterminated>"[^"]*)
+)""", re.VERBOSE)
+
+NUMBER, WORD, NEWLINE, OPERATOR, COMMA, STRING, COMMENT = range(1, 8)
+
+# Toán tử và dấu ngoặc theo text. Chuỗi '=' dài hơn ("<==", "===") không có
+# trong bảng: cuối cùng vẫn là "=="
+lexer_ops_ = {
+    "+": Operators.add,
+    "-": Operators.subtract,
+    "*": Operators.multiply,
+    "/": Operators.divide,
+    "%": Operators.remainder,
+    "^": Operators.power,
+    "=": Operators.equals,
+    ">": Operators.greater,
+    "<": Operators.less,
+    "==": Operators.same,
+    "!=": Operators.different,
+    ">=": Operators.greater_same,
+    "<=": Operators.less_same,
+    "(": Operators.left_paren,
+    ")": Operators.right_paren,
+}
+
+# Word -> (loại token, từ khóa); word không có trong bảng là identifier thường
+words_ = {word: (TokType.identifier, kw) for word, kw in keywords_.items()}
+words_.update({word: (TokType.Type, keywords_.get(word, Keyword.none)) for word in data_types})
 
 def lexer(code:str):
     tokens:list[Token] = []
-    tok = ""
-
-    state = TokType.identifier
-    curr_char = ""
-
-    pre_tok = ""
-    is_command = False
-
-    for c in code:
-        curr_char = c
-        if state == TokType.string:
-            if (c == "\""):
-                new_tok = StrToken(tok)
-                tokens.append(new_tok)
-                state = TokType.identifier
-                tok = ""
-                curr_char = ""
-        elif is_command == True:
-            if c == "\n":
-                curr_char = ""
-                tok = ""
-                is_command = False
-        else:
-            if (c == "\""):
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                curr_char = ""
-                tok = ""
-                state = TokType.string
-            if (c == ","):
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                curr_char = ""
-                tok = ""
-                new_tok = CommaToken()
-                tokens.append(new_tok)
-
-                state = TokType.identifier
-            if (c == "#"):
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                tok = ""
-                state = TokType.identifier
-            if c == "(":
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                curr_char = ""
-                tok = ""
-
-                new_tok = OperatorToken(Operators.left_paren)
-                tokens.append(new_tok)
-                state = TokType.identifier
-            if c == ")":
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                curr_char = ""
-                tok = ""
-
-                new_tok = OperatorToken(Operators.right_paren)
-                tokens.append(new_tok)
-                state = TokType.identifier
-            if (c == "\n" or c == " "):
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
-                
-                if c == "\n":
-                    tokens.append(EndLineToken())
-                tok = ""
-                curr_char = ""
-                state = TokType.identifier
-            elif (
-                    c == "+" or c == "-" or c == "*" or \
-                    c == "/" or c == "=" or c == "<" or \
-                    c == ">" or c == "%" or c == "^"
-                ):
-                if tok != "":
-                    if state == TokType.identifier:
-                        tokens = add_identifier(tokens,tok)
-                    elif state == TokType.number:
-                        tokens = add_number(tokens,tok)
+    append = tokens.append
+    line = 1
+
+    # Biến cục bộ: tra cứu nhanh hơn global / thuộc tính trong vòng lặp
+    new_token = Token
+    none = Keyword.none
+    identifier = (TokType.identifier, none)
+    get_word = words_.get
+    get_op = lexer_ops_.get
+    same = Operators.same
+    number_type, end_line_type, operator_type = TokType.number, TokType.end_line, TokType.operator
+
+    for m in token_re.finditer(code):
+        kind = m.lastindex
+        start, end = m.span(kind)
+
+        if kind == WORD:
+            tok_type, kw = get_word(code[start:end], identifier)
+            append(new_token(tok_type, kw, None, code, start, end - start, line))
+        elif kind == NEWLINE:
+            append(new_token(end_line_type, none, None, code, start, 1, line))
+            line += 1
+        elif kind == OPERATOR:
+            append(new_token(operator_type, none, get_op(code[start:end], same), code, start, end - start, line))
+        elif kind == NUMBER:
+            append(new_token(number_type, none, None, code, start, end - start, line))
+        elif kind == COMMA:
+            append(new_token(TokType.identifier, Keyword.comma_tok, None, code, start, 1, line))
+        elif kind == STRING:
+            append(new_token(TokType.string, none, None, code, start, end - start, line))
+            line += code.count("\n", start, end)
+        elif kind == COMMENT:
+            if code[end-1] == "\n": line += 1
+        # unterminated: chuỗi chưa đóng ở cuối file bị bỏ qua
 
-                if c == "=" and pre_tok == "=":
-                    tokens.pop(-1)
-
-                    same_tok = OperatorToken(Operators.same)
-
-                    tokens.append(same_tok)
-                elif c == "=" and pre_tok == "<":
-                    tokens.pop(-1)
-
-                    same_tok = OperatorToken(Operators.less_same)
-
-                    tokens.append(same_tok)
-                elif c == "=" and pre_tok == ">":
-                    tokens.pop(-1)
-
-                    same_tok = OperatorToken(Operators.greater_same)
-
-                    tokens.append(same_tok)
-                else:
-                    tokens = add_operator(tokens, c)
-                
-                tok = ""
-                curr_char = ""
-                state = TokType.identifier
-
-            elif (
-                    c == "1" or c == "2" or c == "3" or \
-                    c == "4" or c == "5" or c == "6" or \
-                    c == "7" or c == "8" or c == "9" or \
-                    c == "0"
-                ) and tok == "":
-                state = TokType.number
-
-            elif c == "#" and tok == "":
-                is_command = True
-
-    
-        tok += curr_char
-
-        pre_tok = c
-    return tokens
\ No newline at end of file
+    return tokens
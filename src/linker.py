@@ -0,0 +1,35 @@
+import subprocess
+import shutil
+import sys
+import os
+
+# === LINK ===
+# Object do LLVM sinh ra được link thành exe bằng clang (bản đóng gói kèm
+# compiler khi build bằng PyInstaller) hoặc trình biên dịch C của hệ thống.
+
+dev = False
+
+def resource_path(relative_path):
+    if dev:
+        if hasattr(sys, "_MEIPASS"):
+            return os.path.join(sys._MEIPASS, relative_path)
+        return os.path.join(os.path.abspath("."), relative_path)
+    else:
+        # clang chỉ còn dùng để link, máy không có clang thì dùng trình biên dịch C hệ thống
+        return shutil.which("clang") or shutil.which("cc") or "clang"
+clang_path = resource_path("clang/bin/clang.exe")
+
+def link(object_files, output_file, relocatable=False):
+    """Link một hoặc nhiều object thành exe, hoặc gộp thành một object (relocatable)"""
+    if isinstance(object_files, str): object_files = [object_files]
+    link_cmd = [clang_path] + object_files + ["-o", output_file]
+
+    if relocatable:
+        link_cmd += ["-r", "-nostdlib"]
+    elif os.name == 'nt': 
+        link_cmd.append("-llegacy_stdio_definitions")
+        link_cmd.append("-lmsvcrt")
+    else:
+        link_cmd.append("-lm")
+
+    subprocess.check_call(link_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
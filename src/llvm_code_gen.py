@@ -1,30 +1,73 @@
 from llvmlite import ir, binding
-from const import TokType, Operators
-from node import Node
+from const import Operators, TYPE_INT, TYPE_FLOAT, TYPE_STR, TYPE_DYN
+from node import *
+from optimize import OptOptions, run_passes
+from runtime import Runtime
+from type_infer import Specialization, clone_name
+from memo import MemoOptions
+from phases import PhaseTimer, ir_counts
+from instrument import Profiler
+from pgo import PGOProfile, BranchCounters
 import ctypes
+import sys
 import os
 
-# Initialize JIT environment
-binding.initialize()
-binding.initialize_native_target()
-binding.initialize_native_asmprinter()
+# LLVM chỉ được khởi tạo khi thật sự sinh mã (create_target_machine /
+# to_binding_module), module này cũng chỉ được import khi cần codegen
+llvm_ready = False
 
-# === CONSTANTS ===
-TYPE_NONE = 0
-TYPE_INT = 1
-TYPE_FLOAT = 2
-TYPE_STR = 3
+def init_llvm():
+    global llvm_ready
+    if llvm_ready: return
+    binding.initialize()
+    binding.initialize_native_target()
+    binding.initialize_native_asmprinter()
+    llvm_ready = True
+
+# Phần chứa main() khi chương trình được tách theo hàm (xem parallel.py)
+MAIN_PART = "main"
 
 class LLVMCodeGen:
-    def __init__(self):
+    def __init__(self, line_buffered=False, memo: MemoOptions = None, part=None, profile=False,
+                 pgo_gen=False, pgo_use: PGOProfile = None):
         self.module = ir.Module(name="laetus_module")
         self.builder = None
         self.func = None
+        # Tên trong source của hàm đang sinh ("main" cho phần top-level)
+        self.func_name = None
         
         # Scopes: Dictionary mapping variable_name -> pointer_to_struct
         # scopes[-1] is the current local scope
         self.scopes = [] 
 
+        # Result of type_infer: scope name -> {variable_name: type}
+        # Variables with a static type get a plain i64 / double / i8* slot
+        self.var_types = {}
+        self.local_types = {}
+
+        # Vòng for đếm: tên biến lặp -> giá trị i64 trong thanh ghi (phi), đọc
+        # thẳng thay vì load từ slot. scope_body trả về các câu lệnh của scope
+        # đang sinh, scope_reads đếm số lần đọc mỗi biến (tính khi cần)
+        self.induction = {}
+        self.scope_body = None
+        self.scope_reads = None
+
+        # Bản chuyên biệt hóa của hàm (xem type_infer): tên hàm -> [Specialization]
+        self.signatures = {}
+        # Tên hàm -> FuncDef, (tên hàm, kiểu tham số) -> (ir.Function, kiểu trả về)
+        self.func_defs = {}
+        self.clones = {}
+        # Bản đã khai báo nhưng chưa sinh thân hàm
+        self.pending = []
+
+        # part: None sinh cả chương trình; tên một hàm top-level hoặc MAIN_PART
+        # chỉ sinh thân của phần đó, các bản của hàm khác chỉ được khai báo.
+        # exported là các bản khai báo từ đầu (type_infer), có đúng một định nghĩa
+        # ở module của hàm; bản phát sinh khi sinh code được định nghĩa internal
+        # ngay trong module cần nó.
+        self.part = part
+        self.exported = set()
+
         # --- DYNAMIC VARIABLE STRUCT DEFINITION ---
         # Structure: { i8 type, i64 int_val, double float_val, i8* str_val }
         self.var_struct_ty = ir.LiteralStructType([
@@ -34,50 +77,64 @@ class LLVMCodeGen:
             ir.IntType(8).as_pointer()   # String Value
         ])
         
-        # --- C LIBRARY FUNCTIONS ---
-        voidptr_ty = ir.IntType(8).as_pointer()
-        
-        # printf(format, ...)
-        printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-        self.printf = ir.Function(self.module, printf_ty, name="printf")
-
-        # scanf(format, ...)
-        scanf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-        self.scanf = ir.Function(self.module, scanf_ty, name="scanf")
-        
-        # malloc(size)
-        malloc_ty = ir.FunctionType(voidptr_ty, [ir.IntType(64)])
-        self.malloc = ir.Function(self.module, malloc_ty, name="malloc")
-
-        # fflush(stream)
-        fflush_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty])
-        self.fflush = ir.Function(self.module, fflush_ty, name="fflush")
+        # String value -> tên global đã tạo
+        self.string_names = {}
 
+        # --- C LIBRARY FUNCTIONS ---
         # pow(double, double) -> Lũy thừa
         pow_ty = ir.FunctionType(ir.DoubleType(), [ir.DoubleType(), ir.DoubleType()])
         self.pow = ir.Function(self.module, pow_ty, name="pow")
 
-        # --- FORMAT STRINGS ---
-        self.fmt_int = self._global_string("%lld")
-        self.fmt_float = self._global_string("%.8g")
-        self.fmt_str = self._global_string("%s")
-        
-        self.fmt_int_nl = self._global_string("%lld\n")
-        self.fmt_float_nl = self._global_string("%.8g\n")
-        self.fmt_str_nl = self._global_string("%s\n")
-        
-        self.scan_int = self._global_string("%lld") 
-        self.scan_float = self._global_string("%lf")
-        self.scan_str = self._global_string("%s")
-
-        self.current_func_ret_ptr = None
+        # --- RUNTIME ---
+        # print / input đi qua buffer của runtime thay vì printf / scanf;
+        # line_buffered ghi buffer ra sau mỗi lệnh print (cho chương trình tương tác)
+        self.runtime = Runtime(self.module, private=part not in (None, MAIN_PART))
+        self.line_buffered = line_buffered
+
+        # Kiểu trả về của hàm đang sinh: kiểu tĩnh, hoặc TYPE_DYN (var_struct theo giá trị)
+        self.current_ret_type = None
+
+        # Bảng của 'memo func' (xem memo.py); memo_entry là (entry, khóa) của
+        # lần gọi hiện tại khi đang sinh một hàm memo
+        self.memo = memo or MemoOptions()
+        self.memo_entry = None
+
+        # -profile: bộ đếm hàm / vòng lặp / lời gọi (xem instrument.py)
+        self.profiler = Profiler(self.module, self.runtime, self._global_string) if profile else None
+
+        # PGO (xem pgo.py): nhánh của if / while / for được đánh số theo thứ tự
+        # sinh; -pgo-gen đếm từng nhánh, -pgo-use gắn branch weights từ profile
+        self.branch_count = 0
+        self.pgo_counters = BranchCounters(self.module, self.runtime, self._global_string) if pgo_gen else None
+        self.pgo_profile = pgo_use
+
+        # Node class -> visit method: visit() chỉ tra bảng một lần
+        self.visitors = {
+            FuncDef:    self.visit_def_function,
+            Call:       self.visit_call_func,
+            Return:     self.visit_return,
+            Input:      self.visit_input,
+            Print:      self.visit_print,
+            If:         self.visit_if,
+            While:      self.visit_while,
+            For:        self.visit_for,
+            Assign:     self.visit_assignment,
+            Var:        self.visit_variable_load,
+            BinOp:      self.visit_binary_op,
+            Num:        self.visit_number,
+            Str:        self.visit_string,
+        }
 
     def _global_string(self, value):
         """Creates a global static string and returns i8*"""
-        name = "str_" + str(hash(value)).replace("-", "_")
-        if name in self.module.globals:
+        # Đặt tên theo thứ tự xuất hiện (không dùng hash() vì nó đổi theo
+        # PYTHONHASHSEED): cùng source luôn sinh ra cùng IR, khóa cache ổn định
+        name = self.string_names.get(value)
+        if name is not None:
             var = self.module.globals[name]
         else:
+            name = f"str_{len(self.string_names)}"
+            self.string_names[value] = name
             c_str_val = bytearray((value + '\0').encode('utf-8'))
             c_str_ty = ir.ArrayType(ir.IntType(8), len(c_str_val))
             c_str = ir.Constant(c_str_ty, c_str_val)
@@ -97,256 +154,437 @@ class LLVMCodeGen:
         return None
 
     def _create_var(self, name):
-        """Allocates a new Dynamic Variable Struct in the current scope"""
-        ptr = self.builder.alloca(self.var_struct_ty, name=name)
-        
-        # Initialize Type = NONE (0)
-        zero = ir.Constant(ir.IntType(8), 0)
-        type_ptr = self.builder.gep(ptr, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)])
-        self.builder.store(zero, type_ptr)
+        """Allocates a new variable slot in the current scope.
+        Statically typed variables get a plain slot, the others a Dynamic Variable Struct"""
+        var_type = self.local_types.get(name, TYPE_DYN)
+
+        # Allocas live in the entry block so mem2reg can promote them to registers
+        with self.builder.goto_entry_block():
+            if var_type == TYPE_INT:
+                ptr = self.builder.alloca(ir.IntType(64), name=name)
+                self.builder.store(ir.Constant(ir.IntType(64), 0), ptr)
+            elif var_type == TYPE_FLOAT:
+                ptr = self.builder.alloca(ir.DoubleType(), name=name)
+                self.builder.store(ir.Constant(ir.DoubleType(), 0.0), ptr)
+            elif var_type == TYPE_STR:
+                ptr = self.builder.alloca(ir.IntType(8).as_pointer(), name=name)
+                self.builder.store(self._global_string(""), ptr)
+            else:
+                ptr = self.builder.alloca(self.var_struct_ty, name=name)
+
+                # Initialize Type = NONE (0)
+                zero = ir.Constant(ir.IntType(8), 0)
+                type_ptr = self.builder.gep(ptr, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)])
+                self.builder.store(zero, type_ptr)
         
         self.scopes[-1][name] = ptr
         return ptr
 
+    def _slot_type(self, ptr):
+        """Returns the static type stored in a variable slot, TYPE_DYN for a struct"""
+        pointee = ptr.type.pointee
+        if pointee == ir.IntType(64): return TYPE_INT
+        if pointee == ir.DoubleType(): return TYPE_FLOAT
+        if pointee == ir.IntType(8).as_pointer(): return TYPE_STR
+        return TYPE_DYN
+
+    def _to_static(self, value, typ):
+        """Converts a visited value to the native LLVM value of a static type"""
+        if isinstance(value, tuple) and value[0] == typ:
+            return value[1]
+        if typ == TYPE_STR:
+            return value["str"]
+
+        data = self._extract_val(value)
+        if typ == TYPE_INT:
+            return self._val_to_int(data)
+
+        is_float = self.builder.icmp_signed('==', data[0], ir.Constant(ir.IntType(8), TYPE_FLOAT))
+        return self.builder.select(is_float, data[2], self.builder.sitofp(data[1], ir.DoubleType()))
+
     # ================= MAIN GENERATION =================
 
-    def generate_ir(self, root_node: Node):
+    def generate_ir(self, root, var_types=None):
+        """root là Program hoặc NodeArena"""
+        self.var_types = var_types or {}
+        self.signatures = getattr(var_types, "signatures", {})
+
         # 1. First Pass: Define User Functions (Global Scope)
-        for child in root_node.children:
-            if child.data.type == TokType.def_function:
-                self.visit_def_function(child)
+        # Mọi bản được khai báo trước nên hàm gọi được cả hàm định nghĩa sau nó
+        for stmt in top_level(root, True):
+            self.visit_def_function(stmt, emit=False)
+        self.exported = set(self.clones)
+        self._emit_pending()
+        if self.part not in (None, MAIN_PART):
+            return self.module
 
         # 2. Define Main Function
         func_ty = ir.FunctionType(ir.IntType(32), [])
         self.func = ir.Function(self.module, func_ty, name="main")
         entry_block = self.func.append_basic_block(name="entry")
         self.builder = ir.IRBuilder(entry_block)
+        self.func_name = "main"
+        self.local_types = self.var_types.get("main", {})
+        self.scope_body = lambda: top_level(root, False)
+        self.scope_reads = None
 
         self.scopes.append({}) # Push Main Scope
 
         # 3. Second Pass: Process Main Body (Skip def_function nodes)
-        for child in root_node.children:
-            if child.data.type != TokType.def_function:
-                self.visit(child)
+        for stmt in top_level(root, False):
+            self.visit(stmt)
 
         # 4. Terminate Main
         if not self.builder.block.is_terminated:
-            self.builder.ret(ir.Constant(ir.IntType(32), 0))
+            self._exit_main()
         
         self.scopes.pop()
+
+        # Bản boxed mà main cần nhưng type_infer không dự đoán được
+        self._emit_pending()
+        if self.profiler is not None:
+            self.profiler.finish()
+        if self.pgo_counters is not None:
+            self.pgo_counters.finish()
         return self.module
 
+    def _exit_main(self):
+        if self.profiler is not None:
+            self.builder.call(self.profiler.report, [])
+        if self.pgo_counters is not None:
+            self.builder.call(self.pgo_counters.dump, [])
+        self.builder.call(self.runtime.flush, [])
+        self.builder.ret(ir.Constant(ir.IntType(32), 0))
+
     def visit(self, node: Node):
         if node is None: return None
-        tok = node.data
+        return self.visitors[type(node)](node)
 
-        # --- BLOCKS & ROOT ---
-        if tok.type in [TokType.block, TokType.root]:
-            for child in node.children: self.visit(child)
-            return
+    def visit_body(self, body: list):
+        for stmt in body: self.visit(stmt)
 
-        # --- FUNCTIONS ---
-        elif tok.type == TokType.def_function:
-            return self.visit_def_function(node)
-        elif tok.type == TokType.function:
-            return self.visit_call_func(node)
-        if tok.type == TokType.return_stmt: 
-            return self.visit_return(node)
-
-        # --- BUILT-INS ---
-        elif tok.func == "input":
-            return self.visit_input(node)
-        elif tok.type == TokType.identifier and tok.func in ["print", "println"]:
-            return self.visit_print(node, is_newline=(tok.func == "println"))
-        
-        # --- CONTROL FLOW ---
-        elif tok.func == "if": return self.visit_if(node)
-        elif tok.func == "while": return self.visit_while(node)
-        elif tok.func == "for": return self.visit_for(node)
-
-        # --- ASSIGNMENT & VARS ---
-        elif tok.type == TokType.assignment:
-            return self.visit_assignment(node)
-        elif tok.type == TokType.identifier:
-            return self.visit_variable_load(node)
-        
-        # --- OPERATORS & LITERALS ---
-        elif tok.type == TokType.operator:
-            return self.visit_binary_op(node)
-
-        elif tok.type == TokType.number:
-            if tok.is_float: 
-                return (TYPE_FLOAT, ir.Constant(ir.DoubleType(), float(tok.float_value)))
-            return (TYPE_INT, ir.Constant(ir.IntType(64), int(tok.int_value if tok.int_value is not None else tok.float_value)))
-        
-        elif tok.type == TokType.string:
-            str_ptr = self._global_string(tok.string_value)
-            return (TYPE_STR, str_ptr)
-
-        elif tok.type in [TokType.value, TokType.condition, TokType.parameter]:
-            if node.children: return self.visit(node.children[0])
+    def visit_number(self, node: Num):
+        if node.is_float: 
+            return (TYPE_FLOAT, ir.Constant(ir.DoubleType(), float(node.value)))
+        return (TYPE_INT, ir.Constant(ir.IntType(64), node.value))
 
-        return None
+    def visit_string(self, node: Str):
+        str_ptr = self._global_string(node.value)
+        return (TYPE_STR, str_ptr)
 
     # ================= FUNCTION DEFINITION & CALL =================
 
-    def visit_def_function(self, node: Node):
-        func_name = node.children[0].data.func
-        param_node = node.children[1]
-        body_node = node.children[2]
-        
-        param_names = []
-        for p in param_node.children:
-            param_names.append(p.data.func)
+    def _native_type(self, typ):
+        """Kiểu LLVM của một giá trị truyền / trả về theo kiểu tĩnh"""
+        if typ == TYPE_INT: return ir.IntType(64)
+        if typ == TYPE_FLOAT: return ir.DoubleType()
+        if typ == TYPE_STR: return ir.IntType(8).as_pointer()
+        return self.var_struct_ty
+
+    def visit_def_function(self, node: FuncDef, emit=True):
+        """Khai báo mọi bản chuyên biệt hóa của hàm; thân hàm được sinh ngay
+        (emit) hoặc sau khi mọi hàm top-level đã được khai báo"""
+        self.func_defs[node.name] = node
+        specs = self.signatures.get(node.name)
+        if not specs:
+            specs = [Specialization(node.name, (TYPE_DYN,) * len(node.params))]
+        for spec in specs:
+            # FuncDef lồng trong hàm được gặp lại ở mỗi bản của hàm ngoài
+            if (node.name, spec.params) not in self.clones:
+                self._declare_clone(node.name, spec.params, spec.ret)
+
+        if emit: self._emit_pending()
+
+    def _declare_clone(self, func_name, params, ret_type):
+        """Tham số kiểu tĩnh đi bằng giá trị (i64 / double / i8*), tham số TYPE_DYN
+        là con trỏ tới var_struct. Kiểu trả về tĩnh trả thẳng giá trị,
+        còn lại trả var_struct theo giá trị"""
+        if ret_type is None: ret_type = TYPE_DYN
+        arg_types = [self.var_struct_ty.as_pointer() if t == TYPE_DYN else self._native_type(t) for t in params]
+        func_ty = ir.FunctionType(self._native_type(ret_type), arg_types)
+
+        func = ir.Function(self.module, func_ty, name=clone_name(func_name, params))
+        self.clones[(func_name, params)] = (func, ret_type)
+        self.pending.append((func_name, params))
+        return func, ret_type
+
+    def _emit_pending(self):
+        while self.pending:
+            func_name, params = self.pending.pop(0)
+            if self.part is not None:
+                if (func_name, params) in self.exported:
+                    if func_name != self.part: continue
+                else:
+                    self.clones[(func_name, params)][0].linkage = "internal"
+            self._emit_clone(func_name, params)
+
+    def _emit_clone(self, func_name, params):
+        node = self.func_defs[func_name]
+        func, ret_type = self.clones[(func_name, params)]
 
-        # Tham số đầu tiên luôn là pointer để chứa giá trị return
-        arg_types = [self.var_struct_ty.as_pointer()] * (len(param_names) + 1)
-        func_ty = ir.FunctionType(ir.VoidType(), arg_types)
-        
-        func = ir.Function(self.module, func_ty, name=func_name)
-        
         # Save context
         old_builder = self.builder
         old_func = self.func
-        old_ret_ptr = self.current_func_ret_ptr
+        old_func_name = self.func_name
+        old_ret_type = self.current_ret_type
+        old_types = self.local_types
+        old_memo_entry = self.memo_entry
+        old_loop_state = (self.induction, self.scope_body, self.scope_reads)
         
         entry = func.append_basic_block("entry")
         self.builder = ir.IRBuilder(entry)
         self.func = func
+        self.func_name = func_name
+        self.current_ret_type = ret_type
+        self.local_types = self.var_types.get(func.name, {})
+        self.memo_entry = None
+        self.induction = {}
+        self.scope_body = lambda: node.body
+        self.scope_reads = None
+
+        if self.profiler is not None:
+            self.profiler.enter_function(self.builder, func_name, node.line)
+        if node.memo:
+            self._memo_lookup(func, params, ret_type)
         
         # Setup Local Scope
-        func_scope = {}
-        
-        # Arg 0 là Return Slot
-        func.args[0].name = "ret_slot"
-        self.current_func_ret_ptr = func.args[0]
-        
-        # Các Arg còn lại là tham số hàm
-        for i, arg in enumerate(func.args[1:]): 
-            name = param_names[i]
+        self.scopes.append({})
+
+        for name, typ, arg in zip(node.params, params, func.args):
             arg.name = f"arg_{name}"
-            func_scope[name] = arg 
-            
-        self.scopes.append(func_scope)
-        self.visit(body_node)
+            if typ == TYPE_DYN:
+                # var_struct tạm của bên gọi được dùng luôn làm biến
+                self.scopes[-1][name] = arg
+            else:
+                self._create_var(name)
+                self._store_var(name, (typ, arg))
+
+        self.visit_body(node.body)
         
         if not self.builder.block.is_terminated:
-            self.builder.ret_void()
+            # Rơi khỏi cuối hàm: TYPE_NONE (hoặc 0 nếu kiểu trả về tĩnh)
+            self._return(ir.Constant(self._native_type(ret_type), None))
             
         # Restore context
         self.scopes.pop()
         self.builder = old_builder
         self.func = old_func
-        self.current_func_ret_ptr = old_ret_ptr
+        self.func_name = old_func_name
+        self.current_ret_type = old_ret_type
+        self.local_types = old_types
+        self.memo_entry = old_memo_entry
+        self.induction, self.scope_body, self.scope_reads = old_loop_state
+
+    def _return(self, result):
+        if self.memo_entry is not None:
+            self._memo_store(result)
+        self.builder.ret(result)
+
+    # ================= MEMO =================
+
+    def _memo_key(self, params, args):
+        """(giá trị i64, tag i8) của từng đối số: int theo giá trị, float theo bit,
+        str theo con trỏ, TYPE_NONE là 0"""
+        i64, i8 = ir.IntType(64), ir.IntType(8)
+        keys = []
+        for typ, arg in zip(params, args):
+            if typ == TYPE_INT:
+                keys.append((arg, ir.Constant(i8, TYPE_INT)))
+            elif typ == TYPE_FLOAT:
+                keys.append((self.builder.bitcast(arg, i64), ir.Constant(i8, TYPE_FLOAT)))
+            elif typ == TYPE_STR:
+                keys.append((self.builder.ptrtoint(arg, i64), ir.Constant(i8, TYPE_STR)))
+            else:
+                value = self.builder.load(arg)
+                tag = self.builder.extract_value(value, 0)
+                payload = ir.Constant(i64, 0)
+                for tag_value, field in ((TYPE_INT, self.builder.extract_value(value, 1)),
+                                         (TYPE_FLOAT, self.builder.bitcast(self.builder.extract_value(value, 2), i64)),
+                                         (TYPE_STR, self.builder.ptrtoint(self.builder.extract_value(value, 3), i64))):
+                    is_tag = self.builder.icmp_unsigned('==', tag, ir.Constant(i8, tag_value))
+                    payload = self.builder.select(is_tag, field, payload)
+                keys.append((payload, tag))
+        return keys
+
+    def _memo_lookup(self, func, params, ret_type):
+        """Tra bảng ở đầu hàm: trúng thì trả về ngay, trượt thì builder ở lại
+        block chạy thân hàm và memo_entry giữ chỗ để ghi kết quả"""
+        i8, i32, i64 = ir.IntType(8), ir.IntType(32), ir.IntType(64)
+        n = len(params)
+
+        # { i8 valid, [n x i64] giá trị, [n x i8] tag, kết quả }
+        entry_ty = ir.LiteralStructType([i8, ir.ArrayType(i64, n), ir.ArrayType(i8, n), self._native_type(ret_type)])
+        table_ty = ir.ArrayType(entry_ty, self.memo.size)
+        table = ir.GlobalVariable(self.module, table_ty, name=f"{func.name}.memo")
+        table.initializer = ir.Constant(table_ty, None)
+        table.linkage = func.linkage
+
+        keys = self._memo_key(params, func.args)
+
+        # Băm nhân (Fibonacci hashing), lấy các bit cao làm chỉ số
+        mult = ir.Constant(i64, 0x9E3779B97F4A7C15 - (1 << 64))
+        h = ir.Constant(i64, 0x2545F4914F6CDD1D)
+        for payload, tag in keys:
+            h = self.builder.mul(self.builder.xor(h, payload), mult)
+            h = self.builder.mul(self.builder.xor(h, self.builder.zext(tag, i64)), mult)
+        index = ir.Constant(i64, 0)
+        if self.memo.bits:
+            index = self.builder.lshr(h, ir.Constant(i64, 64 - self.memo.bits))
+        entry = self.builder.gep(table, [ir.Constant(i32, 0), index])
+
+        zero = ir.Constant(i32, 0)
+        valid = self.builder.load(self.builder.gep(entry, [zero, zero]))
+        hit = self.builder.icmp_unsigned('!=', valid, ir.Constant(i8, 0))
+        for i, ((payload, tag), typ) in enumerate(zip(keys, params)):
+            stored = self.builder.load(self.builder.gep(entry, [zero, ir.Constant(i32, 1), ir.Constant(i32, i)]))
+            hit = self.builder.and_(hit, self.builder.icmp_unsigned('==', stored, payload))
+            if typ == TYPE_DYN:
+                stored_tag = self.builder.load(self.builder.gep(entry, [zero, ir.Constant(i32, 2), ir.Constant(i32, i)]))
+                hit = self.builder.and_(hit, self.builder.icmp_unsigned('==', stored_tag, tag))
+
+        hit_block = self.func.append_basic_block("memo.hit")
+        miss_block = self.func.append_basic_block("memo.miss")
+        self.builder.cbranch(hit, hit_block, miss_block)
+
+        self.builder.position_at_end(hit_block)
+        self.builder.ret(self.builder.load(self.builder.gep(entry, [zero, ir.Constant(i32, 3)])))
+
+        self.builder.position_at_end(miss_block)
+        self.memo_entry = (entry, keys)
+
+    def _memo_store(self, result):
+        i8, i32 = ir.IntType(8), ir.IntType(32)
+        entry, keys = self.memo_entry
+        zero = ir.Constant(i32, 0)
+        valid_ptr = self.builder.gep(entry, [zero, zero])
+
+        def store():
+            self.builder.store(ir.Constant(i8, 1), valid_ptr)
+            for i, (payload, tag) in enumerate(keys):
+                self.builder.store(payload, self.builder.gep(entry, [zero, ir.Constant(i32, 1), ir.Constant(i32, i)]))
+                self.builder.store(tag, self.builder.gep(entry, [zero, ir.Constant(i32, 2), ir.Constant(i32, i)]))
+            self.builder.store(result, self.builder.gep(entry, [zero, ir.Constant(i32, 3)]))
+
+        if self.memo.policy == "keep":
+            # Chỗ đã có entry thì giữ nguyên, kết quả mới không được lưu
+            empty = self.builder.icmp_unsigned('==', self.builder.load(valid_ptr), ir.Constant(i8, 0))
+            with self.builder.if_then(empty):
+                store()
+        else:
+            store()
+
+    def _box(self, value):
+        """Giá trị đã visit -> var_struct (giá trị LLVM)"""
+        typ, i_val, f_val = self._extract_val(value)
+        str_val = None
+        if isinstance(value, tuple) and value[0] == TYPE_STR:
+            str_val = value[1]
+        elif isinstance(value, dict):
+            str_val = value.get("str")
+        if str_val is None:
+            str_val = ir.Constant(ir.IntType(8).as_pointer(), None)
+
+        result = ir.Constant(self.var_struct_ty, ir.Undefined)
+        for i, field in enumerate((typ, i_val, f_val, str_val)):
+            result = self.builder.insert_value(result, field, i)
+        return result
+
+    def _unbox(self, struct_val):
+        """var_struct (giá trị LLVM) -> giá trị động"""
+        return {
+            "is_var": True,
+            "type": self.builder.extract_value(struct_val, 0),
+            "int": self.builder.extract_value(struct_val, 1),
+            "flt": self.builder.extract_value(struct_val, 2),
+            "str": self.builder.extract_value(struct_val, 3)
+        }
 
-    def visit_return(self, node: Node):
-        val_raw = None
-        if len(node.children) > 0:
-            val_raw = self.visit(node.children[0])
-        
-        typ, i_val, f_val = self._extract_val(val_raw)
-        str_val = val_raw.get("str") if isinstance(val_raw, dict) else None
-        
-        ptr = self.current_func_ret_ptr
-        if ptr:
-            idx0 = ir.Constant(ir.IntType(32), 0)
-            p_type = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
-            p_int  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
-            p_flt  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 2)])
-            p_str  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 3)])
-            
-            self.builder.store(typ, p_type)
-            self.builder.store(i_val, p_int)
-            self.builder.store(f_val, p_flt)
-            
-            if isinstance(val_raw, tuple) and val_raw[0] == TYPE_STR:
-                 self.builder.store(val_raw[1], p_str)
-            elif str_val:
-                 self.builder.store(str_val, p_str)
+    def visit_return(self, node: Return):
+        val_raw = self.visit(node.value)
         
-        self.builder.ret_void()
+        if self.func.name == "main":
+            # return ở top-level kết thúc chương trình
+            self._exit_main()
+            return
+
+        if self.current_ret_type == TYPE_DYN:
+            self._return(self._box(val_raw))
+        else:
+            self._return(self._to_static(val_raw, self.current_ret_type))
 
-    def visit_call_func(self, node: Node):
-        func_name = node.children[0].data.func
-        param_node = node.children[1]
+    def visit_call_func(self, node: Call):
+        func_name = node.name
         
-        if func_name not in self.module.globals:
+        if func_name not in self.func_defs:
             print(f"Error: Function '{func_name}' not defined.")
             return None 
-        
-        func_obj = self.module.globals[func_name]
-        ret_val_ptr = self.builder.alloca(self.var_struct_ty, name="call_ret_val")
-        
-        zero = ir.Constant(ir.IntType(8), 0)
-        t_ptr = self.builder.gep(ret_val_ptr, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)])
-        self.builder.store(zero, t_ptr)
-
-        call_args = [ret_val_ptr] 
 
-        for arg_expr in param_node.children:
+        args = []
+        for arg_expr in node.args:
             val_raw = self.visit(arg_expr)
-            if val_raw is None: 
-                tmp_dummy = self.builder.alloca(self.var_struct_ty)
-                call_args.append(tmp_dummy)
+            if val_raw is None:
+                val_raw = (TYPE_INT, ir.Constant(ir.IntType(64), 0))
+            args.append(val_raw)
+
+        # Chọn bản theo kiểu tĩnh của đối số, không có thì dùng bản boxed
+        params = tuple(arg[0] if isinstance(arg, tuple) else TYPE_DYN for arg in args)
+        if (func_name, params) not in self.clones:
+            params = (TYPE_DYN,) * len(params)
+            if (func_name, params) not in self.clones:
+                self._declare_clone(func_name, params, TYPE_DYN)
+        func_obj, ret_type = self.clones[(func_name, params)]
+
+        call_args = []
+        for val_raw, typ in zip(args, params):
+            if typ != TYPE_DYN:
+                call_args.append(val_raw[1])
                 continue
 
-            typ, i_val, f_val = self._extract_val(val_raw)
-            str_val = val_raw.get("str") if isinstance(val_raw, dict) else None
-            
-            tmp_ptr = self.builder.alloca(self.var_struct_ty)
-            idx0 = ir.Constant(ir.IntType(32), 0)
-            p_type = self.builder.gep(tmp_ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
-            p_int  = self.builder.gep(tmp_ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
-            p_flt  = self.builder.gep(tmp_ptr, [idx0, ir.Constant(ir.IntType(32), 2)])
-            p_str  = self.builder.gep(tmp_ptr, [idx0, ir.Constant(ir.IntType(32), 3)])
-            
-            self.builder.store(typ, p_type)
-            if i_val: self.builder.store(i_val, p_int)
-            if f_val: self.builder.store(f_val, p_flt)
-            
-            if isinstance(val_raw, tuple) and val_raw[0] == TYPE_STR:
-                 self.builder.store(val_raw[1], p_str)
-            elif str_val:
-                 self.builder.store(str_val, p_str)
-            
+            # var_struct tạm nằm ở entry block: gọi trong vòng lặp không làm lớn stack
+            with self.builder.goto_entry_block():
+                tmp_ptr = self.builder.alloca(self.var_struct_ty)
+            self.builder.store(self._box(val_raw), tmp_ptr)
             call_args.append(tmp_ptr)
 
-        self.builder.call(func_obj, call_args)
-        
-        idx0 = ir.Constant(ir.IntType(32), 0)
-        res_type_ptr = self.builder.gep(ret_val_ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
-        res_int_ptr  = self.builder.gep(ret_val_ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
-        res_flt_ptr  = self.builder.gep(ret_val_ptr, [idx0, ir.Constant(ir.IntType(32), 2)])
-        res_str_ptr  = self.builder.gep(ret_val_ptr, [idx0, ir.Constant(ir.IntType(32), 3)])
-
-        return {
-            "is_var": True,
-            "type": self.builder.load(res_type_ptr),
-            "int": self.builder.load(res_int_ptr),
-            "flt": self.builder.load(res_flt_ptr),
-            "str": self.builder.load(res_str_ptr)
-        }
+        if self.profiler is not None:
+            result = self.profiler.call(self.builder, func_name, node.line, self.func_name,
+                                        lambda: self.builder.call(func_obj, call_args))
+        else:
+            result = self.builder.call(func_obj, call_args)
+        if ret_type == TYPE_DYN:
+            return self._unbox(result)
+        return (ret_type, result)
 
     # ================= LOGIC: INPUT =================
 
-    def visit_input(self, node: Node):
-        type_node = node.children[0]
-        var_node = node.children[1]
-        
-        target_type = type_node.data.func 
-        var_name = var_node.data.func
+    def visit_input(self, node: Input):
+        target_type = node.type_name
+        var_name = node.name
 
-        if len(node.children) > 2:
-            prompt_str = node.children[2].data.string_value
+        if node.prompt is not None:
+            prompt_str = node.prompt
             prompt_ptr = self._global_string(prompt_str)
-            self.builder.call(self.printf, [self.fmt_str, prompt_ptr])
-            null_ptr = ir.Constant(ir.IntType(64), 0).inttoptr(ir.IntType(8).as_pointer())
-            self.builder.call(self.fflush, [null_ptr])
+            self.builder.call(self.runtime.put_str, [prompt_ptr])
+
+        # Output đang nằm trong buffer (kể cả prompt) phải hiện ra trước khi đọc
+        self.builder.call(self.runtime.flush, [])
 
         ptr = self._get_var_ptr(var_name)
         if not ptr:
             ptr = self._create_var(var_name)
 
+        rt = self.runtime
+        slot_type = self._slot_type(ptr)
+        if slot_type != TYPE_DYN:
+            # type_infer only gives a static slot when it matches target_type
+            if slot_type == TYPE_INT:
+                self.builder.call(rt.read_int, [ptr])
+            elif slot_type == TYPE_FLOAT:
+                self.builder.call(rt.read_float, [ptr])
+            elif slot_type == TYPE_STR:
+                self.builder.call(rt.read_str, [ptr])
+            return
+
         idx0 = ir.Constant(ir.IntType(32), 0)
         type_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
         int_ptr  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
@@ -354,34 +592,37 @@ class LLVMCodeGen:
         str_ptr  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 3)])
 
         if target_type == "int":
-            self.builder.call(self.scanf, [self.scan_int, int_ptr])
+            self.builder.call(rt.read_int, [int_ptr])
             self.builder.store(ir.Constant(ir.IntType(8), TYPE_INT), type_ptr)
             
         elif target_type == "float":
-            self.builder.call(self.scanf, [self.scan_float, flt_ptr])
+            self.builder.call(rt.read_float, [flt_ptr])
             self.builder.store(ir.Constant(ir.IntType(8), TYPE_FLOAT), type_ptr)
 
         elif target_type == "str":
-            size = ir.Constant(ir.IntType(64), 256)
-            mem = self.builder.call(self.malloc, [size])
-            self.builder.call(self.scanf, [self.scan_str, mem])
-            self.builder.store(mem, str_ptr)
+            self.builder.call(rt.read_str, [str_ptr])
             self.builder.store(ir.Constant(ir.IntType(8), TYPE_STR), type_ptr)
 
     # ================= LOGIC: ASSIGNMENT =================
 
-    def visit_assignment(self, node: Node):
-        var_name = node.children[0].data.func
-        val_node = node.children[1]
-        
-        result = self.visit(val_node.children[0])
+    def visit_assignment(self, node: Assign):
+        result = self.visit(node.value)
         if result is None: return
+
+        self._store_var(node.name, result, node.type_name)
+
+    def _store_var(self, var_name, result, forced_type=""):
+
+        ptr = self._get_var_ptr(var_name)
+        if not ptr:
+            ptr = self._create_var(var_name)
+
+        slot_type = self._slot_type(ptr)
+        if slot_type != TYPE_DYN:
+            self.builder.store(self._to_static(result, slot_type), ptr)
+            return
         
         rhs_type, rhs_int, rhs_flt = self._extract_val(result)
-
-        forced_type = ""
-        if len(node.children) > 2:
-            forced_type = node.children[2].data.func
             
         if forced_type == "int":
             new_int = self._val_to_int((rhs_type, rhs_int, rhs_flt))
@@ -389,10 +630,6 @@ class LLVMCodeGen:
             rhs_int = new_int
             rhs_flt = ir.Constant(ir.DoubleType(), 0.0)
 
-        ptr = self._get_var_ptr(var_name)
-        if not ptr:
-            ptr = self._create_var(var_name)
-
         idx0 = ir.Constant(ir.IntType(32), 0)
         type_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
         int_ptr  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
@@ -408,13 +645,20 @@ class LLVMCodeGen:
         elif isinstance(result, dict) and result.get("str"):
              self.builder.store(result["str"], str_ptr)
 
-    def visit_variable_load(self, node: Node):
-        var_name = node.data.func
+    def visit_variable_load(self, node: Var):
+        var_name = node.name
+        if var_name in self.induction:
+            return (TYPE_INT, self.induction[var_name])
+
         ptr = self._get_var_ptr(var_name)
         
         if not ptr:
             return (TYPE_INT, ir.Constant(ir.IntType(64), 0))
 
+        slot_type = self._slot_type(ptr)
+        if slot_type != TYPE_DYN:
+            return (slot_type, self.builder.load(ptr, name=var_name))
+
         idx0 = ir.Constant(ir.IntType(32), 0)
         type_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
         int_ptr  = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
@@ -442,16 +686,19 @@ class LLVMCodeGen:
             elif typ == TYPE_FLOAT:
                 return (ir.Constant(ir.IntType(8), TYPE_FLOAT), ir.Constant(ir.IntType(64), 0), val)
             elif typ == TYPE_STR:
-                return (ir.Constant(ir.IntType(8), TYPE_STR), None, None) 
+                return (ir.Constant(ir.IntType(8), TYPE_STR), ir.Constant(ir.IntType(64), 0), ir.Constant(ir.DoubleType(), 0.0))
         elif isinstance(operand, dict) and operand.get("is_var"):
             return (operand["type"], operand["int"], operand["flt"])
             
         return (ir.Constant(ir.IntType(8), TYPE_INT), ir.Constant(ir.IntType(64), 0), ir.Constant(ir.DoubleType(), 0.0))
 
-    def visit_binary_op(self, node: Node):
-        lhs_raw = self.visit(node.children[0])
-        rhs_raw = self.visit(node.children[1])
-        op = node.data.operator
+    def visit_binary_op(self, node: BinOp):
+        lhs_raw = self.visit(node.lhs)
+        rhs_raw = self.visit(node.rhs)
+        op = node.op
+
+        if self._is_static_num(lhs_raw) and self._is_static_num(rhs_raw):
+            return self._static_binary_op(op, lhs_raw, rhs_raw)
 
         l_type, l_int, l_flt = self._extract_val(lhs_raw)
         r_type, r_int, r_flt = self._extract_val(rhs_raw)
@@ -511,6 +758,46 @@ class LLVMCodeGen:
             "str": None
         }
     
+    def _is_static_num(self, operand):
+        return isinstance(operand, tuple) and operand[0] in (TYPE_INT, TYPE_FLOAT)
+
+    def _static_binary_op(self, op, lhs, rhs):
+        """Binary op on operands whose types are known at compile time: no tag checks, no selects"""
+        preds = {Operators.equals: '==', Operators.same: '==', Operators.different: '!=', 
+                 Operators.less: '<', Operators.less_same: '<=', Operators.greater: '>', Operators.greater_same: '>='}
+
+        if lhs[0] == TYPE_INT and rhs[0] == TYPE_INT:
+            l_val, r_val = lhs[1], rhs[1]
+
+            if op == Operators.add: return (TYPE_INT, self.builder.add(l_val, r_val))
+            if op == Operators.subtract: return (TYPE_INT, self.builder.sub(l_val, r_val))
+            if op == Operators.multiply: return (TYPE_INT, self.builder.mul(l_val, r_val))
+            if op == Operators.divide: return (TYPE_INT, self.builder.sdiv(l_val, r_val))
+            if op == Operators.remainder: return (TYPE_INT, self.builder.srem(l_val, r_val))
+            if op == Operators.power:
+                l_val_f = self.builder.sitofp(l_val, ir.DoubleType())
+                r_val_f = self.builder.sitofp(r_val, ir.DoubleType())
+                res_f = self.builder.call(self.pow, [l_val_f, r_val_f])
+                return (TYPE_INT, self.builder.fptosi(res_f, ir.IntType(64)))
+            if op in preds:
+                cmp = self.builder.icmp_signed(preds[op], l_val, r_val)
+                return (TYPE_INT, self.builder.zext(cmp, ir.IntType(64)))
+            return (TYPE_INT, ir.Constant(ir.IntType(64), 0))
+
+        l_val = lhs[1] if lhs[0] == TYPE_FLOAT else self.builder.sitofp(lhs[1], ir.DoubleType())
+        r_val = rhs[1] if rhs[0] == TYPE_FLOAT else self.builder.sitofp(rhs[1], ir.DoubleType())
+
+        if op == Operators.add: return (TYPE_FLOAT, self.builder.fadd(l_val, r_val))
+        if op == Operators.subtract: return (TYPE_FLOAT, self.builder.fsub(l_val, r_val))
+        if op == Operators.multiply: return (TYPE_FLOAT, self.builder.fmul(l_val, r_val))
+        if op == Operators.divide: return (TYPE_FLOAT, self.builder.fdiv(l_val, r_val))
+        if op == Operators.remainder: return (TYPE_FLOAT, self.builder.frem(l_val, r_val))
+        if op == Operators.power: return (TYPE_FLOAT, self.builder.call(self.pow, [l_val, r_val]))
+        if op in preds:
+            cmp = self.builder.fcmp_ordered(preds[op], l_val, r_val)
+            return (TYPE_INT, self.builder.zext(cmp, ir.IntType(64)))
+        return (TYPE_FLOAT, ir.Constant(ir.DoubleType(), 0.0))
+
     def _val_to_int(self, val_data):
         typ, i_val, f_val = val_data
         is_float = self.builder.icmp_signed('==', typ, ir.Constant(ir.IntType(8), TYPE_FLOAT))
@@ -520,69 +807,70 @@ class LLVMCodeGen:
 
     # ================= PRINT =================
 
-    def visit_print(self, node: Node, is_newline=False):
-        for child in node.children:
+    def visit_print(self, node: Print):
+        rt = self.runtime
+        for child in node.args:
             val_raw = self.visit(child)
             if val_raw is None: continue
 
             if isinstance(val_raw, tuple) and val_raw[0] == TYPE_STR:
-                fmt = self.fmt_str_nl if is_newline else self.fmt_str
-                self.builder.call(self.printf, [fmt, val_raw[1]])
-                null_ptr = ir.Constant(ir.IntType(64), 0).inttoptr(ir.IntType(8).as_pointer())
-                self.builder.call(self.fflush, [null_ptr])
-                continue
-
-            data = self._extract_val(val_raw)
-            typ, i_val, f_val = data
-            str_val = val_raw.get("str") if isinstance(val_raw, dict) else None
-
-            is_int = self.builder.icmp_signed('==', typ, ir.Constant(ir.IntType(8), TYPE_INT))
-            with self.builder.if_then(is_int):
-                fmt = self.fmt_int_nl if is_newline else self.fmt_int
-                self.builder.call(self.printf, [fmt, i_val])
-
-            is_flt = self.builder.icmp_signed('==', typ, ir.Constant(ir.IntType(8), TYPE_FLOAT))
-            with self.builder.if_then(is_flt):
-                fmt = self.fmt_float_nl if is_newline else self.fmt_float
-                self.builder.call(self.printf, [fmt, f_val])
-                
-            if str_val:
-                is_str = self.builder.icmp_signed('==', typ, ir.Constant(ir.IntType(8), TYPE_STR))
-                with self.builder.if_then(is_str):
-                    fmt = self.fmt_str_nl if is_newline else self.fmt_str
-                    self.builder.call(self.printf, [fmt, str_val])
-
-            null_ptr = ir.Constant(ir.IntType(64), 0).inttoptr(ir.IntType(8).as_pointer())
-            self.builder.call(self.fflush, [null_ptr])
+                self.builder.call(rt.put_str, [val_raw[1]])
+            elif self._is_static_num(val_raw):
+                put = rt.put_int if val_raw[0] == TYPE_INT else rt.put_float
+                self.builder.call(put, [val_raw[1]])
+            else:
+                typ, i_val, f_val = self._extract_val(val_raw)
+                str_val = val_raw.get("str") if isinstance(val_raw, dict) else None
+                if str_val is None:
+                    str_val = ir.Constant(ir.IntType(8).as_pointer(), None)
+                self.builder.call(rt.put_value, [typ, i_val, f_val, str_val])
+
+            if node.newline:
+                self.builder.call(rt.put_char, [ir.Constant(ir.IntType(8), ord("\n"))])
+
+        if self.line_buffered:
+            self.builder.call(rt.flush, [])
 
     # ================= CONTROL FLOW =================
+
+    def _cbranch(self, node: Node, kind, cond, if_true, if_false):
+        """Lệnh rẽ nhánh của if / while / for, kèm bộ đếm (-pgo-gen)
+        hoặc branch weights (-pgo-use)"""
+        index = self.branch_count
+        self.branch_count += 1
+        if self.pgo_counters is not None:
+            self.pgo_counters.count(self.builder, index, kind, self.func_name, node.line, cond)
+        branch = self.builder.cbranch(cond, if_true, if_false)
+        if self.pgo_profile is not None:
+            weights = self.pgo_profile.weights(index, kind, self.func_name, node.line)
+            if weights is not None:
+                branch.set_weights(weights)
+        return branch
     
-    def visit_if(self, node: Node):
-        cond_raw = self.visit(node.children[0])
+    def visit_if(self, node: If):
+        cond_raw = self.visit(node.cond)
         data = self._extract_val(cond_raw)
 
         bool_val = self.builder.icmp_signed('!=', data[1], ir.Constant(ir.IntType(64), 0))
 
         then_block = self.func.append_basic_block("if.then")
         merge_block = self.func.append_basic_block("if.end")
-        else_node = node.children[2] if len(node.children) > 2 else None
-        else_block = self.func.append_basic_block("if.else") if else_node else None
+        else_block = self.func.append_basic_block("if.else") if node.else_body is not None else None
 
-        if else_block: self.builder.cbranch(bool_val, then_block, else_block)
-        else: self.builder.cbranch(bool_val, then_block, merge_block)
+        self._cbranch(node, "if", bool_val, then_block, else_block if else_block else merge_block)
 
         self.builder.position_at_end(then_block)
-        self.visit(node.children[1])
+        self.visit_body(node.then_body)
         if not self.builder.block.is_terminated: self.builder.branch(merge_block)
 
         if else_block:
             self.builder.position_at_end(else_block)
-            self.visit(else_node)
+            self.visit_body(node.else_body)
             if not self.builder.block.is_terminated: self.builder.branch(merge_block)
     
         self.builder.position_at_end(merge_block)
 
-    def visit_while(self, node: Node):
+    def visit_while(self, node: While):
         cond_block = self.func.append_basic_block("while.cond")
         body_block = self.func.append_basic_block("while.body")
         end_block = self.func.append_basic_block("while.end")
@@ -590,36 +878,51 @@ class LLVMCodeGen:
         self.builder.branch(cond_block)
         self.builder.position_at_end(cond_block)
 
-        cond_raw = self.visit(node.children[0].children[0])
+        cond_raw = self.visit(node.cond)
         data = self._extract_val(cond_raw)
         bool_val = self.builder.icmp_signed('!=', data[1], ir.Constant(ir.IntType(64), 0))
         
-        self.builder.cbranch(bool_val, body_block, end_block)
+        self._cbranch(node, "while", bool_val, body_block, end_block)
 
         self.builder.position_at_end(body_block)
-        self.visit(node.children[1])
-        if not self.builder.block.is_terminated: self.builder.branch(cond_block)
+        self.visit_body(node.body)
+        if not self.builder.block.is_terminated:
+            if self.profiler is not None:
+                self.profiler.back_edge(self.builder, "while", node.line, self.func_name)
+            self.builder.branch(cond_block)
 
         self.builder.position_at_end(end_block)
 
-    def visit_for(self, node: Node):
-        param = node.children[0]
-        init_node = param.children[0] 
-
-        self.visit(init_node) 
-        
-        var_name = init_node.children[0].data.func
-        
-        end_raw = self.visit(param.children[1])
-        end_data = self._extract_val(end_raw)
-        end_val = self._val_to_int(end_data) 
-
-        step_val = ir.Constant(ir.IntType(64), 1)
-        if len(param.children) > 2:
-            step_raw = self.visit(param.children[2])
-            step_data = self._extract_val(step_raw)
-            step_val = self._val_to_int(step_data) 
-
+    def _read_count(self, name, nodes):
+        return sum(1 for n in walk(nodes) if type(n) is Var and n.name == name)
+
+    def _escapes(self, node: For):
+        """Biến lặp có được đọc ở ngoài thân vòng lặp không (trong cùng scope)"""
+        if self.scope_reads is None:
+            self.scope_reads = {}
+            for n in walk(list(self.scope_body())):
+                if type(n) is Var:
+                    self.scope_reads[n.name] = self.scope_reads.get(n.name, 0) + 1
+        return self.scope_reads.get(node.var, 0) > self._read_count(node.var, node.body)
+
+    def visit_for(self, node: For):
+        """for i = start, stop, step: vòng lặp đếm với biến lặp i64 trong thanh ghi.
+        start / stop / step được tính một lần, chiều so sánh theo dấu của step
+        (step > 0: i <= stop, ngược lại i >= stop). Thân vòng lặp đọc i thẳng từ
+        phi; i chỉ được ghi vào biến khi thân vòng lặp gán lại i (giá trị mới
+        chỉ thấy được trong lần lặp đó) hoặc khi i được đọc sau vòng lặp"""
+        var_name = node.var
+        i64 = ir.IntType(64)
+
+        start_val = self._to_static(self.visit(node.start), TYPE_INT)
+        stop_val = self._to_static(self.visit(node.stop), TYPE_INT)
+        step_val = self._to_static(self.visit(node.step), TYPE_INT)
+
+        written = any((type(n) in (Assign, Input) and n.name == var_name) or (type(n) is For and n.var == var_name)
+                      for n in walk(node.body))
+        escapes = self._escapes(node)
+
+        pre_block = self.builder.block
         cond_block = self.func.append_basic_block("for.cond")
         body_block = self.func.append_basic_block("for.body")
         end_block = self.func.append_basic_block("for.end")
@@ -628,57 +931,116 @@ class LLVMCodeGen:
         
         # --- COND BLOCK ---
         self.builder.position_at_end(cond_block)
-        
-        ptr = self._get_var_ptr(var_name)
-        idx0 = ir.Constant(ir.IntType(32), 0)
-        t_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 0)])
-        i_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 1)])
-        f_ptr = self.builder.gep(ptr, [idx0, ir.Constant(ir.IntType(32), 2)])
-        
-        cur_type = self.builder.load(t_ptr)
-        cur_int = self.builder.load(i_ptr)
-        cur_flt = self.builder.load(f_ptr)
-        
-        curr_i = self._val_to_int((cur_type, cur_int, cur_flt))
-        
-        cmp = self.builder.icmp_signed('<=', curr_i, end_val)
-        self.builder.cbranch(cmp, body_block, end_block)
+        curr_i = self.builder.phi(i64, name=var_name)
+        curr_i.add_incoming(start_val, pre_block)
+
+        if isinstance(step_val, ir.Constant):
+            cmp = self.builder.icmp_signed('<=' if step_val.constant > 0 else '>=', curr_i, stop_val)
+        else:
+            going_up = self.builder.icmp_signed('>', step_val, ir.Constant(i64, 0))
+            cmp = self.builder.select(going_up,
+                                      self.builder.icmp_signed('<=', curr_i, stop_val),
+                                      self.builder.icmp_signed('>=', curr_i, stop_val))
+        self._cbranch(node, "for", cmp, body_block, end_block)
         
         # --- BODY BLOCK ---
         self.builder.position_at_end(body_block)
-        self.visit(node.children[1]) 
+        if written:
+            self._store_var(var_name, (TYPE_INT, curr_i))
+            self.visit_body(node.body)
+        else:
+            old_induction = self.induction.get(var_name)
+            self.induction[var_name] = curr_i
+            self.visit_body(node.body)
+            if old_induction is None: del self.induction[var_name]
+            else: self.induction[var_name] = old_induction
         
         # --- UPDATE STEP ---
-        new_i = self.builder.add(curr_i, step_val)
-        self.builder.store(new_i, i_ptr)
-        self.builder.store(ir.Constant(ir.IntType(8), TYPE_INT), t_ptr)
-        self.builder.branch(cond_block)
+        if not self.builder.block.is_terminated:
+            if self.profiler is not None:
+                self.profiler.back_edge(self.builder, "for", node.line, self.func_name)
+            curr_i.add_incoming(self.builder.add(curr_i, step_val), self.builder.block)
+            self.builder.branch(cond_block)
         
         # --- END BLOCK ---
         self.builder.position_at_end(end_block)
+        if escapes:
+            self._store_var(var_name, (TYPE_INT, curr_i))
 
-def emit_llvm(ast):
-    codegen = LLVMCodeGen()
-    return codegen.generate_ir(ast)
-
-def run_jit(llvm_ir):
-    try:
-        llvm_module = binding.parse_assembly(str(llvm_ir))
-        llvm_module.verify()
-    except Exception as e:
-        print(f"LLVM Parse Error: {e}")
-        return
-        
+def emit_llvm(ast, var_types=None, line_buffered=False, memo: MemoOptions = None, profile=False,
+              pgo_gen=False, pgo_use: PGOProfile = None):
+    codegen = LLVMCodeGen(line_buffered, memo, profile=profile, pgo_gen=pgo_gen, pgo_use=pgo_use)
+    return codegen.generate_ir(ast, var_types)
+
+# === BACKEND ===
+# Module của llvmlite.ir được chuyển sang binding một lần duy nhất (trong bộ nhớ),
+# tối ưu bằng pass manager của LLVM (xem optimize.py) rồi sinh thẳng object file
+# bằng TargetMachine. Trình biên dịch C chỉ còn được gọi cho bước link cuối cùng.
+
+def create_target_machine(opt=2):
+    init_llvm()
+    target = binding.Target.from_default_triple()
+    # PIC để object link được với toolchain mặc định tạo PIE
+    return target.create_target_machine(opt=opt, reloc="pic", codemodel="default")
+
+def to_binding_module(llvm_ir, target_machine=None):
+    """llvmlite.ir.Module -> binding.ModuleRef đã verify"""
+    init_llvm()
+    llvm_module = binding.parse_assembly(str(llvm_ir))
+    llvm_module.verify()
+    if target_machine is not None:
+        llvm_module.triple = target_machine.triple
+        llvm_module.data_layout = str(target_machine.target_data)
+    return llvm_module
+
+def compile_object(llvm_ir, options: OptOptions = None, assembly=False, target_machine=None,
+                   phases: PhaseTimer = None):
+    """Sinh object file (bytes), hoặc assembly (str) nếu assembly=True.
+    target_machine (tạo theo options.level) dùng lại được giữa nhiều lần gọi.
+    llvm_ir là llvmlite.ir.Module hoặc IR dạng text; phases đo từng bước (-time-phases)"""
+    if options is None: options = OptOptions()
+    if phases is None: phases = PhaseTimer()
+    if target_machine is None:
+        target_machine = create_target_machine(options.level)
+    with phases.phase("parse_assembly"):
+        llvm_module = to_binding_module(llvm_ir, target_machine)
+    with phases.phase("optimize"):
+        llvm_module = run_passes(llvm_module, target_machine, options)
+    if phases.mode is not None:
+        functions, instructions = ir_counts(llvm_module)
+        phases.count("optimized IR functions", functions)
+        phases.count("optimized IR instructions", instructions)
+    with phases.phase("codegen"):
+        if assembly:
+            return target_machine.emit_assembly(llvm_module)
+        return target_machine.emit_object(llvm_module)
+
+def run_jit(object_data: bytes | list = None, llvm_ir=None, options: OptOptions = None, object_cache=None):
+    """Chạy main() bằng MCJIT: nạp object có sẵn (compile_object, cache, hoặc
+    list các object của parallel.compile_parallel),
+    hoặc tối ưu llvm_ir rồi để MCJIT sinh mã, qua object_cache nếu có
+    (đối tượng có getbuffer / notify, xem cache.JITObjectCache)"""
     # --- JIT Library Resolver Fix (Must Load OS Libraries First) ---
+    # Trên Linux/macOS libc đã có sẵn trong process, MCJIT tự tìm được read/write
     if os.name == 'nt':
         binding.load_library_permanently("msvcrt.dll")
+
+    if options is None: options = OptOptions()
+    target_machine = create_target_machine(options.level)
+    if object_data is not None:
+        llvm_module = binding.parse_assembly("")
     else:
-        binding.load_library_permanently(None)
+        llvm_module = run_passes(to_binding_module(llvm_ir, target_machine), target_machine, options)
 
-    target = binding.Target.from_default_triple()
-    target_machine = target.create_target_machine()
     with binding.create_mcjit_compiler(llvm_module, target_machine) as ee:
+        if object_data is not None:
+            for data in (object_data if isinstance(object_data, list) else [object_data]):
+                ee.add_object_file(binding.ObjectFileRef.from_data(data))
+        elif object_cache is not None:
+            ee.set_object_cache(object_cache.notify, object_cache.getbuffer)
         ee.finalize_object()
         func_ptr = ee.get_function_address("main")
         c_main = ctypes.CFUNCTYPE(ctypes.c_int32)(func_ptr)
-        c_main()
\ No newline at end of file
+        # Chương trình ghi thẳng ra fd 1: output của Python phải ra trước
+        sys.stdout.flush()
+        c_main()
@@ -1,11 +1,18 @@
-import subprocess
 import sys
 import os
 from lexer import lexer
 from parse import *
-from llvm_code_gen import emit_llvm, run_jit
+from type_infer import infer_types
+from simplify import simplify
+from optimize import OptOptions, pass_names
+from memo import MemoOptions, check_memo, evict_policies
+from check import check_functions
+from const import VERSION
+from phases import PhaseTimer, time_phases_mode, ir_counts
 
-dev = False
+# llvmlite (và mọi module dùng nó: llvm_code_gen, cache, lazy_jit, parallel,
+# batch, server) cùng linker và bench chỉ được import ở nhánh cần tới nó: -p, -help,
+# -version và phần front end không phải trả chi phí nạp / khởi tạo LLVM.
 
 def get_argv():
     flags = {}
@@ -16,7 +23,7 @@ def get_argv():
         arg = sys.argv[i]
         if arg[0] == "-":
             flags[arg] = {}
-            if (arg == "-o"):
+            if (arg == "-o" or arg == "-pgo-use") and i + 1 < len(sys.argv):
                 flags[arg]["inp"] = sys.argv[i+1]
                 i+=1
         else:
@@ -28,35 +35,72 @@ def get_argv():
     if "-help" in flags:
         print(
 """Use laetus [input_file] [flag1] [flag2] ... 
+    laetus build [file1] [file2] ... [-j <n>] [-o <dir>] [flags]
+                    Compile many files with <n> worker processes (default: all cores),
+                    each into its own output next to the source (or in <dir>)
+    laetus serve [-socket <path>] [-j <n>] [-idle-timeout=<s>] [-run-timeout=<s>] [-no-cache]
+                    Run a compile server on a Unix socket; send it work with
+                    python client.py [input_file] [-jit | -c | -s] [-o <file>] [flags]
+    laetus bench [dir | file.lae] ... [-runs <n>] [-warmup <n>] [-modes=jit,exe,py,cpp]
+                 [-json <file>] [-tsv <file>] [-baseline <file> [-save-baseline]] [flags]
+                    Run the .lae / .py / .cpp benchmarks (default benchmarks/18-jan-26-benchmarks),
+                    check their outputs agree and fail on a slowdown against the baseline
 -help               Display this information
 -version            Display the version
 -s                  Compile only; do not assemble or link
 -c                  Compile and assemble, but do not link
 -p                  Parse only; do not assemble or link or compile
 -temp               Keep the temp files
+-O0 -O1 -O2 -O3     Optimization level (default -O2), for both executables and -jit
+-Os -Oz             Optimize for size
+-f<pass>            Enable an optimization pass
+-fno-<pass>         Disable an optimization pass
+                    passes: """ + " ".join(pass_names) + """
+-jit                Run the program with the JIT
+-jit-lazy           JIT that compiles each function on its first call (ORC)
+-jit-bg             With -jit-lazy, also compile functions ahead in a background thread
+-jit-tiered         Start in a bytecode interpreter, JIT-compile hot functions and loops
+-parallel[=<n>]     Compile each function in its own module, in <n> processes (default: all cores)
+-line-buffered      Write output after every print (for interactive programs)
+-memo-size=<n>      Entries in the table of each memo function (default 4096)
+-memo-evict=<p>     What a memo table does on a collision: """ + " | ".join(evict_policies) + """
+-no-cache           Always recompile, do not read or write the compile cache
+-cache-stats        Display compile cache statistics
+-profile            Count calls of each function, loop iterations and call cycles;
+                    the table is written to stderr when the program ends
+-pgo-gen            Build a program that counts its branches and writes them to
+                    laetus.profdata (or $LAETUS_PROFILE_FILE) when it ends
+-pgo-use <file>     Optimize with the branch profile in <file> (use the same flags as -pgo-gen)
+-time-phases[=json] Print time, CPU time and peak Python memory of each compiler phase
+                    to stderr, with token / AST / IR counts (implies -no-cache)
+-arena              Store the AST in a flat arena (lower memory for very large programs)
 -o <file>           Place the output into <file>""")
         return -1, flags
-    if input_file == "":
-        print("ERROR:","No input file.")
-        return -1,flags
+    if "-version" in flags:
+        print("laetus", VERSION)
+        return -1, flags
+    if input_file == "" and "-cache-stats" in flags:
+        return -1, flags
     return [input_file, flags]
 
-def resource_path(relative_path):
-    if dev:
-        if hasattr(sys, "_MEIPASS"):
-            return os.path.join(sys._MEIPASS, relative_path)
-        return os.path.join(os.path.abspath("."), relative_path)
-    else:
-        return "clang"
-clang_path = resource_path("clang/bin/clang.exe")
-
 def laetus():
     file_name,flags = get_argv()
 
+    if "-cache-stats" in flags:
+        from cache import open_cache, default_cache_dir
+        cache = open_cache()
+        if cache is None:
+            print("ERROR:", f"Cannot use the cache directory {default_cache_dir()}")
+        else:
+            print(cache.report())
+
     if "-help" in flags:return
 
     if file_name == -1:
         return
+    if file_name == "":
+        print("ERROR:","No input file.")
+        return 1
     
     file_content = ""
     try: 
@@ -67,59 +111,250 @@ def laetus():
 
     file_content += "\n"
 
-    tokens = lexer(file_content)
-    print(tokens)
+    opt_options, error = OptOptions.from_flags(flags)
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    memo_options, error = MemoOptions.from_flags(flags)
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    mode, error = time_phases_mode(flags)
+    if error:
+        print("ERROR:", error)
+        return 1
+    phases = PhaseTimer(mode)
 
-    if "-dev" in flags:
-        print("START_TOK")
+    pgo_gen = "-pgo-gen" in flags
+    pgo_profile = None
+    pgo_path = flags["-pgo-use"].get("inp") if "-pgo-use" in flags else None
+    for flag in flags:
+        if flag.startswith("-pgo-use="): pgo_path = flag[len("-pgo-use="):]
+    if "-pgo-use" in flags and pgo_path is None:
+        print("ERROR:", "Missing profile file after -pgo-use")
+        return 1
+    if pgo_path is not None:
+        if pgo_gen:
+            print("ERROR:", "-pgo-gen and -pgo-use cannot be used together")
+            return 1
+        from pgo import PGOProfile
+        pgo_profile, error = PGOProfile.load(pgo_path)
+        if error:
+            print("ERROR:", error)
+            return 1
 
-        for token in tokens:
-            print(token)
+    jobs = None
+    if any(flag.startswith("-parallel") for flag in flags):
+        from parallel import parallel_jobs
+        jobs, error = parallel_jobs(flags)
+        if error:
+            print("ERROR:", error)
+            return 1
 
-        print("END_TOK")
+    # exe / object / JIT đều dùng chung object đã tối ưu
+    # (-jit-tiered chạy thẳng từ AST, không dùng object)
+    want_tiered = not ("-p" in flags) and "-jit-tiered" in flags
+    want_asm = not ("-p" in flags) and ("-s" in flags) and not want_tiered
+    want_object = not ("-p" in flags) and not ("-s" in flags) and not want_tiered
+    want_lazy_jit = "-jit-lazy" in flags and not want_tiered
+    want_jit = "-jit" in flags and not want_lazy_jit and not want_tiered
+    if want_asm or want_object or want_jit or want_lazy_jit:
+        from llvm_code_gen import emit_llvm, compile_object, run_jit
 
-        if "-noparse" in flags:
-            return
+    cache = None
+    key = None
+    object_data = None
+    # -parallel: một object cho mỗi module
+    objects = None
+    if (want_object or want_jit) and not ("-no-cache" in flags or "-dev" in flags or phases.mode):
+        from cache import open_cache, cache_key
+        # Không dùng được thư mục cache: biên dịch như -no-cache
+        cache = open_cache()
+    if cache is not None:
+        parts = [opt_options.key(), memo_options.key(), str("-line-buffered" in flags)]
+        if "-profile" in flags: parts.append("profile")
+        if pgo_gen: parts.append("pgo-gen")
+        if pgo_profile is not None: parts.append("pgo-use:" + pgo_profile.digest)
+        key = cache_key(file_content, parts, "obj")
+        object_data = cache.get(key)
 
-    ast = parse(tokens)
+    output_file = "a.exe"
+    if ("-s" in flags): output_file = "a.s"
+    elif ("-c" in flags): output_file = "a.o"
+    if ("-o" in flags):
+        output_file = flags["-o"]["inp"]
 
-    if "-dev" in flags:
-        print_tree(ast)
+    # Trúng cache thì bỏ qua lex -> parse -> codegen (trừ khi cần IR/assembly)
+    if object_data is None or want_asm or want_lazy_jit or want_tiered or (want_object and "-temp" in flags):
+        with phases.phase("lexer"):
+            tokens = lexer(file_content)
+        phases.count("tokens", len(tokens))
 
-    # ###### build exe #######
+        if "-dev" in flags:
+            print(tokens)
+            print("START_TOK")
+
+            for token in tokens:
+                print(token)
+
+            print("END_TOK")
+
+            if "-noparse" in flags:
+                return
 
-    if not ("-p" in flags):
-        module = emit_llvm(ast)
+        with phases.phase("parse"):
+            ast = parse(tokens, arena=("-arena" in flags))
+        if phases.mode is not None:
+            phases.count("AST nodes", count_nodes(ast))
 
-        with open("temp.ll","w",encoding="utf-8") as f:
-            f.write(str(module))
+        errors = check_functions(ast) or check_memo(ast)
+        if errors:
+            for error in errors: print("ERROR:", error)
+            return 1
 
+        if opt_options.is_on("fold", opt_options.level > 0 or opt_options.size_level > 0):
+            with phases.phase("simplify"):
+                ast = simplify(ast)
 
-        output_file = "a.exe"
-        build_cmd = [
-            clang_path,
-            "temp.ll",
-            "-O2",
-            "-o",
-            output_file
-        ]
+        if "-dev" in flags:
+            print_tree(ast)
 
-        if ("-o" in flags):
-            output_file = flags["-o"]["inp"]
+        if want_tiered:
+            from tiered import run_tiered
+            for flag in ("-profile", "-pgo-gen", "-pgo-use"):
+                if flag in flags or (flag == "-pgo-use" and pgo_profile is not None):
+                    print(f"warning: {flag} is not supported with -jit-tiered", file=sys.stderr)
+            if not isinstance(ast, Program): ast = Program(list(ast))
+            with phases.phase("run (tiered)"):
+                result = run_tiered(ast, opt_options, memo_options,
+                                    line_buffered=("-line-buffered" in flags), dev=("-dev" in flags))
+            phases.report()
+            return result
 
-        if os.name == 'nt': 
-            build_cmd.append("-llegacy_stdio_definitions")
-            build_cmd.append("-lmsvcrt")
+        with phases.phase("type_infer"):
+            var_types = infer_types(ast)
 
-        subprocess.check_call(build_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if not("-temp" in flags):
-            os.remove("temp.ll")
-    if "-jit" in flags:
-        module = emit_llvm(ast)
-        run_jit(module)
+        # -profile / PGO: các bộ đếm (và thứ tự đánh số nhánh) cần cả chương trình
+        # trong một module duy nhất
+        if (jobs is not None and object_data is None and (want_object or want_jit)
+                and not (want_asm or want_lazy_jit or "-temp" in flags or "-profile" in flags
+                         or pgo_gen or pgo_profile is not None)):
+            from parallel import compile_parallel
+            try:
+                with phases.phase("parallel codegen"):
+                    objects = compile_parallel(ast, var_types, opt_options, memo_options,
+                                               line_buffered=("-line-buffered" in flags), jobs=jobs)
+            except RuntimeError as e:
+                print(f"LLVM Error: {e}")
+                return 1
+            # Cache chỉ giữ một object cho mỗi source
+            if len(objects) == 1:
+                object_data = objects[0]
+                if cache is not None:
+                    cache.put(key, object_data)
+        elif want_asm or want_object or want_jit or want_lazy_jit:
+            with phases.phase("emit_llvm"):
+                module = emit_llvm(ast, var_types, line_buffered=("-line-buffered" in flags), memo=memo_options,
+                                   profile=("-profile" in flags), pgo_gen=pgo_gen, pgo_use=pgo_profile)
+                if pgo_profile is not None and pgo_profile.mismatched:
+                    print(f"warning: {pgo_profile.mismatched} branches are not in the profile '{pgo_path}' "
+                          "(made from another source or with other flags?)", file=sys.stderr)
+            if phases.mode is not None:
+                functions, instructions = ir_counts(module)
+                phases.count("IR functions", functions)
+                phases.count("IR instructions", instructions)
 
+            # IR dạng text cho LLVM: -time-phases đo riêng bước str(module)
+            # (bình thường nằm trong parse_assembly của compile_object)
+            ir_source = module
+            if phases.mode is not None and not want_lazy_jit:
+                with phases.phase("str(module)"):
+                    ir_source = str(module)
+
+            if ("-temp" in flags) and not ("-p" in flags):
+                with open(output_file + ".ll","w",encoding="utf-8") as f:
+                    f.write(str(ir_source))
+
+            try:
+                if want_asm:
+                    with open(output_file,"w",encoding="utf-8") as f:
+                        f.write(compile_object(ir_source, opt_options, assembly=True, phases=phases))
+                if want_object and object_data is None:
+                    object_data = compile_object(ir_source, opt_options, phases=phases)
+                    if cache is not None:
+                        cache.put(key, object_data)
+            except RuntimeError as e:
+                print(f"LLVM Error: {e}")
+                return 1
+
+    # ###### build exe #######
+
+    if want_object:
+        from linker import link
+        if ("-c" in flags) and object_data is not None:
+            with open(output_file,"wb") as f:
+                f.write(object_data)
+        else:
+            # -temp giữ lại object cạnh file output, còn lại dùng file tạm có tên
+            # riêng cho mỗi lần build để hai build cùng thư mục không đè nhau
+            if ("-temp" in flags):
+                object_files = [output_file + ".o"]
+            else:
+                import tempfile
+                object_files = []
+                for _ in (objects or [object_data]):
+                    fd, object_file = tempfile.mkstemp(suffix=".o", prefix="laetus_")
+                    os.close(fd)
+                    object_files.append(object_file)
+            try:
+                for object_file, data in zip(object_files, objects or [object_data]):
+                    with open(object_file, "wb") as f:
+                        f.write(data)
+                # -c với -parallel: các object được gộp thành một
+                with phases.phase("link"):
+                    link(object_files, output_file, relocatable=("-c" in flags))
+            finally:
+                if not ("-temp" in flags):
+                    for object_file in object_files:
+                        os.remove(object_file)
+    if want_jit:
+        with phases.phase("run (jit)"):
+            if object_data is not None:
+                run_jit(object_data)
+            elif objects is not None:
+                run_jit(objects)
+            elif cache is not None:
+                # Trượt cache theo source: MCJIT vẫn có thể lấy object theo hash của module
+                from cache import JITObjectCache
+                jit_cache = JITObjectCache(cache, opt_options.key())
+                run_jit(llvm_ir=module, options=opt_options, object_cache=jit_cache)
+                if jit_cache.object_data is not None:
+                    cache.put(key, jit_cache.object_data)
+            else:
+                run_jit(llvm_ir=ir_source, options=opt_options)
+    if want_lazy_jit:
+        from lazy_jit import run_lazy_jit
+        with phases.phase("run (jit-lazy)"):
+            run_lazy_jit(module, opt_options, background=("-jit-bg" in flags))
+    phases.report()
 
 
 if __name__ == "__main__":
-    laetus()
+    if getattr(sys, "frozen", False):
+        # Worker của ProcessPoolExecutor trong bản đóng gói bằng PyInstaller
+        import multiprocessing
+        multiprocessing.freeze_support()
+    if sys.argv[1:2] == ["build"]:
+        from batch import run_build
+        sys.exit(run_build(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        from server import run_server
+        sys.exit(run_server(sys.argv[2:]))
+    if sys.argv[1:2] == ["bench"]:
+        from bench import run_bench
+        sys.exit(run_bench(sys.argv[2:]))
+    # laetus() trả về 1 khi có lỗi (và exit code của chương trình với -jit-tiered)
+    sys.exit(laetus())
 
@@ -0,0 +1,103 @@
+from node import *
+from check import collect_functions
+
+# === MEMOIZATION (memo func) ===
+#
+#   memo func fib(x)
+#       ...
+#   end
+#
+# Mỗi bản chuyên biệt hóa của hàm memo có một bảng băm riêng (global, cố định
+# kích thước). Khóa là (tag, giá trị) của từng đối số: int theo giá trị, float
+# theo bit, str theo con trỏ (chuỗi không bị sửa tại chỗ nên cùng con trỏ thì
+# cùng nội dung). Codegen tra bảng ở đầu hàm và ghi kết quả trước mỗi return.
+#
+#   -memo-size=N        số entry của mỗi bảng (làm tròn lên lũy thừa của 2)
+#   -memo-evict=P       entry trùng chỗ: replace (ghi đè, mặc định) | keep (giữ entry cũ)
+#
+# Hàm memo phải thuần: hàm có print / input (kể cả qua hàm nó gọi) bị từ chối,
+# vì lần gọi trúng bảng sẽ không in / đọc gì cả.
+
+DEFAULT_MEMO_SIZE = 4096
+MAX_MEMO_SIZE = 1 << 24
+
+evict_policies = ["replace", "keep"]
+
+
+class MemoOptions:
+    def __init__(self, size=DEFAULT_MEMO_SIZE, policy="replace"):
+        self.size = size
+        self.policy = policy
+
+    @staticmethod
+    def from_flags(flags):
+        """Đọc -memo-size=N, -memo-evict=P. Trả về (options, lỗi hoặc None)"""
+        options = MemoOptions()
+        for flag in flags:
+            if flag.startswith("-memo-size="):
+                value = flag[len("-memo-size="):]
+                if not value.isdigit() or not 1 <= int(value) <= MAX_MEMO_SIZE:
+                    return options, f"Invalid memo size '{value}' (1..{MAX_MEMO_SIZE})"
+                options.size = 1 << (int(value) - 1).bit_length()
+            elif flag.startswith("-memo-evict="):
+                value = flag[len("-memo-evict="):]
+                if value not in evict_policies:
+                    return options, f"Unknown memo eviction policy '{value}' ({', '.join(evict_policies)})"
+                options.policy = value
+        return options, None
+
+    def key(self):
+        """Chuỗi ổn định cho khóa cache"""
+        return f"memo{self.size}/{self.policy}"
+
+    @property
+    def bits(self):
+        return self.size.bit_length() - 1
+
+
+# ================= PURITY CHECK =================
+
+def side_effect(body):
+    """Câu lệnh print / input đầu tiên trong body và tên các hàm được gọi"""
+    found = None
+    called = []
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FuncDef): continue
+        if found is None and isinstance(node, (Print, Input)):
+            found = node
+        if isinstance(node, Call):
+            called.append(node.name)
+        stack.extend(reversed(node.children()))
+    return found, called
+
+def check_memo(root):
+    """Lỗi của các hàm memo không thuần (list rỗng nếu không có)"""
+    functions = collect_functions(root)
+    if not any(def_node.memo for def_node in functions.values()): return []
+
+    effects = {name: side_effect(def_node.body) for name, def_node in functions.items()}
+
+    def impure_path(name, seen):
+        """[hàm, ..., hàm có print / input] hoặc None"""
+        if name in seen or name not in effects: return None
+        seen.add(name)
+        found, called = effects[name]
+        if found is not None: return [name]
+        for callee in called:
+            path = impure_path(callee, seen)
+            if path: return [name] + path
+        return None
+
+    errors = []
+    for name, def_node in sorted(functions.items(), key=lambda item: item[1].line):
+        if not def_node.memo: continue
+        path = impure_path(name, set())
+        if path is None: continue
+
+        stmt = effects[path[-1]][0]
+        what = "reads input" if isinstance(stmt, Input) else "prints"
+        via = f" (via {' -> '.join(path)})" if len(path) > 1 else ""
+        errors.append(f"line {def_node.line}: memo function '{name}' {what} at line {stmt.line}{via}")
+    return errors
@@ -1,9 +1,337 @@
+from array import array
 from tokens import *
+
+# === AST ===
+# Mỗi loại node là một class riêng với __slots__ và field có tên.
+# `fields` mô tả (tên, loại) của từng field theo đúng thứ tự tham số __init__,
+# NodeArena dựa vào đó để đóng gói / giải nén cây.
+
+NODE    = 1     # một node con (hoặc None)
+LIST    = 2     # list node con
+STR     = 3     # chuỗi (hoặc None)
+STRS    = 4     # list chuỗi
+INT     = 5     # int / bool nhỏ
+OP      = 6     # Operators
+CONST   = 7     # số int / float của chương trình
+
+
 class Node:
-    def __init__(self, dt):
-        self.data:Token = dt
-        self.children:list[Node] = []
+    __slots__ = ("line",)
+    fields = ()
+
+    def children(self):
+        """Các node con theo thứ tự field, dùng cho các pass duyệt cây"""
+        result = []
+        for name, kind in self.fields:
+            value = getattr(self, name)
+            if kind == NODE and value is not None:
+                result.append(value)
+            elif kind == LIST and value:
+                result.extend(value)
+        return result
+
+    def __str__(self):
+        parts = []
+        for name, kind in self.fields:
+            if kind in (STR, STRS, INT, CONST):
+                parts.append(f"{name}={getattr(self, name)!r}")
+            elif kind == OP:
+                parts.append(operators_vis[getattr(self, name)])
+        return type(self).__name__ + (": " + " ".join(parts) if parts else "")
+
+# --- STATEMENTS ---
+
+class Program(Node):
+    __slots__ = ("body",)
+    fields = (("body", LIST),)
+
+    def __init__(self, body: list, line=0):
+        self.body = body
+        self.line = line
+
+class Assign(Node):
+    __slots__ = ("name", "value", "type_name")
+    fields = (("name", STR), ("value", NODE), ("type_name", STR))
+
+    def __init__(self, name: str, value: Node, type_name: str = "", line=0):
+        self.name = name
+        self.value = value
+        self.type_name = type_name
+        self.line = line
+
+class Print(Node):
+    __slots__ = ("args", "newline")
+    fields = (("args", LIST), ("newline", INT))
+
+    def __init__(self, args: list, newline: bool, line=0):
+        self.args = args
+        self.newline = newline
+        self.line = line
+
+class Input(Node):
+    __slots__ = ("type_name", "name", "prompt")
+    fields = (("type_name", STR), ("name", STR), ("prompt", STR))
+
+    def __init__(self, type_name: str, name: str, prompt: str = None, line=0):
+        self.type_name = type_name
+        self.name = name
+        self.prompt = prompt
+        self.line = line
+
+class If(Node):
+    __slots__ = ("cond", "then_body", "else_body")
+    fields = (("cond", NODE), ("then_body", LIST), ("else_body", LIST))
+
+    def __init__(self, cond: Node, then_body: list, else_body: list = None, line=0):
+        self.cond = cond
+        self.then_body = then_body
+        # None khi không có nhánh else
+        self.else_body = else_body
+        self.line = line
+
+class While(Node):
+    __slots__ = ("cond", "body")
+    fields = (("cond", NODE), ("body", LIST))
+
+    def __init__(self, cond: Node, body: list, line=0):
+        self.cond = cond
+        self.body = body
+        self.line = line
+
+class For(Node):
+    __slots__ = ("var", "start", "stop", "step", "body")
+    fields = (("var", STR), ("start", NODE), ("stop", NODE), ("step", NODE), ("body", LIST))
+
+    def __init__(self, var: str, start: Node, stop: Node, step: Node, body: list, line=0):
+        self.var = var
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.body = body
+        self.line = line
+
+class FuncDef(Node):
+    __slots__ = ("name", "params", "body", "memo")
+    fields = (("name", STR), ("params", STRS), ("body", LIST), ("memo", INT))
+
+    def __init__(self, name: str, params: list, body: list, memo: bool = False, line=0):
+        self.name = name
+        self.params = params
+        self.body = body
+        # 'memo func': kết quả được lưu theo đối số (xem memo.py)
+        self.memo = memo
+        self.line = line
+
+class Return(Node):
+    __slots__ = ("value",)
+    fields = (("value", NODE),)
+
+    def __init__(self, value: Node = None, line=0):
+        self.value = value
+        self.line = line
+
+# --- EXPRESSIONS ---
+
+class Call(Node):
+    __slots__ = ("name", "args")
+    fields = (("name", STR), ("args", LIST))
+
+    def __init__(self, name: str, args: list, line=0):
+        self.name = name
+        self.args = args
+        self.line = line
+
+class BinOp(Node):
+    __slots__ = ("op", "lhs", "rhs")
+    fields = (("op", OP), ("lhs", NODE), ("rhs", NODE))
+
+    def __init__(self, op: Operators, lhs: Node, rhs: Node, line=0):
+        self.op = op
+        self.lhs = lhs
+        self.rhs = rhs
+        self.line = line
+
+class Num(Node):
+    __slots__ = ("value", "is_float")
+    fields = (("value", CONST), ("is_float", INT))
+
+    def __init__(self, value: int | float, is_float: bool = False, line=0):
+        self.value = value
+        self.is_float = is_float
+        self.line = line
+
+class Str(Node):
+    __slots__ = ("value",)
+    fields = (("value", STR),)
+
+    def __init__(self, value: str, line=0):
+        self.value = value
+        self.line = line
+
+class Var(Node):
+    __slots__ = ("name",)
+    fields = (("name", STR),)
+
+    def __init__(self, name: str, line=0):
+        self.name = name
+        self.line = line
+
+
+def num_from_token(tok: Token):
+    """Num node từ token số: int nếu được, không thì float"""
+    text = tok.text
+    try:
+        return Num(int(text), False, tok.line)
+    except ValueError:
+        return Num(float(text), True, tok.line)
+
+
+# === ARENA ===
+# Chế độ lưu cây dạng phẳng cho chương trình rất lớn: mỗi node là một bản ghi
+# trong một array('q') duy nhất [kind, line, field...]. List được lưu tại chỗ
+# dưới dạng [len, item...], chuỗi và hằng số nằm trong bảng riêng.
+# Một node trong arena chỉ tốn 8 byte mỗi field thay vì một object Python.
+
+node_classes = [
+    Program, Assign, Print, Input, If, While, For, FuncDef, Return,
+    Call, BinOp, Num, Str, Var,
+]
+class_ids = {cls: i for i, cls in enumerate(node_classes)}
+
+class NodeArena:
+    def __init__(self):
+        self.data = array('q')
+        self.strings: list[str] = []
+        self.string_ids: dict[str, int] = {}
+        self.consts: list = []
+
+        # Offset của các câu lệnh top-level theo thứ tự
+        self.roots: list[int] = []
+
+    def __len__(self):
+        return len(self.roots)
+
+    def _str_id(self, value):
+        if value is None: return -1
+        idx = self.string_ids.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = idx
+        return idx
+
+    def _pack(self, node: Node):
+        if node is None: return -1
+
+        # Con được đóng gói trước để biết offset của chúng
+        values = []
+        for name, kind in node.fields:
+            value = getattr(node, name)
+            if kind == NODE:
+                values.append(self._pack(value))
+            elif kind == LIST:
+                values.append(None if value is None else [self._pack(child) for child in value])
+            elif kind == STR:
+                values.append(self._str_id(value))
+            elif kind == STRS:
+                values.append([self._str_id(s) for s in value])
+            elif kind == INT:
+                values.append(int(value))
+            elif kind == OP:
+                values.append(value.value)
+            elif kind == CONST:
+                values.append(len(self.consts))
+                self.consts.append(value)
+
+        offset = len(self.data)
+        self.data.append(class_ids[type(node)])
+        self.data.append(node.line)
+        for value in values:
+            if isinstance(value, list):
+                self.data.append(len(value))
+                self.data.extend(value)
+            elif value is None:
+                self.data.append(-1)
+            else:
+                self.data.append(value)
+        return offset
+
+    def add(self, node: Node):
+        """Đóng gói một cây con và ghi nhận nó là câu lệnh top-level"""
+        offset = self._pack(node)
+        self.roots.append(offset)
+        return offset
+
+    def get(self, offset: int):
+        """Dựng lại cây con (object) bắt đầu tại offset"""
+        return self._unpack(offset)[0]
+
+    def _unpack(self, offset):
+        data = self.data
+        cls = node_classes[data[offset]]
+        line = data[offset + 1]
+        pos = offset + 2
+
+        args = []
+        for name, kind in cls.fields:
+            value = data[pos]
+            pos += 1
+            if kind == NODE:
+                args.append(None if value < 0 else self._unpack(value)[0])
+            elif kind == LIST:
+                if value < 0:
+                    args.append(None)
+                    continue
+                args.append([self._unpack(data[pos + i])[0] for i in range(value)])
+                pos += value
+            elif kind == STR:
+                args.append(None if value < 0 else self.strings[value])
+            elif kind == STRS:
+                args.append([self.strings[data[pos + i]] for i in range(value)])
+                pos += value
+            elif kind == INT:
+                args.append(value)
+            elif kind == OP:
+                args.append(Operators(value))
+            elif kind == CONST:
+                args.append(self.consts[value])
+
+        return cls(*args, line=line), pos
+
+    def __iter__(self):
+        for offset in self.roots:
+            yield self.get(offset)
+
+    def statements(self, func_defs: bool):
+        """Dựng lần lượt từng câu lệnh top-level: chỉ FuncDef hoặc phần còn lại"""
+        func_id = class_ids[FuncDef]
+        for offset in self.roots:
+            if (self.data[offset] == func_id) == func_defs:
+                yield self.get(offset)
+
+
+def top_level(root, func_defs: bool):
+    """Câu lệnh top-level của Program hoặc NodeArena: chỉ FuncDef hoặc phần còn lại"""
+    if isinstance(root, NodeArena):
+        return root.statements(func_defs)
+    return [stmt for stmt in root.body if isinstance(stmt, FuncDef) == func_defs]
+
+def walk(nodes):
+    """Mọi node trong các cây con của nodes theo thứ tự trước,
+    không đi vào thân của FuncDef lồng bên trong"""
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, FuncDef):
+            stack.extend(reversed(node.children()))
 
-    def add_children(self, node):
-        assert isinstance(node, Node)
-        self.children.append(node)
\ No newline at end of file
+def count_nodes(root):
+    """Số node của cả cây (Program hoặc NodeArena), kể cả thân các hàm"""
+    stack = list(root.body if isinstance(root, Program) else root)
+    count = 0
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children())
+    return count
@@ -0,0 +1,151 @@
+# === OPTIMIZATION PIPELINE ===
+# Dùng chung cho exe, -c, -s và JIT (JIT nạp đúng object mà compile_object sinh ra).
+#
+#   -O0 -O1 -O2 -O3     mức tối ưu (mặc định -O2, giống clang -O2 trước đây)
+#   -Os -Oz             tối ưu kích thước (opt_level 2, size_level 1 / 2)
+#   -f<pass>            bật thêm một pass (ví dụ -fgvn ở -O1)
+#   -fno-<pass>         tắt một pass
+#
+# Pipeline chuẩn lấy từ PassManagerBuilder. Các pass mà PassManagerBuilder có
+# nút bật/tắt (inline, loop-unroll, vectorizer) được chỉnh trực tiếp trên nó.
+# Các pass còn lại được PassManagerBuilder chèn cứng vào pipeline, nên khi tắt
+# một trong số đó compiler dựng pipeline thủ công (manual_pipeline) thay thế.
+
+# Tên pass -> method thêm pass vào ModulePassManager (theo tên: llvmlite chỉ
+# được import khi chạy pass, đọc flag không cần tới nó).
+# llvmlite không có mem2reg riêng: SROA làm luôn việc đưa alloca lên thanh ghi.
+pass_adders = {
+    "mem2reg":      "add_sroa_pass",
+    "sroa":         "add_sroa_pass",
+    "instcombine":  "add_instruction_combining_pass",
+    "simplifycfg":  "add_cfg_simplification_pass",
+    "reassociate":  "add_reassociate_expressions_pass",
+    "gvn":          "add_gvn_pass",
+    "licm":         "add_licm_pass",
+    "loop-rotate":  "add_loop_rotate_pass",
+    "loop-unroll":  "add_loop_unroll_pass",
+    "sccp":         "add_sccp_pass",
+    "dse":          "add_dead_store_elimination_pass",
+    "dce":          "add_aggressive_dead_code_elimination_pass",
+    "tailcallelim": "add_tail_call_elimination_pass",
+}
+
+# Pass chỉ bật/tắt được qua PassManagerBuilder
+builder_passes = ["inline", "loop-vectorize", "slp-vectorize"]
+
+# Pass chạy trên AST trước codegen (xem simplify.py)
+frontend_passes = ["fold"]
+
+pass_names = sorted(set(pass_adders) | set(builder_passes) | set(frontend_passes))
+
+# Thứ tự pass của pipeline thủ công, gần giống pipeline -O2 của LLVM
+manual_order = [
+    "sroa", "instcombine", "simplifycfg", "reassociate", "sccp",
+    "loop-rotate", "licm", "loop-unroll", "gvn", "instcombine",
+    "dse", "dce", "tailcallelim", "simplifycfg",
+]
+
+# Ngưỡng inline theo mức, như clang
+inline_thresholds = {1: 225, 2: 225, 3: 250}
+size_inline_thresholds = {1: 75, 2: 25}
+
+
+class OptOptions:
+    def __init__(self, level=2, size_level=0):
+        self.level = level
+        self.size_level = size_level
+        self.enabled = set()
+        self.disabled = set()
+
+    @staticmethod
+    def from_flags(flags):
+        """Đọc -O*, -f<pass>, -fno-<pass> theo thứ tự trên dòng lệnh (flag sau thắng).
+        Trả về (options, lỗi hoặc None)"""
+        options = OptOptions()
+        for flag in flags:
+            if flag in ("-O0", "-O1", "-O2", "-O3"):
+                options.level = int(flag[2])
+                options.size_level = 0
+            elif flag == "-Os":
+                options.level, options.size_level = 2, 1
+            elif flag == "-Oz":
+                options.level, options.size_level = 2, 2
+            elif flag.startswith("-fno-"):
+                name = flag[5:]
+                if name not in pass_names: return options, f"Unknown pass '{name}'"
+                options.disabled.add(name)
+                options.enabled.discard(name)
+            elif flag.startswith("-f"):
+                name = flag[2:]
+                if name not in pass_names: return options, f"Unknown pass '{name}'"
+                options.enabled.add(name)
+                options.disabled.discard(name)
+        return options, None
+
+    def key(self):
+        """Chuỗi ổn định mô tả pipeline, dùng cho khóa cache"""
+        return (f"-O{self.level}/s{self.size_level}"
+                f"+{','.join(sorted(self.enabled))}-{','.join(sorted(self.disabled))}")
+
+    def is_on(self, name, default):
+        if name in self.disabled: return False
+        if name in self.enabled: return True
+        return default
+
+
+def inlining_threshold(options: OptOptions):
+    if options.size_level:
+        return size_inline_thresholds[options.size_level]
+    return inline_thresholds.get(options.level, 225)
+
+def add_pass(pm, name):
+    getattr(pm, pass_adders[name])()
+
+def populate_builder(pm, options: OptOptions):
+    from llvmlite import binding
+    pmb = binding.PassManagerBuilder()
+    pmb.opt_level = options.level
+    pmb.size_level = options.size_level
+
+    vectorize = options.level >= 2 and options.size_level < 2
+    pmb.loop_vectorize = options.is_on("loop-vectorize", vectorize)
+    pmb.slp_vectorize = options.is_on("slp-vectorize", vectorize)
+    pmb.disable_unroll_loops = not options.is_on("loop-unroll", options.level >= 2 and not options.size_level)
+    if options.is_on("inline", options.level >= 2 or options.size_level > 0):
+        pmb.inlining_threshold = inlining_threshold(options)
+
+    pmb.populate(pm)
+
+def manual_pipeline(pm, options: OptOptions):
+    if options.is_on("inline", True):
+        pm.add_function_inlining_pass(inlining_threshold(options))
+    pm.add_global_optimizer_pass()
+    pm.add_ipsccp_pass()
+    for name in manual_order:
+        if options.is_on(name, name != "loop-unroll" or options.level >= 2):
+            add_pass(pm, name)
+    pm.add_global_dce_pass()
+
+def run_passes(llvm_module, target_machine, options: OptOptions):
+    from llvmlite import binding
+    pm = binding.ModulePassManager()
+    target_machine.add_analysis_passes(pm)
+
+    if options.level == 0:
+        # -O0: chỉ chạy các pass được bật rõ ràng
+        for name in sorted(options.enabled):
+            if name in pass_adders:
+                add_pass(pm, name)
+            elif name == "inline":
+                pm.add_function_inlining_pass(inlining_threshold(options))
+    elif options.disabled & set(pass_adders):
+        manual_pipeline(pm, options)
+    else:
+        populate_builder(pm, options)
+        # -f<pass> ngoài pipeline chuẩn chạy thêm sau cùng
+        for name in sorted(options.enabled):
+            if name in pass_adders:
+                add_pass(pm, name)
+
+    pm.run(llvm_module)
+    return llvm_module
@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import os
+from node import *
+from llvm_code_gen import LLVMCodeGen, MAIN_PART, emit_llvm, compile_object
+from optimize import OptOptions
+from memo import MemoOptions
+
+# === PARALLEL CODEGEN (-parallel[=N]) ===
+# Chương trình được tách thành một module cho mỗi hàm top-level và một module
+# cho main. Mỗi module được sinh IR, tối ưu và biên dịch thành object trong một
+# process riêng (ProcessPoolExecutor); các object được link chung với nhau
+# (hoặc cùng nạp vào MCJIT với -jit).
+#
+#   module của hàm f    thân mọi bản chuyên biệt hóa của f, khai báo các hàm
+#                       khác, bản internal của runtime
+#   module của main     main(), runtime đầy đủ (buffer input / output)
+#
+# Hàm của người dùng không còn inline được qua ranh giới module, đổi lại thời
+# gian biên dịch chương trình lớn chia đều cho các core. Chương trình có hàm
+# định nghĩa lồng trong hàm khác được biên dịch như cũ trong một module.
+
+# AST và kết quả của type_infer, gửi sang mỗi worker một lần khi khởi tạo
+worker_state = None
+
+
+def parallel_jobs(flags):
+    """Đọc -parallel / -parallel=N. Trả về (số worker hoặc None, lỗi hoặc None)"""
+    for flag in flags:
+        if flag == "-parallel":
+            return os.cpu_count() or 1, None
+        if flag.startswith("-parallel="):
+            value = flag[len("-parallel="):]
+            if not value.isdigit() or int(value) < 1:
+                return None, f"Invalid number of parallel jobs '{value}'"
+            return int(value), None
+    return None, None
+
+def init_worker(state):
+    global worker_state
+    worker_state = state
+
+def compile_part(part):
+    ast, var_types, options, memo, line_buffered = worker_state
+    codegen = LLVMCodeGen(line_buffered, memo, part=part)
+    return compile_object(codegen.generate_ir(ast, var_types), options)
+
+def has_nested_functions(ast):
+    for stmt in top_level(ast, True):
+        if any(isinstance(node, FuncDef) for node in walk(stmt.body)): return True
+    return any(isinstance(node, FuncDef) for node in walk(list(top_level(ast, False))))
+
+def split_parts(ast):
+    """[MAIN_PART, tên các hàm top-level], None nếu chương trình không tách được"""
+    functions = list(dict.fromkeys(stmt.name for stmt in top_level(ast, True)))
+    if not functions or has_nested_functions(ast):
+        return None
+    return [MAIN_PART] + functions
+
+def compile_parallel(ast, var_types=None, options: OptOptions = None, memo: MemoOptions = None,
+                     line_buffered=False, jobs=None):
+    """List các object (bytes) của chương trình, link / nạp chung với nhau"""
+    parts = split_parts(ast)
+    if parts is None or jobs == 1:
+        return [compile_object(emit_llvm(ast, var_types, line_buffered, memo), options)]
+
+    # Worker được fork: buffer stdout chưa ghi sẽ bị in lại bởi mỗi worker
+    sys.stdout.flush()
+    state = (ast, var_types, options, memo, line_buffered)
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(parts)),
+                             initializer=init_worker, initargs=(state,)) as pool:
+        return list(pool.map(compile_part, parts))
@@ -1,14 +1,16 @@
 from tokens import *
 from const import *
-from node import Node
-from expression import build_expression_tree
+from node import *
+from expression import parse_expression, parse_expression_list, parse_call
 
 def print_tree(node, depth=0):
     indent = "   " * depth
-    tok = node.data
-    print(f"{indent}-{depth}->{tok}")
-    for c in node.children:
-        # print(c.data.type)
+    if isinstance(node, NodeArena):
+        for stmt in node:
+            print_tree(stmt, depth)
+        return
+    print(f"{indent}-{depth}->{node}")
+    for c in node.children():
         print_tree(c, depth + 1)
 
 class Parser:
@@ -17,17 +19,30 @@ class Parser:
         self.pos = 0
         self.size = len(self.tokens)
 
+        # Keyword -> hàm parse câu lệnh, parse_statement chỉ tra bảng theo tok.kw
+        self.statement_parsers = {
+            Keyword.print_tok:      self.parse_print,
+            Keyword.println_tok:    self.parse_print,
+            Keyword.if_tok:         self.parse_if,
+            Keyword.input_tok:      self.parse_input,
+            Keyword.while_tok:      self.parse_while,
+            Keyword.for_tok:        self.parse_for,
+            Keyword.func_tok:       self.parse_function,
+            Keyword.memo_tok:       self.parse_memo_function,
+            Keyword.return_tok:     self.parse_return,
+        }
+
     def current(self):
         return self.tokens[self.pos]
 
     def is_type(self, _type):
         return self.current().type == _type
     
-    def is_identifier(self, func):
-        return self.is_type(TokType.identifier) and self.current().func == func
+    def is_keyword(self, kw):
+        return self.tokens[self.pos].kw == kw
     
-    def is_next_identifier(self, func):
-        return self.tokens[self.pos+1].type == TokType.identifier and self.tokens[self.pos+1].func == func
+    def is_next_keyword(self, kw):
+        return self.tokens[self.pos+1].kw == kw
     
     
     def advance(self):
@@ -43,7 +58,7 @@ class Parser:
 
         while self.pos < self.size:
             current_tok = self.current()
-            if current_tok.type == TokType.identifier and current_tok.func in end_keyword:
+            if current_tok.kw in end_keyword:
                 break
 
             stmt = self.parse_statement()
@@ -57,21 +72,9 @@ class Parser:
     def parse_statement(self):
         tok = self.current()
 
-
-        if self.is_identifier("print") or self.is_identifier("println"):
-            return self.parse_print()
-        if self.is_identifier("if"):
-            return self.parse_if()
-        if self.is_identifier("input"):
-            return self.parse_input()
-        if self.is_identifier("while"):
-            return self.parse_while()
-        if self.is_identifier("for"):
-            return self.parse_for()
-        if self.is_identifier("func"):
-            return self.parse_function()
-        if self.is_identifier("return"):
-            return self.parse_return()
+        if tok.kw:
+            parse_func = self.statement_parsers.get(tok.kw)
+            if parse_func: return parse_func()
         if tok.type == TokType.identifier and self.pos+1 < self.size:
             if self.tokens[self.pos+1].type == TokType.operator:
                 if self.tokens[self.pos+1].operator == Operators.equals:
@@ -86,226 +89,112 @@ class Parser:
         return None
 
     def parse_print(self):
-        print_node = Node(self.advance())
-
-        expr_tokens = []
-
-        while not self.current().type == TokType.end_line and self.pos < self.size:
-            expr_tokens.append(self.advance())
-
-        if expr_tokens:
-            res = build_expression_tree(expr_tokens)
-            print_node.children.extend(res)
-            
-        return print_node
+        print_tok = self.advance()
+        args = parse_expression_list(self)
+        return Print(args, print_tok.kw == Keyword.println_tok, print_tok.line)
 
     def parse_return(self):
-        ret_node = Node(ReturnToken())
-        self.advance()
-
-        expr_tokens = []
-        while not self.current().type == TokType.end_line and self.pos < self.size:
-            expr_tokens.append(self.advance())
-
-        if expr_tokens:
-            res = build_expression_tree(expr_tokens)
-            ret_node.children.extend(res)
-            
-        return ret_node
+        ret_tok = self.advance()
+        value = parse_expression(self)
+        return Return(value, ret_tok.line)
 
     def parse_assignment(self):
-        assignment_node = Node(AssignmentToken())
-        type_node = Node(TypeToken(""))
         var_type = ""
         if self.tokens[self.pos-1].type == TokType.Type:
-            type_node.data.func = self.tokens[self.pos-1].func
-            var_type = type_node.data.func
-        name = Node(self.advance())
-        assignment_node.add_children(name)
+            var_type = self.tokens[self.pos-1].func
+        name_tok = self.advance()
 
-        value_node = Node(ValueToken())
+        self.advance() # Bỏ qua '='
 
-        self.advance()
+        value = parse_expression(self)
+        return Assign(name_tok.func, value, var_type, name_tok.line)
 
-        expr_tokens = []
-
-        while not self.current().type == TokType.end_line and self.pos < self.size:
-            if self.current().type == TokType.number:
-                var_type = "float" if var_type == "" else var_type
-            if self.current().type == TokType.string:
-                var_type = "str" if var_type == "" else var_type
-            if self.current().type == TokType.identifier:
-                if self.tokens[self.pos+1].type == TokType.operator and \
-                    self.tokens[self.pos+1].operator == Operators.right_paren:
-                    self.advance()
-            expr_tokens.append(self.advance())
-        
-        type_node.data.func = var_type
-        if expr_tokens:
-            res = build_expression_tree(expr_tokens)
-            value_node.children.extend(res)
-        
-        assignment_node.add_children(value_node)
-        assignment_node.add_children(type_node)
-
-        return assignment_node
+    def skip_to_keyword(self, kw):
+        """Bỏ qua phần thừa trước từ khóa kw (vd. 'then', 'do') và cả kw"""
+        while self.pos < self.size and not self.is_keyword(kw):
+            self.advance()
+        if self.pos < self.size:
+            self.advance()
 
     def parse_while(self):
-        while_node = Node(self.advance())
+        while_tok = self.advance()
+        cond = parse_expression(self)
+        self.skip_to_keyword(Keyword.do_tok)
 
-        expr =  []
+        body = self.get_block(end_keyword=[Keyword.end_tok])
 
-        condition_node = Node(ConditionToken())
-        op_node = Node(Token())
-        
-        while not self.is_identifier("do") and self.pos < self.size:
-            if self.is_type(TokType.operator) and self.current().operator in compare_operators:
-                expr = build_expression_tree(expr)
-                op_node.data = self.advance()
-                op_node.children.extend(expr)
-                expr = []
-
-            expr.append(self.advance())
-
-            if self.is_identifier("do"):
-                expr = build_expression_tree(expr)
-                op_node.children.extend(expr)
-                print
-        
-        condition_node.add_children(op_node)
-        while_node.add_children(condition_node)
-
-        block_node = Node(BlockToken("WhileBlock"))
-        block_child =  self.get_block(end_keyword=["end"])
-        block_node.children = block_child
-        while_node.add_children(block_node)
-
-        if self.is_identifier("end"):
+        if self.pos < self.size and self.is_keyword(Keyword.end_tok):
             self.advance()
 
-
-        return while_node
+        return While(cond, body, while_tok.line)
 
     def parse_if(self):
-        if_node = Node(self.advance())
+        if_tok = self.advance()
+        cond = parse_expression(self)
+        self.skip_to_keyword(Keyword.then_tok)
 
-        expr =  []
-
-        condition_node = Node(ConditionToken())
-        op_node = Node(Token())
-        
-        while not self.is_identifier("then") and self.pos < self.size:
-            if self.is_type(TokType.operator) and self.current().operator in compare_operators:
-                expr = build_expression_tree(expr)
-                op_node.data = self.advance()
-                op_node.children.extend(expr)
-                expr = []
-
-            expr.append(self.advance())
-
-            if self.is_identifier("then"):
-                expr = build_expression_tree(expr)
-                op_node.children.extend(expr)
-                print
-        
-        condition_node.add_children(op_node)
-        if_node.add_children(condition_node)
-
-        block_node = Node(BlockToken("IfBlock"))
-        block_child =  self.get_block(end_keyword=["else","end"])
-        block_node.children = block_child
-        if_node.add_children(block_node)
+        then_body = self.get_block(end_keyword=[Keyword.else_tok, Keyword.end_tok])
+        else_body = None
         
-        if self.is_identifier("else"):
+        if self.pos < self.size and self.is_keyword(Keyword.else_tok):
             self.advance()
-            block_node = Node(BlockToken("ElseBlock"))
-            block_child =  self.get_block(end_keyword=["end"])
-            block_node.children = block_child
-            if_node.add_children(block_node)
-
+            else_body = self.get_block(end_keyword=[Keyword.end_tok])
 
-        if self.is_identifier("end"):
+        if self.pos < self.size and self.is_keyword(Keyword.end_tok):
             self.advance()
 
-
-        return if_node
+        return If(cond, then_body, else_body, if_tok.line)
 
     def parse_input(self):
-        input_node = Node(self.advance())
+        input_tok = self.advance()
 
-        type_node = Node(self.advance())
-        input_node.add_children(type_node)
-        var_node = Node(self.advance())
-        input_node.add_children(var_node)
+        type_tok = self.advance()
+        var_tok = self.advance()
 
+        prompt = None
         if self.pos < self.size and self.current().type == TokType.string:
-            prompt_node = Node(self.advance())
-            input_node.add_children(prompt_node)
+            prompt = self.advance().string_value
 
-        return input_node
+        return Input(type_tok.func, var_tok.func, prompt, input_tok.line)
 
     def parse_for(self):
-        for_node = Node(self.advance())  # 'for'
-        param_node = Node(ParameterToken())
+        for_tok = self.advance()  # 'for'
 
         var_tok = self.advance()
         if self.current().type == TokType.operator and self.current().operator == Operators.equals:
             self.advance()
 
-        start_expr_tokens = []
-        while not self.is_identifier("Comma") and self.pos < self.size:
-            start_expr_tokens.append(self.advance())
-
-        assign_node = Node(AssignmentToken())
-        assign_node.add_children(Node(var_tok))
-        val_node = Node(ValueToken())
-        val_node.children.extend(build_expression_tree(start_expr_tokens))
-        assign_node.add_children(val_node)
-        assign_node.add_children(Node(TypeToken("int")))
-        
-        param_node.add_children(assign_node)
+        # 1. Giá trị bắt đầu
+        start = parse_expression(self)
 
         # 2. Xử lý giá trị kết thúc (10)
-        if self.is_identifier("Comma"): self.advance()
-        end_expr_tokens = []
-        while not self.is_identifier("Comma") and not self.is_identifier("do") and self.pos < self.size:
-            end_expr_tokens.append(self.advance())
-        param_node.add_children(build_expression_tree(end_expr_tokens)[0])
+        if self.is_keyword(Keyword.comma_tok): self.advance()
+        stop = parse_expression(self)
 
         # 3. Xử lý bước nhảy (1)
-        if self.is_identifier("Comma"):
+        if self.is_keyword(Keyword.comma_tok):
             self.advance()
-            step_tokens = []
-            while not self.is_identifier("do") and self.pos < self.size:
-                step_tokens.append(self.advance())
-            param_node.add_children(build_expression_tree(step_tokens)[0])
+            step = parse_expression(self)
         else:
             # Mặc định step = 1 nếu không ghi
-            step_node = Node(NumToken(1))
-            step_node.data.set_num(1)
-            param_node.add_children(step_node)
-
-        for_node.add_children(param_node)
+            step = Num(1, False, for_tok.line)
 
         # 4. Block xử lý
-        if self.is_identifier("do"):
+        body = []
+        if self.is_keyword(Keyword.do_tok):
             self.advance()
-            block_node = Node(BlockToken("ForBlock"))
-            block_node.children = self.get_block(end_keyword=["end"])
-            for_node.add_children(block_node)
-            if self.is_identifier("end"): self.advance()
+            body = self.get_block(end_keyword=[Keyword.end_tok])
+            if self.pos < self.size and self.is_keyword(Keyword.end_tok): self.advance()
 
-        return for_node
+        return For(var_tok.func, start, stop, step, body, for_tok.line)
 
     def parse_function(self):
-        self.advance() # Bỏ qua 'func'
-        def_func_node = Node(DefFunctionToken())
+        func_tok = self.advance() # Bỏ qua 'func'
         
         # Tên hàm
-        func_node = Node(self.advance()) 
-        def_func_node.add_children(func_node)
+        name_tok = self.advance()
         
-        parameter = Node(ParameterToken())
+        params = []
         
         # Bắt buộc phải có dấu '('
         if self.current().operator == Operators.left_paren:
@@ -318,70 +207,49 @@ class Parser:
                 break
             
             if self.current().type == TokType.identifier:
-                # Thêm ID vào parameter node
-                # Lưu ý: Không dùng build_expression_tree ở đây vì đây là định nghĩa
-                param_id = Node(self.current())
-                parameter.add_children(param_id)
+                # Lưu ý: Không parse biểu thức ở đây vì đây là định nghĩa
+                params.append(self.current().func)
                 self.advance()
                 
-            if self.is_identifier("Comma"): # Nếu gặp dấu phẩy thì bỏ qua
+            if self.is_keyword(Keyword.comma_tok): # Nếu gặp dấu phẩy thì bỏ qua
                 self.advance()
-                
-        def_func_node.add_children(parameter)
 
-        block_node = Node(BlockToken("FuncBlock"))
-        block_child = self.get_block(end_keyword=["end"])
-        block_node.children = block_child
-        def_func_node.add_children(block_node)
+        body = self.get_block(end_keyword=[Keyword.end_tok])
 
-        if self.is_identifier("end"):
+        if self.pos < self.size and self.is_keyword(Keyword.end_tok):
             self.advance()
 
-        return def_func_node
+        return FuncDef(name_tok.func, params, body, False, func_tok.line)
 
-    def parse_call_func(self):
-        call_node = Node(FunctionToken())
-        func_name_node = Node(self.advance()) # Lấy tên hàm
-        call_node.add_children(func_name_node)
-        
-        parameter_node = Node(ParameterToken())
-        self.advance() # Bỏ qua '('
-
-        expr_tokens = []
-        paren_count = 0
-
-        while self.pos < self.size:
-            curr = self.current()
-            
-            # Xử lý đóng ngoặc của hàm, lưu ý nested ngoặc (vd: fib( (1+2) ))
-            if curr.type == TokType.operator and curr.operator == Operators.left_paren:
-                paren_count += 1
-            elif curr.type == TokType.operator and curr.operator == Operators.right_paren:
-                if paren_count == 0:
-                    if expr_tokens:
-                        parameter_node.children.extend(build_expression_tree(expr_tokens))
-                    self.advance() # Bỏ qua ')'
-                    break
-                paren_count -= 1
-            
-            # Xử lý dấu phẩy ngăn cách tham số
-            if self.is_identifier("Comma") and paren_count == 0:
-                if expr_tokens:
-                    parameter_node.children.extend(build_expression_tree(expr_tokens))
-                expr_tokens = []
-                self.advance() # Bỏ qua ','
-                continue
+    def parse_memo_function(self):
+        # 'memo' chỉ có nghĩa ngay trước 'func'
+        if self.pos + 1 >= self.size or not self.is_next_keyword(Keyword.func_tok):
+            return None
+        memo_tok = self.advance()
 
-            expr_tokens.append(self.advance())
+        node = self.parse_function()
+        node.memo = True
+        node.line = memo_tok.line
+        return node
 
-        call_node.add_children(parameter_node)
-        return call_node
+    def parse_call_func(self):
+        name_tok = self.advance() # Lấy tên hàm, parse_call bắt đầu ở '('
+        return parse_call(self, name_tok)
 
 
 
-def parse(tokens:list[Token]):
-    root = Node(RootToken())
+def parse(tokens:list[Token], arena=False):
+    """Trả về Program; với arena=True trả về NodeArena, mỗi câu lệnh top-level
+    được đóng gói ngay khi parse xong nên cây object không tồn tại cùng lúc"""
     parser = Parser(tokens)
-    root.children = parser.get_block([])
-
-    return root
\ No newline at end of file
+    if not arena:
+        return Program(parser.get_block([]))
+
+    root = NodeArena()
+    while parser.pos < parser.size:
+        stmt = parser.parse_statement()
+        if stmt:
+            root.add(stmt)
+        else:
+            parser.advance()
+    return root
@@ -0,0 +1,157 @@
+from llvmlite import ir
+from runtime import Runtime
+import hashlib
+import os
+
+# === PROFILE-GUIDED OPTIMIZATION (-pgo-gen / -pgo-use <file>) ===
+#
+#   laetus prog.lae -pgo-gen -o prog.exe     exe có bộ đếm ở mọi nhánh
+#   ./prog.exe < input                       ghi laetus.profdata (hoặc
+#                                            $LAETUS_PROFILE_FILE) khi kết thúc
+#   laetus prog.lae -pgo-use laetus.profdata bản build dùng profile
+#
+# Mỗi lệnh rẽ nhánh của if / while / for (theo thứ tự LLVMCodeGen sinh ra) có
+# hai bộ đếm: số lần điều kiện được tính và số lần điều kiện đúng. -pgo-use gắn
+# các số này vào lệnh br dưới dạng metadata !prof branch_weights; LLVM dùng nó
+# khi sắp xếp block, inline, unroll, chọn select / branch. Không cần clang hay
+# llvm-profdata: profile là file text của laetus, toàn bộ chạy offline.
+#
+# File profile:
+#
+#   # laetus pgo profile
+#   <index>  <kind>  <hàm>  <dòng>  <số lần tính>  <số lần đúng>
+#
+# Thứ tự nhánh phụ thuộc source và các flag ảnh hưởng tới AST (mức tối ưu):
+# -pgo-use nên dùng cùng flag với -pgo-gen. Nhánh nào không khớp (kind, hàm,
+# dòng) với profile thì giữ nguyên, không có weight.
+
+DEFAULT_PROFILE_FILE = "laetus.profdata"
+PROFILE_FILE_ENV = "LAETUS_PROFILE_FILE"
+
+HEADER = "# laetus pgo profile"
+
+i32 = ir.IntType(32)
+i64 = ir.IntType(64)
+i8_ptr = ir.IntType(8).as_pointer()
+
+# Weight của branch_weights là i32
+MAX_WEIGHT = (1 << 31) - 1
+
+
+class PGOProfile:
+    """Profile đã đọc từ file: index nhánh -> (kind, hàm, dòng, số lần tính, số lần đúng)"""
+
+    def __init__(self, branches: dict, digest: str):
+        self.branches = branches
+        # Một phần của khóa compile cache
+        self.digest = digest
+        # Số nhánh được sinh ra mà profile không có / không khớp
+        self.mismatched = 0
+
+    @staticmethod
+    def load(path):
+        """Trả về (PGOProfile hoặc None, lỗi hoặc None)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            return None, f"Cannot read profile '{path}': {e.strerror}"
+        lines = text.splitlines()
+        if not lines or lines[0] != HEADER:
+            return None, f"'{path}' is not a laetus profile (build with -pgo-gen and run it first)"
+
+        branches = {}
+        for number, line in enumerate(lines[1:], 2):
+            if not line or line.startswith("#"): continue
+            fields = line.split("\t")
+            try:
+                index, kind, func, source_line, total, taken = fields
+                branches[int(index)] = (kind, func, int(source_line), int(total), int(taken))
+            except ValueError:
+                return None, f"{path}:{number}: malformed profile line"
+        return PGOProfile(branches, hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]), None
+
+    def weights(self, index, kind, func, line):
+        """[weight nhánh đúng, weight nhánh sai], None nếu profile không có / không khớp"""
+        entry = self.branches.get(index)
+        if entry is None or entry[:3] != (kind, func, line):
+            self.mismatched += 1
+            return None
+        total, taken = entry[3], entry[4]
+        # +1 như clang: nhánh chưa từng chạy vẫn có weight khác 0
+        weights = [taken + 1, max(total - taken, 0) + 1]
+        scale = max(1, (max(weights) + MAX_WEIGHT - 1) // MAX_WEIGHT)
+        return [max(1, w // scale) for w in weights]
+
+
+class BranchCounters:
+    """Bộ đếm của -pgo-gen và hàm laetus_pgo_dump ghi chúng ra file profile"""
+
+    def __init__(self, module: ir.Module, runtime: Runtime, global_string):
+        self.module = module
+        self.runtime = runtime
+        self.global_string = global_string
+        # index -> (kind, hàm, dòng, bộ đếm số lần tính, bộ đếm số lần đúng)
+        self.branches = {}
+
+        if os.name == 'nt':
+            self.open = ir.Function(module, ir.FunctionType(i32, [i8_ptr, i32], var_arg=True), name="_open")
+            self.close = ir.Function(module, ir.FunctionType(i32, [i32]), name="_close")
+            self.open_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        else:
+            self.open = ir.Function(module, ir.FunctionType(i32, [i8_ptr, i32], var_arg=True), name="open")
+            self.close = ir.Function(module, ir.FunctionType(i32, [i32]), name="close")
+            self.open_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        self.getenv = ir.Function(module, ir.FunctionType(i8_ptr, [i8_ptr]), name="getenv")
+
+        # Thân hàm được sinh sau cùng (finish)
+        self.dump = ir.Function(module, ir.FunctionType(ir.VoidType(), []), name="laetus_pgo_dump")
+        self.dump.linkage = "internal"
+
+    def _counter(self, index, suffix):
+        # Không internal: -jit-lazy dùng chung bộ đếm theo tên giữa các thư viện
+        var = ir.GlobalVariable(self.module, i64, name=f"laetus_pgo_{index}_{suffix}")
+        var.initializer = ir.Constant(i64, 0)
+        return var
+
+    def count(self, builder, index, kind, func, line, cond):
+        """Đếm một lần tính điều kiện cond (i1) của nhánh index"""
+        if index not in self.branches:
+            self.branches[index] = (kind, func, line, self._counter(index, "n"), self._counter(index, "t"))
+        total, taken = self.branches[index][3:]
+        # Không rẽ nhánh thêm: số lần đúng cộng thẳng giá trị của điều kiện
+        builder.store(builder.add(builder.load(total), ir.Constant(i64, 1)), total)
+        builder.store(builder.add(builder.load(taken), builder.zext(cond, i64)), taken)
+
+    def finish(self):
+        """Sinh thân laetus_pgo_dump (được gọi trước khi main kết thúc)"""
+        rt = self.runtime
+        func = self.dump
+        builder = ir.IRBuilder(func.append_basic_block("entry"))
+        write_block = func.append_basic_block("write")
+        done = func.append_basic_block("done")
+
+        path = builder.call(self.getenv, [self.global_string(PROFILE_FILE_ENV)])
+        use_default = builder.icmp_unsigned("==", path, ir.Constant(i8_ptr, None))
+        path = builder.select(use_default, self.global_string(DEFAULT_PROFILE_FILE), path)
+        fd = builder.call(self.open, [path, ir.Constant(i32, self.open_flags), ir.Constant(i32, 0o644)])
+        # Output của chương trình phải được ghi ra trước khi đổi fd
+        builder.call(rt.flush, [])
+        builder.cbranch(builder.icmp_signed(">=", fd, ir.Constant(i32, 0)), write_block, done)
+
+        builder.position_at_end(write_block)
+        builder.store(fd, rt.out_fd)
+        builder.call(rt.put_str, [self.global_string(HEADER + "\n")])
+        for index, (kind, name, line, total, taken) in sorted(self.branches.items()):
+            builder.call(rt.put_str, [self.global_string(f"{index}\t{kind}\t{name}\t{line}\t")])
+            builder.call(rt.put_int, [builder.load(total)])
+            builder.call(rt.put_char, [ir.Constant(ir.IntType(8), ord("\t"))])
+            builder.call(rt.put_int, [builder.load(taken)])
+            builder.call(rt.put_char, [ir.Constant(ir.IntType(8), ord("\n"))])
+        builder.call(rt.flush, [])
+        builder.call(self.close, [fd])
+        builder.store(ir.Constant(i32, 1), rt.out_fd)
+        builder.branch(done)
+
+        builder.position_at_end(done)
+        builder.ret_void()
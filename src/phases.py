@@ -0,0 +1,114 @@
+import contextlib
+import time
+import sys
+import os
+
+# === PHASE TIMING (-time-phases / -time-phases=json) ===
+# Đo từng bước của một lần biên dịch (lexer, parse, emit_llvm, str(module),
+# tối ưu / sinh mã của LLVM, link, chạy JIT):
+#
+#   wall        thời gian thực (perf_counter)
+#   cpu         CPU của process và các process con đã kết thúc (link)
+#   py peak     đỉnh bộ nhớ Python được cấp phát trong bước (tracemalloc);
+#               bộ nhớ của LLVM (C++) và của clang không được tính
+#
+# cùng các số đếm: token, node AST, hàm / lệnh IR. Báo cáo được in ra stderr
+# để không lẫn với output của chương trình khi chạy bằng -jit. tracemalloc làm
+# front end chậm đi vài lần: chỉ so sánh các con số cùng được đo bằng
+# -time-phases với nhau. tracemalloc / json chỉ được import khi đo (xem
+# startup_bench.py).
+
+
+def time_phases_mode(flags):
+    """Đọc -time-phases / -time-phases=json. Trả về ("text" / "json" hoặc None, lỗi hoặc None)"""
+    for flag in flags:
+        if flag == "-time-phases":
+            return "text", None
+        if flag.startswith("-time-phases="):
+            value = flag[len("-time-phases="):]
+            if value not in ("text", "json"):
+                return None, f"Unknown -time-phases format '{value}' (text | json)"
+            return value, None
+    return None, None
+
+def cpu_time():
+    # os.times() chỉ chính xác tới tick (10ms): phần của process lấy từ process_time
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+class PhaseTimer:
+    def __init__(self, mode=None):
+        # mode None: không đo gì, phase() không làm gì
+        self.mode = mode
+        self.phases = []
+        self.counts = {}
+        if mode is not None:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.mode is None:
+            yield
+            return
+        import tracemalloc
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start_wall, start_cpu = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start_wall, cpu_time() - start_cpu
+            peak = max(0, tracemalloc.get_traced_memory()[1] - before)
+            self.phases.append({"phase": name, "wall": wall, "cpu": cpu, "py_peak": peak})
+
+    def count(self, name, value):
+        if self.mode is not None:
+            self.counts[name] = value
+
+    def report(self, file=None):
+        if self.mode is None:
+            return
+        file = file or sys.stderr
+        if self.mode == "json":
+            import json
+            total = {"wall": sum(p["wall"] for p in self.phases), "cpu": sum(p["cpu"] for p in self.phases)}
+            json.dump({"phases": self.phases, "total": total, "counts": self.counts}, file)
+            file.write("\n")
+        else:
+            file.write(self.format())
+        file.flush()
+
+    def format(self):
+        width = max([len("phase")] + [len(p["phase"]) for p in self.phases])
+        lines = [f"{'phase':<{width}}  {'wall':>10}  {'cpu':>10}  {'py peak':>10}"]
+        for p in self.phases:
+            lines.append(f"{p['phase']:<{width}}  {format_seconds(p['wall']):>10}  "
+                         f"{format_seconds(p['cpu']):>10}  {format_bytes(p['py_peak']):>10}")
+        lines.append(f"{'total':<{width}}  {format_seconds(sum(p['wall'] for p in self.phases)):>10}  "
+                     f"{format_seconds(sum(p['cpu'] for p in self.phases)):>10}")
+        if self.counts:
+            lines.append(", ".join(f"{name}: {value}" for name, value in self.counts.items()))
+        return "\n".join(lines) + "\n"
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+def format_bytes(size):
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size / (1024 * 1024):.1f}MB"
+
+def ir_counts(module):
+    """(số hàm được định nghĩa, số lệnh) của llvmlite.ir.Module hoặc binding.ModuleRef"""
+    functions = 0
+    instructions = 0
+    for func in module.functions:
+        if func.is_declaration: continue
+        functions += 1
+        for block in func.blocks:
+            instructions += len(list(block.instructions))
+    return functions, instructions
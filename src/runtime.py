@@ -0,0 +1,629 @@
+from llvmlite import ir
+from const import TYPE_INT, TYPE_FLOAT, TYPE_STR
+import os
+
+# === RUNTIME ===
+# Các hàm runtime được sinh thẳng vào module của chương trình (cùng được tối ưu,
+# inline như code của người dùng), thay cho printf / scanf của C.
+#
+# Output:
+#   laetus_out_buf / laetus_out_len   một buffer output lớn
+#   laetus_flush                      ghi buffer ra laetus_out_fd (1, stdout) bằng
+#                                     write(2); báo cáo của -profile ghi ra fd 2
+#   laetus_put_*                      ghi chuỗi / số vào buffer
+#
+# Buffer được ghi ra khi đầy, khi main kết thúc và trước mỗi lệnh input.
+# Số nguyên và số thực được định dạng bằng tay; số thực theo đúng "%.8g" của printf
+# (8 chữ số có nghĩa, bỏ số 0 thừa, dạng mũ khi số mũ < -4 hoặc >= 8).
+#
+# Input:
+#   laetus_in_buf / _pos / _len       stdin được đọc từng khối lớn bằng read(2)
+#   laetus_read_int / _float / _str   tách token (cách nhau bởi khoảng trắng)
+#                                     ngay trên buffer
+#
+# Giống scanf, khi không đọc được giá trị (hết input, sai định dạng) biến đích
+# giữ nguyên. Chuỗi được cấp phát đúng độ dài thay vì cố định 256 byte.
+#
+# Khi chương trình được tách thành nhiều module (-parallel), module của main định
+# nghĩa runtime như trên; các module khác (private) chỉ khai báo các buffer và có
+# bản internal của các hàm runtime để vẫn inline được.
+
+RUNTIME_PREFIX = "laetus_"
+
+OUT_BUF_SIZE = 1 << 16
+IN_BUF_SIZE = 1 << 16
+
+# Độ dài tối đa của token số thực đưa cho strtod
+FLOAT_TOKEN_SIZE = 64
+
+# Số chữ số có nghĩa của "%.8g"
+FLOAT_DIGITS = 8
+
+i1 = ir.IntType(1)
+i8 = ir.IntType(8)
+i32 = ir.IntType(32)
+i64 = ir.IntType(64)
+f64 = ir.DoubleType()
+i8_ptr = i8.as_pointer()
+
+
+def const_i8(c):
+    return ir.Constant(i8, ord(c))
+
+def const_i64(v):
+    return ir.Constant(i64, v)
+
+
+class Runtime:
+    def __init__(self, module: ir.Module, private=False):
+        self.module = module
+        self.private = private
+
+        buf_ty = ir.ArrayType(i8, OUT_BUF_SIZE)
+        self.out_buf = self._global("out_buf", buf_ty, ir.Constant(buf_ty, None))
+        self.out_len = self._global("out_len", i64, const_i64(0))
+        self.out_fd = self._global("out_fd", i32, ir.Constant(i32, 1))
+
+        in_buf_ty = ir.ArrayType(i8, IN_BUF_SIZE)
+        self.in_buf = self._global("in_buf", in_buf_ty, ir.Constant(in_buf_ty, None))
+        self.in_pos = self._global("in_pos", i64, const_i64(0))
+        self.in_len = self._global("in_len", i64, const_i64(0))
+
+        # --- C LIBRARY / INTRINSICS ---
+        if os.name == 'nt':
+            # msvcrt: int _write(int fd, const void *buf, unsigned int count), _read tương tự
+            self.write_count_ty = i32
+            self.write = ir.Function(module, ir.FunctionType(i32, [i32, i8_ptr, i32]), name="_write")
+            self.read = ir.Function(module, ir.FunctionType(i32, [i32, i8_ptr, i32]), name="_read")
+        else:
+            # ssize_t write(int fd, const void *buf, size_t count), read tương tự
+            self.write_count_ty = i64
+            self.write = ir.Function(module, ir.FunctionType(i64, [i32, i8_ptr, i64]), name="write")
+            self.read = ir.Function(module, ir.FunctionType(i64, [i32, i8_ptr, i64]), name="read")
+        self.strlen = ir.Function(module, ir.FunctionType(i64, [i8_ptr]), name="strlen")
+        self.realloc = ir.Function(module, ir.FunctionType(i8_ptr, [i8_ptr, i64]), name="realloc")
+        self.strtod = ir.Function(module, ir.FunctionType(f64, [i8_ptr, i8_ptr.as_pointer()]), name="strtod")
+        self.pow = module.globals.get("pow") or ir.Function(module, ir.FunctionType(f64, [f64, f64]), name="pow")
+        self.memcpy = module.declare_intrinsic("llvm.memcpy", [i8_ptr, i8_ptr, i64])
+        self.log10 = module.declare_intrinsic("llvm.log10", [f64])
+        self.floor = module.declare_intrinsic("llvm.floor", [f64])
+        self.round = module.declare_intrinsic("llvm.round", [f64])
+        self.fabs = module.declare_intrinsic("llvm.fabs", [f64])
+        self.fma = module.declare_intrinsic("llvm.fma", [f64], ir.FunctionType(f64, [f64, f64, f64]))
+
+        self.write_all = self._define_write_all()
+        self.flush = self._define_flush()
+        self.put_bytes = self._define_put_bytes()
+        self.put_char = self._define_put_char()
+        self.put_str = self._define_put_str()
+        self.put_int = self._define_put_int()
+        self.put_float = self._define_put_float()
+        self.put_value = self._define_put_value()
+
+        self.in_fill = self._define_in_fill()
+        self.in_peek = self._define_in_peek()
+        self.skip_space = self._define_skip_space()
+        self.read_int = self._define_read_int()
+        self.read_float = self._define_read_float()
+        self.read_str = self._define_read_str()
+
+    def _global(self, name, typ, initializer):
+        var = ir.GlobalVariable(self.module, typ, name=RUNTIME_PREFIX + name)
+        # Module private chỉ khai báo (external), bản duy nhất nằm ở module của main
+        if not self.private:
+            var.initializer = initializer
+        return var
+
+    def _function(self, name, ret, args):
+        func = ir.Function(self.module, ir.FunctionType(ret, args), name=RUNTIME_PREFIX + name)
+        if self.private:
+            func.linkage = "internal"
+        builder = ir.IRBuilder(func.append_basic_block("entry"))
+        return func, builder
+
+    def _buf_at(self, builder, index):
+        return builder.gep(self.out_buf, [ir.Constant(i32, 0), index])
+
+    # ================= BUFFER =================
+
+    def _define_write_all(self):
+        """write_all(p, n): gọi write(2) tới khi hết dữ liệu hoặc gặp lỗi"""
+        func, builder = self._function("write_all", ir.VoidType(), [i8_ptr, i64])
+        data, size = func.args
+        entry = builder.block
+        loop = func.append_basic_block("loop")
+        body = func.append_basic_block("body")
+        done = func.append_basic_block("done")
+
+        builder.branch(loop)
+        builder.position_at_end(loop)
+        offset = builder.phi(i64)
+        offset.add_incoming(const_i64(0), entry)
+        builder.cbranch(builder.icmp_signed("<", offset, size), body, done)
+
+        builder.position_at_end(body)
+        left = builder.sub(size, offset)
+        if self.write_count_ty is i32:
+            # _write nhận unsigned int: chia thành từng khối <= 1 GiB
+            left = builder.select(builder.icmp_signed(">", left, const_i64(1 << 30)), const_i64(1 << 30), left)
+            left = builder.trunc(left, i32)
+        written = builder.call(self.write, [builder.load(self.out_fd), builder.gep(data, [offset]), left])
+        if self.write_count_ty is i32:
+            written = builder.sext(written, i64)
+        offset.add_incoming(builder.add(offset, written), body)
+        builder.cbranch(builder.icmp_signed(">", written, const_i64(0)), loop, done)
+
+        builder.position_at_end(done)
+        builder.ret_void()
+        return func
+
+    def _define_flush(self):
+        func, builder = self._function("flush", ir.VoidType(), [])
+        size = builder.load(self.out_len)
+        with builder.if_then(builder.icmp_signed(">", size, const_i64(0))):
+            builder.call(self.write_all, [self._buf_at(builder, const_i64(0)), size])
+            builder.store(const_i64(0), self.out_len)
+        builder.ret_void()
+        return func
+
+    def _define_put_bytes(self):
+        func, builder = self._function("put_bytes", ir.VoidType(), [i8_ptr, i64])
+        data, size = func.args
+
+        size_now = builder.load(self.out_len)
+        with builder.if_then(builder.icmp_signed(">", builder.add(size_now, size), const_i64(OUT_BUF_SIZE))):
+            builder.call(self.flush, [])
+
+            # Khối lớn hơn cả buffer thì ghi thẳng
+            with builder.if_then(builder.icmp_signed(">", size, const_i64(OUT_BUF_SIZE))):
+                builder.call(self.write_all, [data, size])
+                builder.ret_void()
+
+        size_now = builder.load(self.out_len)
+        builder.call(self.memcpy, [self._buf_at(builder, size_now), data, size, ir.Constant(i1, 0)])
+        builder.store(builder.add(size_now, size), self.out_len)
+        builder.ret_void()
+        return func
+
+    def _define_put_char(self):
+        func, builder = self._function("put_char", ir.VoidType(), [i8])
+        with builder.if_then(builder.icmp_signed("==", builder.load(self.out_len), const_i64(OUT_BUF_SIZE))):
+            builder.call(self.flush, [])
+        size_now = builder.load(self.out_len)
+        builder.store(func.args[0], self._buf_at(builder, size_now))
+        builder.store(builder.add(size_now, const_i64(1)), self.out_len)
+        builder.ret_void()
+        return func
+
+    def _define_put_str(self):
+        func, builder = self._function("put_str", ir.VoidType(), [i8_ptr])
+        with builder.if_then(builder.icmp_unsigned("!=", func.args[0], ir.Constant(i8_ptr, None))):
+            builder.call(self.put_bytes, [func.args[0], builder.call(self.strlen, [func.args[0]])])
+        builder.ret_void()
+        return func
+
+    # ================= NUMBERS =================
+
+    def _define_put_int(self):
+        """Chữ số được ghi ngược từ cuối một mảng tạm rồi đổ vào buffer một lần.
+        Giá trị tuyệt đối tính theo số không dấu nên -2^63 vẫn đúng."""
+        func, builder = self._function("put_int", ir.VoidType(), [i64])
+        value = func.args[0]
+        size = 24
+        tmp = builder.alloca(ir.ArrayType(i8, size))
+        entry = builder.block
+
+        negative = builder.icmp_signed("<", value, const_i64(0))
+        magnitude = builder.select(negative, builder.sub(const_i64(0), value), value)
+
+        loop = func.append_basic_block("digit")
+        done = func.append_basic_block("done")
+        builder.branch(loop)
+
+        builder.position_at_end(loop)
+        rest = builder.phi(i64)
+        pos = builder.phi(i64)
+        rest.add_incoming(magnitude, entry)
+        pos.add_incoming(const_i64(size), entry)
+        new_pos = builder.sub(pos, const_i64(1))
+        digit = builder.trunc(builder.urem(rest, const_i64(10)), i8)
+        builder.store(builder.add(digit, const_i8("0")), builder.gep(tmp, [ir.Constant(i32, 0), new_pos]))
+        new_rest = builder.udiv(rest, const_i64(10))
+        rest.add_incoming(new_rest, loop)
+        pos.add_incoming(new_pos, loop)
+        builder.cbranch(builder.icmp_unsigned("!=", new_rest, const_i64(0)), loop, done)
+
+        builder.position_at_end(done)
+        sign_pos = builder.sub(new_pos, const_i64(1))
+        with builder.if_then(negative):
+            builder.store(const_i8("-"), builder.gep(tmp, [ir.Constant(i32, 0), sign_pos]))
+        start = builder.select(negative, sign_pos, new_pos)
+        builder.call(self.put_bytes, [builder.gep(tmp, [ir.Constant(i32, 0), start]), builder.sub(const_i64(size), start)])
+        builder.ret_void()
+        return func
+
+    def _emit_literal(self, builder, text):
+        for c in text:
+            builder.call(self.put_char, [const_i8(c)])
+
+    def _scaled(self, builder, value, power):
+        """(value * 10^power, sai số) với sai số cùng dấu với (giá trị đúng - kết quả).
+        10^k là số double chính xác khi |k| <= 22 nên fma cho sai số chính xác của
+        phép nhân / chia cuối cùng. Với số rất nhỏ (subnormal) 10^power vượt quá
+        double nên nhân hai lần."""
+        big = builder.icmp_signed(">", power, ir.Constant(i32, 300))
+        first = builder.select(big, ir.Constant(i32, 300), power)
+        second = builder.select(big, builder.sub(power, ir.Constant(i32, 300)), ir.Constant(i32, 0))
+
+        def times_pow10(x, k):
+            negative = builder.icmp_signed("<", k, ir.Constant(i32, 0))
+            magnitude = builder.call(self.pow, [ir.Constant(f64, 10.0), builder.call(self.fabs, [builder.sitofp(k, f64)])])
+            product = builder.fmul(x, magnitude)
+            quotient = builder.fdiv(x, magnitude)
+            # x*p - product  /  x - quotient*p
+            product_err = builder.call(self.fma, [x, magnitude, builder.fneg(product)])
+            quotient_err = builder.call(self.fma, [builder.fneg(quotient), magnitude, x])
+            return builder.select(negative, quotient, product), builder.select(negative, quotient_err, product_err)
+
+        scaled, error = times_pow10(value, first)
+        scaled_big, error_big = times_pow10(scaled, second)
+        return builder.select(big, scaled_big, scaled), builder.select(big, error_big, error)
+
+    def _round_scaled(self, builder, scaled, error):
+        """Làm tròn về số nguyên gần nhất như printf: trường hợp scaled rơi đúng
+        vào x.5 thì dựa vào sai số để biết giá trị thật nằm bên nào, hòa hẳn thì
+        làm tròn về số chẵn"""
+        down = builder.call(self.floor, [scaled])
+        up = builder.fadd(down, ir.Constant(f64, 1.0))
+        nearest = builder.call(self.round, [scaled])
+        is_half = builder.fcmp_ordered("==", builder.fsub(scaled, down), ir.Constant(f64, 0.5))
+
+        down_int = builder.fptosi(down, i64)
+        down_even = builder.icmp_signed("==", builder.and_(down_int, const_i64(1)), const_i64(0))
+        tie = builder.select(down_even, down, up)
+        below = builder.fcmp_ordered("<", error, ir.Constant(f64, 0.0))
+        above = builder.fcmp_ordered(">", error, ir.Constant(f64, 0.0))
+        half = builder.select(below, down, builder.select(above, up, tie))
+
+        return builder.fptosi(builder.select(is_half, half, nearest), i64)
+
+    def _define_put_float(self):
+        func, builder = self._function("put_float", ir.VoidType(), [f64])
+        value = func.args[0]
+
+        negative = builder.icmp_signed("<", builder.bitcast(value, i64), const_i64(0))
+        magnitude = builder.call(self.fabs, [value])
+
+        # --- NaN / inf / 0 như glibc ---
+        special = func.append_basic_block("special")
+        finite = func.append_basic_block("finite")
+        is_nan = builder.fcmp_unordered("uno", value, value)
+        is_inf = builder.fcmp_ordered("==", magnitude, ir.Constant(f64, float("inf")))
+        is_zero = builder.fcmp_ordered("==", magnitude, ir.Constant(f64, 0.0))
+        builder.cbranch(builder.or_(is_nan, builder.or_(is_inf, is_zero)), special, finite)
+
+        builder.position_at_end(special)
+        with builder.if_then(negative):
+            builder.call(self.put_char, [const_i8("-")])
+        with builder.if_else(is_nan) as (then, otherwise):
+            with then:
+                self._emit_literal(builder, "nan")
+            with otherwise:
+                with builder.if_else(is_inf) as (then_inf, then_zero):
+                    with then_inf:
+                        self._emit_literal(builder, "inf")
+                    with then_zero:
+                        self._emit_literal(builder, "0")
+        builder.ret_void()
+
+        # --- 8 chữ số có nghĩa: m = round(|x| * 10^(7 - e)), 10^7 <= m < 10^8 ---
+        builder.position_at_end(finite)
+        low = const_i64(10 ** (FLOAT_DIGITS - 1))
+        high = const_i64(10 ** FLOAT_DIGITS)
+        exp_ptr = builder.alloca(i32)
+        mant_ptr = builder.alloca(i64)
+
+        def mantissa(exponent):
+            scaled, error = self._scaled(builder, magnitude, builder.sub(ir.Constant(i32, FLOAT_DIGITS - 1), exponent))
+            return self._round_scaled(builder, scaled, error)
+
+        exponent = builder.fptosi(builder.call(self.floor, [builder.call(self.log10, [magnitude])]), i32)
+        builder.store(exponent, exp_ptr)
+        builder.store(mantissa(exponent), mant_ptr)
+
+        # log10 có thể lệch một đơn vị ở gần lũy thừa của 10: tính lại với số mũ đúng
+        m = builder.load(mant_ptr)
+        with builder.if_then(builder.icmp_signed(">=", m, high)):
+            e = builder.add(builder.load(exp_ptr), ir.Constant(i32, 1))
+            builder.store(e, exp_ptr)
+            builder.store(mantissa(e), mant_ptr)
+        m = builder.load(mant_ptr)
+        with builder.if_then(builder.icmp_signed("<", m, low)):
+            e = builder.sub(builder.load(exp_ptr), ir.Constant(i32, 1))
+            builder.store(e, exp_ptr)
+            builder.store(mantissa(e), mant_ptr)
+        # Làm tròn lên thành 10^8 (ví dụ 9.99999999)
+        m = builder.load(mant_ptr)
+        with builder.if_then(builder.icmp_signed(">=", m, high)):
+            builder.store(builder.udiv(m, const_i64(10)), mant_ptr)
+            builder.store(builder.add(builder.load(exp_ptr), ir.Constant(i32, 1)), exp_ptr)
+
+        # --- Chữ số ASCII và số chữ số sau khi bỏ số 0 ở cuối ---
+        digits = builder.alloca(ir.ArrayType(i8, FLOAT_DIGITS))
+        count_ptr = builder.alloca(i64)
+        builder.store(const_i64(FLOAT_DIGITS), count_ptr)
+        m = builder.load(mant_ptr)
+        for i in reversed(range(FLOAT_DIGITS)):
+            digit = builder.trunc(builder.urem(m, const_i64(10)), i8)
+            builder.store(builder.add(digit, const_i8("0")), builder.gep(digits, [ir.Constant(i32, 0), ir.Constant(i32, i)]))
+            # Chữ số khác 0 đầu tiên tính từ cuối quyết định độ dài
+            is_trailing = builder.and_(
+                builder.icmp_unsigned("==", digit, ir.Constant(i8, 0)),
+                builder.icmp_signed("==", builder.load(count_ptr), const_i64(i + 1)))
+            with builder.if_then(builder.and_(is_trailing, ir.Constant(i1, i > 0))):
+                builder.store(const_i64(i), count_ptr)
+            m = builder.udiv(m, const_i64(10))
+        count = builder.load(count_ptr)
+        exponent = builder.load(exp_ptr)
+
+        def digit_at(index):
+            return builder.load(builder.gep(digits, [ir.Constant(i32, 0), index]))
+
+        def put_digits(start, end):
+            """put_bytes(digits[start:end]) nếu start < end"""
+            with builder.if_then(builder.icmp_signed("<", start, end)):
+                builder.call(self.put_bytes, [builder.gep(digits, [ir.Constant(i32, 0), start]), builder.sub(end, start)])
+
+        with builder.if_then(negative):
+            builder.call(self.put_char, [const_i8("-")])
+
+        use_exp = builder.or_(
+            builder.icmp_signed("<", exponent, ir.Constant(i32, -4)),
+            builder.icmp_signed(">=", exponent, ir.Constant(i32, FLOAT_DIGITS)))
+        with builder.if_else(use_exp) as (then_exp, otherwise):
+            with then_exp:
+                # d[.ddd]e±XX
+                builder.call(self.put_char, [digit_at(const_i64(0))])
+                with builder.if_then(builder.icmp_signed(">", count, const_i64(1))):
+                    builder.call(self.put_char, [const_i8(".")])
+                    put_digits(const_i64(1), count)
+                builder.call(self.put_char, [const_i8("e")])
+                exp_negative = builder.icmp_signed("<", exponent, ir.Constant(i32, 0))
+                builder.call(self.put_char, [builder.select(exp_negative, const_i8("-"), const_i8("+"))])
+                exp_abs = builder.sext(builder.select(exp_negative, builder.neg(exponent), exponent), i64)
+                with builder.if_then(builder.icmp_signed("<", exp_abs, const_i64(10))):
+                    builder.call(self.put_char, [const_i8("0")])
+                builder.call(self.put_int, [exp_abs])
+            with otherwise:
+                exp64 = builder.sext(exponent, i64)
+                with builder.if_else(builder.icmp_signed(">=", exponent, ir.Constant(i32, 0))) as (then_fixed, then_small):
+                    with then_fixed:
+                        # ddd[.ddd]
+                        int_end = builder.add(exp64, const_i64(1))
+                        put_digits(const_i64(0), int_end)
+                        with builder.if_then(builder.icmp_signed(">", count, int_end)):
+                            builder.call(self.put_char, [const_i8(".")])
+                            put_digits(int_end, count)
+                    with then_small:
+                        # 0.000ddd
+                        self._emit_literal(builder, "0.")
+                        zeros = builder.sub(builder.sub(const_i64(0), exp64), const_i64(1))
+                        for i in range(3):
+                            with builder.if_then(builder.icmp_signed(">", zeros, const_i64(i))):
+                                builder.call(self.put_char, [const_i8("0")])
+                        put_digits(const_i64(0), count)
+        builder.ret_void()
+        return func
+
+    # ================= DYNAMIC VALUES =================
+
+    def _define_put_value(self):
+        """In giá trị có kiểu chỉ biết lúc chạy theo tag của var_struct"""
+        func, builder = self._function("put_value", ir.VoidType(), [i8, i64, f64, i8_ptr])
+        tag, int_val, float_val, str_val = func.args
+
+        done = func.append_basic_block("done")
+        switch = builder.switch(tag, done)
+        for type_tag, put, arg in (
+            (TYPE_INT, self.put_int, int_val),
+            (TYPE_FLOAT, self.put_float, float_val),
+            (TYPE_STR, self.put_str, str_val),
+        ):
+            block = func.append_basic_block(f"tag_{type_tag}")
+            switch.add_case(ir.Constant(i8, type_tag), block)
+            builder.position_at_end(block)
+            builder.call(put, [arg])
+            builder.branch(done)
+
+        builder.position_at_end(done)
+        builder.ret_void()
+        return func
+
+    # ================= INPUT =================
+
+    def _in_at(self, builder, index):
+        return builder.gep(self.in_buf, [ir.Constant(i32, 0), index])
+
+    def _define_in_fill(self):
+        """Đọc khối tiếp theo của stdin vào buffer, trả về 0 khi hết input"""
+        func, builder = self._function("in_fill", i1, [])
+        got = builder.call(self.read, [ir.Constant(i32, 0), self._in_at(builder, const_i64(0)), ir.Constant(self.write_count_ty, IN_BUF_SIZE)])
+        if self.write_count_ty is i32:
+            got = builder.sext(got, i64)
+        got = builder.select(builder.icmp_signed(">", got, const_i64(0)), got, const_i64(0))
+        builder.store(got, self.in_len)
+        builder.store(const_i64(0), self.in_pos)
+        builder.ret(builder.icmp_signed(">", got, const_i64(0)))
+        return func
+
+    def _define_in_peek(self):
+        """Ký tự hiện tại (0..255) mà không tiêu thụ, -1 khi hết input"""
+        func, builder = self._function("in_peek", i32, [])
+        ready = func.append_basic_block("ready")
+        eof = func.append_basic_block("eof")
+
+        empty = builder.icmp_signed(">=", builder.load(self.in_pos), builder.load(self.in_len))
+        with builder.if_then(empty):
+            builder.cbranch(builder.call(self.in_fill, []), ready, eof)
+        builder.branch(ready)
+
+        builder.position_at_end(ready)
+        c = builder.load(self._in_at(builder, builder.load(self.in_pos)))
+        builder.ret(builder.zext(c, i32))
+
+        builder.position_at_end(eof)
+        builder.ret(ir.Constant(i32, -1))
+        return func
+
+    def _advance(self, builder):
+        builder.store(builder.add(builder.load(self.in_pos), const_i64(1)), self.in_pos)
+
+    def _is_space(self, builder, c):
+        # ' ', \t, \n, \v, \f, \r như isspace()
+        is_blank = builder.icmp_signed("==", c, ir.Constant(i32, ord(" ")))
+        in_range = builder.icmp_unsigned("<=", builder.sub(c, ir.Constant(i32, 9)), ir.Constant(i32, 4))
+        return builder.or_(is_blank, in_range)
+
+    def _is_digit(self, builder, c):
+        return builder.icmp_unsigned("<=", builder.sub(c, ir.Constant(i32, ord("0"))), ir.Constant(i32, 9))
+
+    def _loop(self, func, builder, name):
+        """Tạo khối (cond, body, done) cho một vòng lặp while"""
+        cond = func.append_basic_block(name + ".cond")
+        body = func.append_basic_block(name + ".body")
+        done = func.append_basic_block(name + ".end")
+        builder.branch(cond)
+        builder.position_at_end(cond)
+        return body, done
+
+    def _define_skip_space(self):
+        """Bỏ khoảng trắng, trả về ký tự đầu tiên của token (hoặc -1)"""
+        func, builder = self._function("skip_space", i32, [])
+        body, done = self._loop(func, builder, "space")
+        c = builder.call(self.in_peek, [])
+        builder.cbranch(self._is_space(builder, c), body, done)
+
+        builder.position_at_end(body)
+        self._advance(builder)
+        builder.branch(c.parent)
+
+        builder.position_at_end(done)
+        builder.ret(c)
+        return func
+
+    def _define_read_int(self):
+        """read_int(i64* out): [+-]digits, dừng ở ký tự không phải số"""
+        func, builder = self._function("read_int", ir.VoidType(), [i64.as_pointer()])
+        out = func.args[0]
+        negative_ptr = builder.alloca(i1)
+        value_ptr = builder.alloca(i64)
+        digits_ptr = builder.alloca(i64)
+        builder.store(ir.Constant(i1, 0), negative_ptr)
+        builder.store(const_i64(0), value_ptr)
+        builder.store(const_i64(0), digits_ptr)
+
+        c = builder.call(self.skip_space, [])
+        is_minus = builder.icmp_signed("==", c, ir.Constant(i32, ord("-")))
+        is_plus = builder.icmp_signed("==", c, ir.Constant(i32, ord("+")))
+        with builder.if_then(builder.or_(is_minus, is_plus)):
+            builder.store(is_minus, negative_ptr)
+            self._advance(builder)
+
+        body, done = self._loop(func, builder, "digit")
+        c = builder.call(self.in_peek, [])
+        builder.cbranch(self._is_digit(builder, c), body, done)
+
+        builder.position_at_end(body)
+        digit = builder.zext(builder.sub(c, ir.Constant(i32, ord("0"))), i64)
+        builder.store(builder.add(builder.mul(builder.load(value_ptr), const_i64(10)), digit), value_ptr)
+        builder.store(builder.add(builder.load(digits_ptr), const_i64(1)), digits_ptr)
+        self._advance(builder)
+        builder.branch(c.parent)
+
+        builder.position_at_end(done)
+        with builder.if_then(builder.icmp_signed(">", builder.load(digits_ptr), const_i64(0))):
+            value = builder.load(value_ptr)
+            builder.store(builder.select(builder.load(negative_ptr), builder.sub(const_i64(0), value), value), out)
+        builder.ret_void()
+        return func
+
+    def _define_read_float(self):
+        """read_float(double* out): gom token gồm dấu, chữ số, '.', e/E
+        (và chữ cái cho inf/nan) rồi để strtod chuyển đổi cho đúng làm tròn"""
+        func, builder = self._function("read_float", ir.VoidType(), [f64.as_pointer()])
+        out = func.args[0]
+        token = builder.alloca(ir.ArrayType(i8, FLOAT_TOKEN_SIZE))
+        size_ptr = builder.alloca(i64)
+        end_ptr = builder.alloca(i8_ptr)
+        builder.store(const_i64(0), size_ptr)
+
+        builder.call(self.skip_space, [])
+        body, done = self._loop(func, builder, "char")
+        c = builder.call(self.in_peek, [])
+        size = builder.load(size_ptr)
+        is_alpha = builder.icmp_unsigned("<=", builder.sub(builder.or_(c, ir.Constant(i32, 0x20)), ir.Constant(i32, ord("a"))), ir.Constant(i32, 25))
+        is_sign = builder.or_(
+            builder.icmp_signed("==", c, ir.Constant(i32, ord("-"))),
+            builder.icmp_signed("==", c, ir.Constant(i32, ord("+"))))
+        is_dot = builder.icmp_signed("==", c, ir.Constant(i32, ord(".")))
+        is_part = builder.or_(builder.or_(self._is_digit(builder, c), is_alpha), builder.or_(is_sign, is_dot))
+        has_room = builder.icmp_signed("<", size, const_i64(FLOAT_TOKEN_SIZE - 1))
+        builder.cbranch(builder.and_(is_part, has_room), body, done)
+
+        builder.position_at_end(body)
+        builder.store(builder.trunc(c, i8), builder.gep(token, [ir.Constant(i32, 0), size]))
+        builder.store(builder.add(size, const_i64(1)), size_ptr)
+        self._advance(builder)
+        builder.branch(c.parent)
+
+        builder.position_at_end(done)
+        builder.store(ir.Constant(i8, 0), builder.gep(token, [ir.Constant(i32, 0), size]))
+        start = builder.gep(token, [ir.Constant(i32, 0), const_i64(0)])
+        value = builder.call(self.strtod, [start, end_ptr])
+        # strtod không đọc được ký tự nào: giữ nguyên biến
+        with builder.if_then(builder.icmp_unsigned("!=", builder.load(end_ptr), start)):
+            builder.store(value, out)
+        builder.ret_void()
+        return func
+
+    def _define_read_str(self):
+        """read_str(i8** out): token tới khoảng trắng kế tiếp, cấp phát đúng độ dài"""
+        func, builder = self._function("read_str", ir.VoidType(), [i8_ptr.as_pointer()])
+        out = func.args[0]
+        mem_ptr = builder.alloca(i8_ptr)
+        cap_ptr = builder.alloca(i64)
+        size_ptr = builder.alloca(i64)
+        builder.store(ir.Constant(i8_ptr, None), mem_ptr)
+        builder.store(const_i64(0), cap_ptr)
+        builder.store(const_i64(0), size_ptr)
+
+        first = builder.call(self.skip_space, [])
+        with builder.if_then(builder.icmp_signed("<", first, ir.Constant(i32, 0))):
+            builder.ret_void()
+
+        body, done = self._loop(func, builder, "char")
+        c = builder.call(self.in_peek, [])
+        at_end = builder.or_(builder.icmp_signed("<", c, ir.Constant(i32, 0)), self._is_space(builder, c))
+        builder.cbranch(at_end, done, body)
+
+        builder.position_at_end(body)
+        size = builder.load(size_ptr)
+        # Luôn chừa một byte cho '\0'; hết chỗ thì gấp đôi
+        with builder.if_then(builder.icmp_signed(">=", builder.add(size, const_i64(1)), builder.load(cap_ptr))):
+            cap = builder.load(cap_ptr)
+            new_cap = builder.select(builder.icmp_signed("==", cap, const_i64(0)), const_i64(16), builder.mul(cap, const_i64(2)))
+            builder.store(builder.call(self.realloc, [builder.load(mem_ptr), new_cap]), mem_ptr)
+            builder.store(new_cap, cap_ptr)
+        builder.store(builder.trunc(c, i8), builder.gep(builder.load(mem_ptr), [size]))
+        builder.store(builder.add(size, const_i64(1)), size_ptr)
+        self._advance(builder)
+        builder.branch(c.parent)
+
+        builder.position_at_end(done)
+        size = builder.load(size_ptr)
+        mem = builder.load(mem_ptr)
+        builder.store(ir.Constant(i8, 0), builder.gep(mem, [size]))
+        # Thu lại phần dư để chuỗi chiếm đúng độ dài của nó
+        builder.store(builder.call(self.realloc, [mem, builder.add(size, const_i64(1))]), out)
+        builder.ret_void()
+        return func
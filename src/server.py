@@ -0,0 +1,353 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import socketserver
+import contextlib
+import threading
+import tempfile
+import signal
+import socket
+import time
+import sys
+import io
+import os
+from llvm_code_gen import create_target_machine, run_jit
+from batch import BuildSettings, BuildResult, compile_source, single_file_flag
+from cache import open_cache
+from optimize import OptOptions
+from memo import MemoOptions
+from linker import link
+from client import default_socket_path, send_message, recv_message, modes
+
+# === COMPILE SERVER (laetus serve) ===
+# Daemon giữ sẵn LLVM đã khởi tạo và target machine trong một pool worker
+# (process), nhận request từ client.py qua Unix socket:
+#
+#   source + flag  ->  exe, object, assembly, hoặc output của lần chạy JIT
+#
+#   -socket <path>      đường dẫn socket (mặc định $LAETUS_SOCKET,
+#                       $XDG_RUNTIME_DIR/laetus.sock hoặc /tmp/laetus-<uid>.sock)
+#   -j <n>              số worker (mặc định: số core)
+#   -idle-timeout=<s>   tự tắt sau <s> giây không có request (mặc định 600, 0: không tắt)
+#   -run-timeout=<s>    giới hạn thời gian chạy của mỗi request -jit (mặc định 60, 0: không giới hạn)
+#   -no-cache           không dùng compile cache
+#
+# Mỗi kết nối được xử lý trong một thread, việc biên dịch nằm ở worker nên
+# nhiều request chạy song song. Chương trình của request -jit không chạy trong
+# worker: worker fork một process con cho mỗi lần chạy (LLVM đã khởi tạo sẵn
+# trong worker nên con không phải làm lại), nối fd 0 / fd 1 của con vào file
+# tạm rồi chờ nó bằng waitpid. Chương trình crash (segfault, tràn stack) hay
+# chạy quá -run-timeout chỉ làm hỏng request của nó; worker không bị ảnh hưởng.
+
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_RUN_TIMEOUT = 60
+
+
+# ================= WORKER =================
+
+# Compile cache, giới hạn thời gian chạy và target machine theo mức tối ưu của process worker
+worker_cache = None
+run_timeout = DEFAULT_RUN_TIMEOUT
+target_machines = {}
+
+def init_worker(use_cache, timeout=DEFAULT_RUN_TIMEOUT):
+    global worker_cache, run_timeout
+    worker_cache = open_cache() if use_cache else None
+    run_timeout = timeout
+    target_machine_for(OptOptions().level)
+
+def target_machine_for(level):
+    if level not in target_machines:
+        target_machines[level] = create_target_machine(level)
+    return target_machines[level]
+
+def ready():
+    return os.getpid()
+
+def failure(messages, output=b""):
+    return {"status": 1, "messages": messages}, output
+
+def handle_request(header: dict, stdin: bytes):
+    flags = {flag: {} for flag in header.get("flags", [])}
+    mode = header.get("mode", "exe")
+    if mode not in modes:
+        return failure(f"ERROR: Unknown mode '{mode}'\n")
+    error = single_file_flag(flags)
+    if error:
+        return failure(f"ERROR: {error}\n")
+    opt_options, error = OptOptions.from_flags(flags)
+    if error:
+        return failure(f"ERROR: {error}\n")
+    memo_options, error = MemoOptions.from_flags(flags)
+    if error:
+        return failure(f"ERROR: {error}\n")
+
+    settings = BuildSettings(flags, opt_options, memo_options)
+    settings.kind = "assembly" if mode == "assembly" else "object"
+    cache = worker_cache if settings.use_cache else None
+    result = BuildResult(header.get("name", "<source>"), None)
+
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            output = compile_source(header["source"] + "\n", result, settings,
+                                    target_machine_for(opt_options.level), cache)
+            if output is None:
+                return failure(messages.getvalue() + f"ERROR: {result.error}\n")
+
+            step = time.perf_counter()
+            if mode == "assembly":
+                payload = output.encode("utf-8")
+            elif mode == "object":
+                payload = output
+            elif mode == "exe":
+                payload = link_executable(output)
+            else:
+                payload, error = run_captured(output, opt_options, stdin, run_timeout)
+                if error is not None:
+                    # Output đã ghi trước khi chương trình chết vẫn được gửi về
+                    return failure(messages.getvalue() + f"ERROR: {error}\n", payload)
+            result.link = time.perf_counter() - step
+    except RuntimeError as e:
+        return failure(messages.getvalue() + f"LLVM Error: {e}\n")
+    except Exception as e:
+        return failure(messages.getvalue() + f"ERROR: {type(e).__name__}: {e}\n")
+
+    response = {
+        "status": 0,
+        "messages": messages.getvalue(),
+        "cached": result.cached,
+        "timings": {"front": result.front, "llvm": result.codegen, "finish": result.link},
+    }
+    return response, payload
+
+def link_executable(object_data):
+    with tempfile.TemporaryDirectory(prefix="laetus_") as directory:
+        object_file = os.path.join(directory, "a.o")
+        output_file = os.path.join(directory, "a.exe")
+        with open(object_file, "wb") as f:
+            f.write(object_data)
+        link(object_file, output_file)
+        with open(output_file, "rb") as f:
+            return f.read()
+
+def run_captured(object_data, options: OptOptions, stdin: bytes, timeout=None):
+    """Chạy object bằng JIT trong một process con với fd 0 / fd 1 nối vào file
+    tạm. Trả về (output, lỗi hoặc None)"""
+    with tempfile.TemporaryFile() as inp, tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        inp.write(stdin)
+        inp.seek(0)
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Process con: không bao giờ quay lại vòng lặp của worker
+            status = 1
+            try:
+                os.dup2(inp.fileno(), 0)
+                os.dup2(out.fileno(), 1)
+                run_jit(object_data, options=options)
+                status = 0
+            except RuntimeError as e:
+                os.write(err.fileno(), f"LLVM Error: {e}".encode("utf-8"))
+            except BaseException as e:
+                os.write(err.fileno(), f"{type(e).__name__}: {e}".encode("utf-8"))
+            finally:
+                os._exit(status)
+
+        error = wait_program(pid, timeout)
+        if error is not None:
+            err.seek(0)
+            error = err.read().decode("utf-8", "replace") or error
+        out.seek(0)
+        return out.read(), error
+
+def wait_program(pid, timeout=None):
+    """Chờ process con pid kết thúc (giết nó nếu quá timeout giây).
+    None nếu nó thoát bình thường, không thì mô tả lỗi"""
+    deadline = time.monotonic() + timeout if timeout else None
+    delay = 0.001
+    while True:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done: break
+        if deadline is not None and time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return f"The program did not finish in {timeout:g}s and was killed"
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+    if os.WIFSIGNALED(status):
+        number = os.WTERMSIG(status)
+        try:
+            name = signal.Signals(number).name
+        except ValueError:
+            name = "unknown signal"
+        return f"The program was killed by signal {number} ({name})"
+    if os.WEXITSTATUS(status) != 0:
+        return f"The program exited with status {os.WEXITSTATUS(status)}"
+    return None
+
+
+# ================= SERVER =================
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        server.begin()
+        try:
+            header, payload = recv_message(self.request)
+            if header.get("command") == "stop":
+                send_message(self.request, {"status": 0, "messages": "laetus server stopped\n"})
+                server.stop()
+                return
+            response, data = server.submit(header, payload)
+            send_message(self.request, response, data)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            server.end()
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, jobs=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, use_cache=True,
+                 run_timeout=DEFAULT_RUN_TIMEOUT):
+        super().__init__(path, RequestHandler)
+        self.path = path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.idle_timeout = idle_timeout
+        self.use_cache = use_cache
+        self.run_timeout = run_timeout
+
+        self.lock = threading.Lock()
+        self.active = 0
+        self.last_request = time.monotonic()
+        self.pool = self._start_pool()
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=init_worker,
+                                   initargs=(self.use_cache, self.run_timeout))
+        # Khởi động đủ worker ngay: LLVM sẵn sàng trước request đầu tiên
+        for future in [pool.submit(ready) for _ in range(self.jobs)]:
+            future.result()
+        return pool
+
+    def submit(self, header, payload):
+        with self.lock:
+            pool = self.pool
+        try:
+            return pool.submit(handle_request, header, payload).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = self._start_pool()
+            return failure("ERROR: The compile worker crashed\n")
+
+    def begin(self):
+        with self.lock:
+            self.active += 1
+
+    def end(self):
+        with self.lock:
+            self.active -= 1
+            self.last_request = time.monotonic()
+
+    def stop(self):
+        # shutdown() chờ serve_forever dừng: không gọi được từ thread của nó
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def watch_idle(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 1.0))
+            with self.lock:
+                idle = self.active == 0 and time.monotonic() - self.last_request >= self.idle_timeout
+            if idle:
+                self.shutdown()
+                return
+
+    def run(self):
+        if self.idle_timeout > 0:
+            threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self.serve_forever(poll_interval=0.5)
+        finally:
+            self.server_close()
+            self.pool.shutdown(cancel_futures=True)
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+
+
+def server_running(path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+def parse_serve_args(args):
+    """Trả về (socket, số worker, idle timeout, run timeout, dùng cache, lỗi hoặc None)"""
+    path = None
+    jobs = None
+    timeouts = {"-idle-timeout": DEFAULT_IDLE_TIMEOUT, "-run-timeout": DEFAULT_RUN_TIMEOUT}
+    error = None
+    i = 0
+    while i < len(args) and error is None:
+        arg = args[i]
+        name, sep, value = arg.partition("=")
+        if arg in ("-socket", "-j"):
+            if i + 1 >= len(args):
+                error = f"Missing value after {arg}"
+                break
+            value = args[i + 1]
+            i += 1
+            if arg == "-socket":
+                path = value
+            elif not value.isdigit() or int(value) < 1:
+                error = f"Invalid number of jobs '{value}'"
+            else:
+                jobs = int(value)
+        elif sep and name in timeouts:
+            try:
+                timeouts[name] = float(value)
+            except ValueError:
+                error = f"Invalid {name[1:].replace('-', ' ')} '{value}'"
+        elif arg != "-no-cache":
+            error = f"Unknown option '{arg}'"
+        i += 1
+    return (path or default_socket_path(), jobs, timeouts["-idle-timeout"], timeouts["-run-timeout"],
+            "-no-cache" not in args, error)
+
+def run_server(args):
+    if not hasattr(socket, "AF_UNIX"):
+        print("ERROR:", "The compile server needs Unix sockets")
+        return 1
+
+    path, jobs, idle_timeout, run_timeout, use_cache, error = parse_serve_args(args)
+    if error:
+        print("ERROR:", error)
+        return 1
+
+    if os.path.exists(path):
+        if server_running(path):
+            print("ERROR:", f"A laetus server is already running at {path}")
+            return 1
+        os.remove(path)
+
+    # Socket chỉ người chạy server dùng được
+    old_umask = os.umask(0o077)
+    try:
+        # Worker được fork: buffer stdout chưa ghi sẽ bị in lại bởi mỗi worker
+        sys.stdout.flush()
+        server = CompileServer(path, jobs, idle_timeout, use_cache, run_timeout)
+    finally:
+        os.umask(old_umask)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    print(f"laetus server listening on {path} ({server.jobs} workers)")
+    sys.stdout.flush()
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,352 @@
+import math
+from const import *
+from node import *
+
+# === AST SIMPLIFICATION (-ffold) ===
+# Chạy giữa parse() và infer_types(), trên từng scope (main và thân mỗi hàm):
+#
+#   gập hằng            2 * 3 + 1  ->  7     (đúng ngữ nghĩa codegen: i64 tràn vòng,
+#                                            chia nguyên cắt về 0, ^ qua pow rồi fptosi)
+#   lan truyền hằng     t = 4 ... a / t  ->  a / 4
+#   lan truyền bản sao  x = y ... x + 1  ->  y + 1   (tới khi x hoặc y bị gán lại)
+#   bỏ nhánh if chết    if 0 then ... else B end  ->  B
+#   bỏ phép gán chết    gán vào biến không bao giờ được đọc (vế phải không gọi hàm)
+#   bỏ code sau return
+#
+# Thông tin chỉ chảy qua code tuần tự: biến bị gán trong thân while / for bị quên
+# trước vòng lặp, sau if chỉ giữ những hằng giống nhau ở cả hai nhánh.
+# Phép tính mà codegen để lại cho runtime quyết định (chia cho 0, tràn khi chia,
+# kết quả inf / nan, toán hạng chuỗi) không bị gập.
+# Biến mà một FuncDef lồng bên trong có nhắc tới được giữ nguyên (pinned), vì thân
+# hàm lồng được sinh cùng lúc với scope bên ngoài và có thể đọc / ghi biến đó.
+
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+compare_ops = {
+    Operators.equals:       lambda a, b: a == b,
+    Operators.same:         lambda a, b: a == b,
+    Operators.different:    lambda a, b: a != b,
+    Operators.less:         lambda a, b: a < b,
+    Operators.greater:      lambda a, b: a > b,
+    Operators.less_same:    lambda a, b: a <= b,
+    Operators.greater_same: lambda a, b: a >= b,
+}
+
+
+def wrap(value):
+    """Số nguyên Python -> i64 (tràn vòng như add / sub / mul của LLVM)"""
+    return ((value - INT_MIN) & ((1 << 64) - 1)) + INT_MIN
+
+def c_pow(x, y):
+    """pow() của libm, None khi kết quả không hữu hạn"""
+    try:
+        result = math.pow(x, y)
+    except (ValueError, OverflowError):
+        return None
+    return result if math.isfinite(result) else None
+
+def fold_int(op, a, b):
+    if op == Operators.add: return wrap(a + b)
+    if op == Operators.subtract: return wrap(a - b)
+    if op == Operators.multiply: return wrap(a * b)
+    if op in (Operators.divide, Operators.remainder):
+        # sdiv / srem: chia cho 0 và INT_MIN / -1 là undefined behavior
+        if b == 0 or (a == INT_MIN and b == -1): return None
+        q = abs(a) // abs(b)
+        if (a < 0) != (b < 0): q = -q
+        return q if op == Operators.divide else a - b * q
+    if op == Operators.power:
+        result = c_pow(float(a), float(b))
+        if result is None or not INT_MIN <= result < -INT_MIN: return None
+        return int(result)
+    return None
+
+def fold_float(op, x, y):
+    if op == Operators.add: result = x + y
+    elif op == Operators.subtract: result = x - y
+    elif op == Operators.multiply: result = x * y
+    elif op == Operators.divide:
+        if y == 0: return None
+        result = x / y
+    elif op == Operators.remainder:
+        if y == 0: return None
+        result = math.fmod(x, y)
+    elif op == Operators.power:
+        return c_pow(x, y)
+    else:
+        return None
+    return result if math.isfinite(result) else None
+
+def fold(node: BinOp):
+    """Num nếu BinOp (hai vế là Num) tính được lúc dịch, ngược lại None"""
+    lhs, rhs = node.lhs, node.rhs
+    if not (INT_MIN <= lhs.value <= INT_MAX and INT_MIN <= rhs.value <= INT_MAX): return None
+
+    if not lhs.is_float and not rhs.is_float:
+        a, b = lhs.value, rhs.value
+        if node.op in compare_ops: return Num(int(compare_ops[node.op](a, b)), False, node.line)
+        result = fold_int(node.op, a, b)
+        return None if result is None else Num(result, False, node.line)
+
+    x, y = float(lhs.value), float(rhs.value)
+    if node.op in compare_ops: return Num(int(compare_ops[node.op](x, y)), False, node.line)
+    result = fold_float(node.op, x, y)
+    return None if result is None else Num(result, True, node.line)
+
+def truth(node):
+    """Giá trị của điều kiện hằng như visit_if: chỉ phần int khác 0 mới là đúng
+    (float và chuỗi có phần int bằng 0). None nếu không phải hằng"""
+    if isinstance(node, Num): return not node.is_float and node.value != 0
+    if isinstance(node, Str): return False
+    return None
+
+def has_call(node):
+    return any(type(n) is Call for n in walk([node]))
+
+def assigned_names(body):
+    """Biến bị ghi trong body (không tính FuncDef lồng)"""
+    names = set()
+    for n in walk(body):
+        if type(n) in (Assign, Input): names.add(n.name)
+        elif type(n) is For: names.add(n.var)
+    return names
+
+def pinned_names(body):
+    """Mọi tên biến xuất hiện trong các FuncDef lồng trong body"""
+    names = set()
+    for n in walk(body):
+        if type(n) is not FuncDef: continue
+        stack = [n]
+        while stack:
+            node = stack.pop()
+            if type(node) in (Var, Assign, Input): names.add(node.name)
+            elif type(node) is For: names.add(node.var)
+            elif type(node) is FuncDef: names.update(node.params)
+            stack.extend(node.children())
+    return names
+
+
+class Env:
+    """Biến -> Num / Str (hằng) hoặc Var (bản sao của biến khác)"""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def copy(self):
+        return Env(self.values)
+
+    def kill(self, name):
+        """name bị gán lại: quên giá trị của nó và các bản sao của nó"""
+        self.values.pop(name, None)
+        for other in [k for k, v in self.values.items() if type(v) is Var and v.name == name]:
+            del self.values[other]
+
+    def merge(self, other):
+        """Chỉ giữ các giá trị giống nhau ở cả hai nhánh"""
+        def same(a, b):
+            if type(a) is not type(b): return False
+            if type(a) is Num: return a.is_float == b.is_float and repr(a.value) == repr(b.value)
+            if type(a) is Str: return a.value == b.value
+            return a.name == b.name
+        self.values = {k: v for k, v in self.values.items() if k in other.values and same(v, other.values[k])}
+
+
+class Simplifier:
+    def __init__(self, pinned):
+        self.pinned = pinned
+
+    # ================= EXPRESSIONS =================
+
+    def expr(self, node, env: Env):
+        if node is None: return None
+        kind = type(node)
+
+        if kind is Var:
+            value = env.values.get(node.name)
+            if value is None: return node
+            # Node mới cho mỗi lần dùng, mang dòng của chỗ đọc biến
+            if type(value) is Num: return Num(value.value, value.is_float, node.line)
+            if type(value) is Str: return Str(value.value, node.line)
+            return Var(value.name, node.line)
+
+        if kind is BinOp:
+            node.lhs = self.expr(node.lhs, env)
+            node.rhs = self.expr(node.rhs, env)
+            if type(node.lhs) is Num and type(node.rhs) is Num:
+                return fold(node) or node
+            return node
+
+        if kind is Call:
+            node.args = [self.expr(arg, env) for arg in node.args]
+        return node
+
+    # ================= STATEMENTS =================
+
+    def body(self, stmts, env: Env):
+        """Danh sách câu lệnh đã rút gọn và việc body có chắc chắn kết thúc bằng return"""
+        result = []
+        any_returns = False
+        for stmt, returns in self.statements(stmts, env):
+            result.append(stmt)
+            any_returns = any_returns or returns
+        return result, any_returns
+
+    def statements(self, stmts, env: Env):
+        """Sinh lần lượt (câu lệnh, có return chắc chắn) của một danh sách câu lệnh.
+        Sau câu lệnh chắc chắn return chỉ còn giữ lại các FuncDef"""
+        done = False
+        for stmt in stmts:
+            if done:
+                if type(stmt) is FuncDef: yield self.function(stmt), False
+                continue
+            for new_stmt, returns in self.statement(stmt, env):
+                yield new_stmt, returns
+                if returns:
+                    done = True
+                    break
+
+    def statement(self, node, env: Env):
+        kind = type(node)
+
+        if kind is Assign:
+            node.value = self.expr(node.value, env)
+            env.kill(node.name)
+            if node.name not in self.pinned: self.remember(node, env)
+            yield node, False
+
+        elif kind is Input:
+            env.kill(node.name)
+            yield node, False
+
+        elif kind is Print:
+            node.args = [self.expr(arg, env) for arg in node.args]
+            yield node, False
+
+        elif kind is Call:
+            yield self.expr(node, env), False
+
+        elif kind is Return:
+            node.value = self.expr(node.value, env)
+            yield node, True
+
+        elif kind is If:
+            node.cond = self.expr(node.cond, env)
+            taken = truth(node.cond)
+            if taken is not None:
+                # Điều kiện hằng: chỉ còn nhánh được chọn, trải phẳng vào chỗ của if
+                branch = node.then_body if taken else (node.else_body or [])
+                yield from self.statements(branch, env)
+                return
+
+            else_env = env.copy()
+            node.then_body, then_returns = self.body(node.then_body, env)
+            else_returns = False
+            if node.else_body is not None:
+                node.else_body, else_returns = self.body(node.else_body, else_env)
+
+            # Nhánh đã return không đưa giá trị nào tới sau if
+            if then_returns and not else_returns: env.values = else_env.values
+            elif not then_returns and not else_returns: env.merge(else_env)
+            yield node, then_returns and else_returns
+
+        elif kind is While:
+            for name in assigned_names(node.body): env.kill(name)
+            node.cond = self.expr(node.cond, env)
+            if truth(node.cond) is False: return
+            node.body, _ = self.body(node.body, env.copy())
+            yield node, False
+
+        elif kind is For:
+            node.start = self.expr(node.start, env)
+            node.stop = self.expr(node.stop, env)
+            node.step = self.expr(node.step, env)
+            for name in assigned_names(node.body) | {node.var}: env.kill(name)
+            node.body, _ = self.body(node.body, env.copy())
+            yield node, False
+
+        elif kind is FuncDef:
+            yield self.function(node), False
+
+        else:
+            yield node, False
+
+    def remember(self, node: Assign, env: Env):
+        value = node.value
+        if type(value) is Num:
+            if node.type_name == "int" and value.is_float:
+                # int x = 2.5 lưu 2 (fptosi)
+                if not INT_MIN <= value.value < -INT_MIN: return
+                value = Num(int(value.value), False, value.line)
+            env.values[node.name] = value
+        elif node.type_name == "int":
+            return
+        elif type(value) is Str:
+            env.values[node.name] = value
+        elif type(value) is Var and value.name != node.name and value.name not in self.pinned:
+            env.values[node.name] = value
+
+    def function(self, node: FuncDef):
+        node.body = simplify_body(node.body)
+        return node
+
+    # ================= DEAD ASSIGNMENTS =================
+
+    def live(self, stmts, reads):
+        """Bỏ phép gán vào biến không được đọc ở đâu trong scope"""
+        for stmt in stmts:
+            kind = type(stmt)
+            if kind is Assign:
+                if (stmt.name in reads or stmt.name in self.pinned
+                        or stmt.value is None or has_call(stmt.value)):
+                    yield stmt
+            elif kind is If:
+                stmt.then_body = list(self.live(stmt.then_body, reads))
+                if stmt.else_body is not None:
+                    stmt.else_body = list(self.live(stmt.else_body, reads)) or None
+                if stmt.then_body or stmt.else_body or has_call(stmt.cond):
+                    yield stmt
+            elif kind in (While, For):
+                stmt.body = list(self.live(stmt.body, reads))
+                yield stmt
+            else:
+                yield stmt
+
+
+def read_counts(stmts):
+    reads = {}
+    for stmt in stmts:
+        for n in walk([stmt]):
+            if type(n) is Var: reads[n.name] = reads.get(n.name, 0) + 1
+    return reads
+
+def simplify_body(body, pinned=None):
+    simplifier = Simplifier(pinned_names(body) if pinned is None else pinned)
+    body, _ = simplifier.body(body, Env())
+    while True:
+        size = sum(1 for _ in walk(body))
+        body = list(simplifier.live(body, read_counts(body)))
+        if sum(1 for _ in walk(body)) == size: return body
+
+def simplify(root):
+    """Rút gọn Program hoặc NodeArena, trả về cây mới cùng loại"""
+    # FuncDef top-level được sinh trước main, không thấy biến của main
+    if not isinstance(root, NodeArena):
+        root.body = simplify_body(root.body, pinned_names([s for s in root.body if type(s) is not FuncDef]))
+        return root
+
+    # Arena: mỗi lượt chỉ dựng một câu lệnh top-level, đóng gói lại vào arena mới.
+    # Phép gán chết chỉ được bỏ một lượt
+    pinned = set()
+    for stmt in top_level(root, False): pinned |= pinned_names([stmt])
+    simplifier = Simplifier(pinned)
+    folded = NodeArena()
+    for stmt, _ in simplifier.statements(iter(root), Env()):
+        folded.add(stmt)
+
+    reads = read_counts(folded.statements(False))
+    result = NodeArena()
+    for stmt in folded:
+        for kept in simplifier.live([stmt], reads):
+            result.add(kept)
+    return result
@@ -0,0 +1,234 @@
+import ctypes
+import os
+from const import *
+from node import *
+from bytecode import Interpreter, Code
+from type_infer import MAX_SPECIALIZATIONS, clone_name
+from optimize import OptOptions
+from memo import MemoOptions
+
+# === TIERED EXECUTION (-jit-tiered) ===
+# Tier 1: chương trình chạy ngay trên bytecode interpreter (bytecode.py), chưa
+# import llvmlite. Tier 2: phần nóng được LLVMCodeGen biên dịch bằng MCJIT:
+#
+#   hàm nóng        hàm và mọi hàm nó gọi được biên dịch thành một module riêng,
+#                   bản chuyên biệt hóa theo kiểu đối số của lần gọi được ghi vào
+#                   bảng dispatch của hàm (Code.dispatch). Lời gọi sau đó từ
+#                   interpreter đi thẳng vào code native.
+#   vòng lặp nóng   (OSR) ở back edge của một vòng lặp top-level của main: giá trị
+#   của main        các biến hiện tại thành phép gán đầu chương trình, vòng lặp
+#                   (for tiếp tục từ giá trị kế tiếp của biến lặp) và phần còn lại
+#                   của main được biên dịch và chạy native tới hết chương trình.
+#
+# Hàm của tier 2 không thể gọi ngược về interpreter, nên chỉ những phần không
+# đọc input (runtime native có buffer stdin riêng), không gọi hàm chưa định nghĩa
+# và không có FuncDef lồng mới được biên dịch; phần còn lại luôn ở tier 1.
+# Mỗi module native có buffer output riêng: output của Python được flush trước
+# mỗi lần vào code native, buffer native được flush khi trở về.
+
+# Heat (back edge + CALL_WEIGHT mỗi lời gọi) để một hàm / vòng lặp được biên dịch.
+# Khoảng thời gian interpreter chạy bằng thời gian import llvmlite và biên dịch.
+HOT_THRESHOLD = 50_000
+
+python_types = {int: TYPE_INT, float: TYPE_FLOAT, str: TYPE_STR}
+ctypes_types = {TYPE_INT: ctypes.c_int64, TYPE_FLOAT: ctypes.c_double, TYPE_STR: ctypes.c_char_p}
+
+
+class VarStruct(ctypes.Structure):
+    """var_struct {i8, i64, double, i8*} trả về theo giá trị"""
+    _fields_ = [("tag", ctypes.c_int8), ("int", ctypes.c_int64), ("flt", ctypes.c_double), ("str", ctypes.c_char_p)]
+
+
+def from_c_string(value):
+    return None if value is None else value.decode("utf-8", errors="replace")
+
+def from_var_struct(value: VarStruct):
+    if value.tag == TYPE_INT: return value.int
+    if value.tag == TYPE_FLOAT: return value.flt
+    if value.tag == TYPE_STR: return from_c_string(value.str)
+    return None
+
+def add_struct_entry(module, name):
+    """Hàm trả về var_struct theo giá trị dùng quy ước gọi riêng của LLVM (nhiều
+    thanh ghi), không khớp với ctypes. Thêm hàm void name.entry(args..., var_struct*)
+    gọi hàm đó và ghi kết quả qua con trỏ."""
+    from llvmlite import ir
+
+    callee = module.get_global(name)
+    func_type = callee.function_type
+    params = list(func_type.args) + [func_type.return_type.as_pointer()]
+    entry = ir.Function(module, ir.FunctionType(ir.VoidType(), params), name + ".entry")
+    builder = ir.IRBuilder(entry.append_basic_block("entry"))
+    builder.store(builder.call(callee, entry.args[:-1]), entry.args[-1])
+    builder.ret_void()
+    return entry.name
+
+def struct_caller(func):
+    def call(*args):
+        result = VarStruct()
+        func(*args, ctypes.byref(result))
+        return result
+    return call
+
+def literal(value, line=0):
+    """Giá trị của interpreter -> node hằng, None nếu là TYPE_NONE"""
+    if type(value) is int: return Num(value, False, line)
+    if type(value) is float: return Num(value, True, line)
+    if type(value) is str: return Str(value, line)
+    return None
+
+
+class TieredRunner(Interpreter):
+    def __init__(self, program: Program, options: OptOptions = None, memo: MemoOptions = None,
+                 line_buffered=False, threshold=HOT_THRESHOLD):
+        super().__init__(program, line_buffered)
+        self.options = options or OptOptions()
+        self.memo = memo
+        self.threshold = threshold
+        # Engine phải sống tới hết chương trình vì bảng dispatch trỏ vào code của chúng
+        self.engines = []
+        # Chuỗi đã đưa sang code native (hàm memo dùng con trỏ chuỗi làm khóa)
+        self.c_strings = {}
+        self.osr_ready = {}
+
+    def hot_threshold(self, code: Code):
+        return self.threshold
+
+    # ================= TIER 2 =================
+
+    def closure(self, names):
+        """Các hàm được gọi (trực tiếp / gián tiếp) từ names, None nếu có hàm
+        không biên dịch riêng được"""
+        seen = {}
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in seen: continue
+            code = self.functions.get(name)
+            if code is None or not code.promotable or code.reads_input or code.nested: return None
+            seen[name] = code
+            stack.extend(code.callees)
+        return list(seen.values())
+
+    def emit(self, program: Program):
+        """LLVMCodeGen cho program, trả về (ir.Module, var_types)"""
+        from llvm_code_gen import emit_llvm
+        from type_infer import infer_types
+
+        var_types = infer_types(program)
+        return emit_llvm(program, var_types, self.line_buffered, self.memo), var_types
+
+    def load(self, module):
+        """Tối ưu và nạp module bằng MCJIT, trả về ExecutionEngine đã sẵn sàng"""
+        from llvmlite import binding
+        from llvm_code_gen import create_target_machine, to_binding_module
+        from optimize import run_passes
+
+        if os.name == 'nt':
+            binding.load_library_permanently("msvcrt.dll")
+        target_machine = create_target_machine(self.options.level)
+        llvm_module = run_passes(to_binding_module(module, target_machine), target_machine, self.options)
+        engine = binding.create_mcjit_compiler(llvm_module, target_machine)
+        engine.finalize_object()
+        self.engines.append(engine)
+        return engine
+
+    def promote(self, code: Code, args):
+        sig = tuple(python_types.get(type(arg)) for arg in args)
+        if None in sig or len(args) != len(code.param_regs) or len(code.dispatch) >= MAX_SPECIALIZATIONS:
+            return None
+
+        closure = self.closure([code.name])
+        if closure is None:
+            code.promotable = False
+            return None
+
+        # Lời gọi không bao giờ chạy chỉ để type_infer sinh đúng bản chuyên biệt hóa
+        dummy = [Num(0) if t == TYPE_INT else Num(0.0, True) if t == TYPE_FLOAT else Str("") for t in sig]
+        program = Program([c.def_node for c in closure] + [If(Num(0), [Call(code.name, dummy)])])
+        try:
+            module, var_types = self.emit(program)
+            spec = next(s for s in var_types.signatures[code.name] if s.params == sig)
+            ret = TYPE_DYN if spec.ret is None else spec.ret
+            entry = clone_name(code.name, sig)
+            if ret == TYPE_DYN: entry = add_struct_entry(module, entry)
+            engine = self.load(module)
+        except Exception:
+            code.promotable = False
+            return None
+
+        address = engine.get_function_address(entry)
+        if ret == TYPE_DYN:
+            func = struct_caller(ctypes.CFUNCTYPE(None, *[ctypes_types[t] for t in sig],
+                                                  ctypes.POINTER(VarStruct))(address))
+        else:
+            func = ctypes.CFUNCTYPE(ctypes_types[ret], *[ctypes_types[t] for t in sig])(address)
+
+        flush = None
+        if any(c.prints for c in closure):
+            flush = ctypes.CFUNCTYPE(None)(engine.get_function_address("laetus_flush"))
+
+        convert = from_var_struct if ret == TYPE_DYN else from_c_string if ret == TYPE_STR else None
+        has_str = TYPE_STR in sig
+        out = self.out
+        c_strings = self.c_strings
+
+        def native(*args):
+            if has_str:
+                args = [c_strings.setdefault(a, a.encode("utf-8")) if type(a) is str else a for a in args]
+            out.flush()
+            result = func(*args)
+            if flush is not None: flush()
+            return result if convert is None else convert(result)
+
+        code.dispatch[tuple(map(type, args))] = native
+        return native
+
+    def on_hot_loop(self, code: Code, index, regs, for_state):
+        functions = self.osr_ready.get(index, False)
+        if functions is False:
+            functions = self.osr_functions(index)
+            self.osr_ready[index] = functions
+        if functions is None: return False
+
+        inits = []
+        for name, reg in code.var_regs.items():
+            value = literal(regs[reg])
+            if value is not None: inits.append(Assign(name, value))
+
+        loop = code.statements[index]
+        if for_state is not None:
+            i, stop, step = for_state
+            loop = For(loop.var, Num(i), Num(stop), Num(step), loop.body, loop.line)
+
+        program = Program([c.def_node for c in functions] + inits + [loop] + code.statements[index + 1:])
+        try:
+            engine = self.load(self.emit(program)[0])
+        except Exception:
+            self.osr_ready[index] = None
+            return False
+
+        main = ctypes.CFUNCTYPE(ctypes.c_int32)(engine.get_function_address("main"))
+        self.out.flush()
+        main()
+        return True
+
+    def osr_functions(self, index):
+        """Các hàm mà phần main từ câu lệnh index trở đi cần, None nếu phần đó
+        không chạy native được"""
+        rest = self.main.statements[index:]
+        names = set()
+        for n in walk(rest):
+            if type(n) in (Input, FuncDef): return None
+            if type(n) is Call: names.add(n.name)
+        return self.closure(sorted(names))
+
+
+def run_tiered(program: Program, options: OptOptions = None, memo: MemoOptions = None,
+               line_buffered=False, dev=False):
+    runner = TieredRunner(program, options, memo, line_buffered)
+    if dev:
+        print(runner.main.dump())
+        for code in runner.functions.values():
+            print(code.dump())
+    return runner.run()
@@ -0,0 +1,316 @@
+from const import *
+from node import *
+
+# === TYPE INFERENCE ===
+# Chạy trên AST của parse() trước emit_llvm.
+# Mỗi biến nhận một kiểu trong lattice:
+#   None                          chưa thấy phép gán nào (bottom)
+#   TYPE_INT / TYPE_FLOAT / TYPE_STR  kiểu tĩnh, codegen dùng slot i64 / double / i8*
+#   TYPE_DYN                      kiểu đổi lúc runtime, giữ lại var_struct
+#
+# Hàm được chuyên biệt hóa theo kiểu đối số ở từng lời gọi: fib(x) được gọi với
+# một int sinh ra bản "fib.i64" nhận i64 và (nếu mọi nhánh đều return cùng một
+# kiểu tĩnh) trả về i64. Tham số TYPE_DYN vẫn là con trỏ tới var_struct; bản
+# toàn TYPE_DYN mang tên gốc của hàm và là bản dự phòng (boxed).
+# Kiểu trả về của các bản phụ thuộc lẫn nhau (đệ quy): khi kiểu trả về của một
+# bản thay đổi, các scope gọi nó được suy luận lại (worklist) tới khi hội tụ.
+
+MAIN_SCOPE = "main"
+
+# Số bản chuyên biệt hóa tối đa của một hàm, vượt quá thì lời gọi dùng bản boxed
+MAX_SPECIALIZATIONS = 8
+
+type_suffixes = {TYPE_INT: "i64", TYPE_FLOAT: "f64", TYPE_STR: "str", TYPE_DYN: "dyn"}
+
+compare_ops = compare_operators + [Operators.equals]
+
+
+def join(a, b):
+    if a is None: return b
+    if b is None: return a
+    if a == b: return a
+    return TYPE_DYN
+
+def arith(a, b):
+    if a == TYPE_DYN or b == TYPE_DYN: return TYPE_DYN
+    if a is None or b is None: return None
+    if a == TYPE_STR or b == TYPE_STR: return TYPE_DYN
+    if a == TYPE_INT and b == TYPE_INT: return TYPE_INT
+    return TYPE_FLOAT
+
+
+def clone_name(func_name, params):
+    """Tên LLVM của bản chuyên biệt hóa, bản toàn TYPE_DYN giữ tên gốc"""
+    if all(t == TYPE_DYN for t in params): return func_name
+    return ".".join([func_name] + [type_suffixes[t] for t in params])
+
+def always_returns(body):
+    """Mọi đường đi qua body đều gặp return"""
+    for stmt in body:
+        if isinstance(stmt, Return): return True
+        if (isinstance(stmt, If) and stmt.else_body is not None
+                and always_returns(stmt.then_body) and always_returns(stmt.else_body)):
+            return True
+    return False
+
+
+class Specialization:
+    """Một bản của hàm cho một bộ kiểu tham số"""
+    __slots__ = ("func", "name", "params", "ret", "callers")
+
+    def __init__(self, func: str, params: tuple):
+        self.func = func
+        self.name = clone_name(func, params)
+        self.params = params
+        # None khi chưa biết (đệ quy chưa hội tụ), TYPE_DYN trả về var_struct
+        self.ret = None
+        # Các scope đã dùng kiểu trả về này (None là main), dict để giữ thứ tự
+        self.callers = {}
+
+
+class Scopes(dict):
+    """Scope name (main hoặc tên bản chuyên biệt hóa) -> {variable_name: type}.
+    signatures: tên hàm -> [Specialization] theo thứ tự được tạo ra"""
+
+    def __init__(self):
+        super().__init__()
+        self.signatures = {}
+
+
+class TypeInfer:
+    def __init__(self):
+        self.scopes = Scopes()
+
+        # Tên hàm -> FuncDef, (tên hàm, kiểu tham số) -> Specialization
+        self.functions = {}
+        self.specs = {}
+        self.spec_list = []
+        self.spec_count = {}
+
+        # Scope cần suy luận lại (None là main, còn lại là Specialization).
+        # Dùng như stack: bản vừa được tạo ra được xét trước bên gọi nó
+        self.worklist = []
+        self.queued = set()
+        self.current = None
+        self.main_body = None
+
+        # Trạng thái của scope đang xét
+        self.types = {}
+        self.assigned = set()
+        self.ret = None
+        self.changed = False
+
+        # Vòng cuối: biến còn ở bottom được coi là TYPE_DYN
+        self.final = False
+
+    def run(self, root):
+        self.main_body = lambda: top_level(root, False)
+        for def_node in top_level(root, True):
+            self.functions[def_node.name] = def_node
+
+        for final in (False, True):
+            self.final = final
+            self.solve()
+
+        self.scopes.signatures = {name: [] for name in self.functions}
+        for spec in self.spec_list:
+            self.scopes.signatures[spec.func].append(spec)
+        return self.scopes
+
+    def solve(self):
+        for scope in reversed([None] + self.spec_list): self.push(scope)
+
+        while self.worklist:
+            while self.worklist:
+                scope = self.worklist.pop()
+                self.queued.discard(scope)
+                self.current = scope
+                if scope is None:
+                    self.infer_scope(MAIN_SCOPE, self.main_body, {})
+                else:
+                    self.infer_function(scope)
+
+            # Hàm không được gọi ở đâu vẫn được biên dịch (bản boxed)
+            for name, def_node in list(self.functions.items()):
+                if name not in self.spec_count:
+                    self.specialize(name, (TYPE_DYN,) * len(def_node.params))
+
+    def push(self, scope):
+        if scope not in self.queued:
+            self.queued.add(scope)
+            self.worklist.append(scope)
+
+    def define(self, def_node: FuncDef):
+        if def_node.name in self.functions: return
+        self.functions[def_node.name] = def_node
+        # Lời gọi tới hàm này trước đó được coi là hàm chưa định nghĩa
+        for scope in [None] + self.spec_list: self.push(scope)
+
+    def specialize(self, func_name, params):
+        key = (func_name, params)
+        spec = self.specs.get(key)
+        if spec is not None: return spec
+
+        if self.spec_count.get(func_name, 0) >= MAX_SPECIALIZATIONS:
+            boxed = (TYPE_DYN,) * len(params)
+            if params != boxed: return self.specialize(func_name, boxed)
+
+        spec = Specialization(func_name, params)
+        self.specs[key] = spec
+        self.spec_list.append(spec)
+        self.spec_count[func_name] = self.spec_count.get(func_name, 0) + 1
+        self.push(spec)
+        return spec
+
+    def infer_function(self, spec: Specialization):
+        def_node = self.functions[spec.func]
+        params = dict(zip(def_node.params, spec.params))
+        ret = self.infer_scope(spec.name, lambda: def_node.body, params)
+
+        if not always_returns(def_node.body):
+            # Rơi khỏi cuối hàm trả về giá trị TYPE_NONE
+            ret = TYPE_DYN
+        if ret != spec.ret:
+            spec.ret = ret
+            for caller in spec.callers: self.push(caller)
+
+    def infer_scope(self, name, get_body, params):
+        """get_body() trả về các câu lệnh của scope; được gọi lại ở mỗi vòng lặp
+        để chế độ arena không phải giữ cả scope dưới dạng object.
+        Trả về kiểu trả về của scope"""
+        self.types = dict(params)
+        self.assigned = set(params)
+        self.ret = None
+
+        for stmt in get_body(): self.collect_assigned(stmt)
+
+        self.fixpoint(get_body)
+
+        if self.final:
+            # Biến còn ở bottom chỉ được gán từ chính nó -> không chứng minh được
+            for var in self.assigned:
+                if self.types.get(var) is None:
+                    self.types[var] = TYPE_DYN
+            # Lời gọi có đối số vừa thành TYPE_DYN
+            self.fixpoint(get_body)
+
+        self.scopes[name] = self.types
+        return self.ret
+
+    def fixpoint(self, get_body):
+        # Lặp tới điểm bất động: kiểu của một biến có thể phụ thuộc vào biến khác
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for stmt in get_body(): self.visit(stmt)
+
+    # ================= STATEMENTS =================
+
+    def collect_assigned(self, node: Node):
+        if isinstance(node, FuncDef):
+            # FuncDef lồng trong câu lệnh khác
+            self.define(node)
+            return
+
+        if isinstance(node, Assign) or isinstance(node, Input):
+            self.assigned.add(node.name)
+        elif isinstance(node, For):
+            self.assigned.add(node.var)
+
+        for child in node.children(): self.collect_assigned(child)
+
+    def set_type(self, var, typ):
+        new_type = join(self.types.get(var), typ)
+        if new_type != self.types.get(var):
+            self.types[var] = new_type
+            self.changed = True
+
+    def visit(self, node: Node):
+        kind = type(node)
+
+        if kind is Assign:
+            self.visit_assignment(node)
+        elif kind is Input:
+            self.visit_input(node)
+        elif kind is For:
+            self.visit_for(node)
+        elif kind is If:
+            self.expr_type(node.cond)
+            for stmt in node.then_body: self.visit(stmt)
+            for stmt in node.else_body or []: self.visit(stmt)
+        elif kind is While:
+            self.expr_type(node.cond)
+            for stmt in node.body: self.visit(stmt)
+        elif kind is Return:
+            self.visit_return(node)
+        elif kind is Print:
+            # Chỉ để ghi nhận các lời gọi hàm (bản chuyên biệt hóa) trong biểu thức
+            for arg in node.args: self.expr_type(arg)
+        elif kind is Call:
+            self.expr_type(node)
+
+    def visit_assignment(self, node: Assign):
+        if node.value is None: return
+
+        if node.type_name == "int":
+            self.set_type(node.name, TYPE_INT)
+        else:
+            self.set_type(node.name, self.expr_type(node.value))
+
+    def visit_return(self, node: Return):
+        new_ret = join(self.ret, self.expr_type(node.value))
+        if new_ret != self.ret:
+            self.ret = new_ret
+            self.changed = True
+
+    def visit_input(self, node: Input):
+        if node.type_name == "int": self.set_type(node.name, TYPE_INT)
+        elif node.type_name == "float": self.set_type(node.name, TYPE_FLOAT)
+        elif node.type_name == "str": self.set_type(node.name, TYPE_STR)
+
+    def visit_for(self, node: For):
+        # Biến lặp luôn được ghi dưới dạng int (giá trị đầu và bước nhảy)
+        self.set_type(node.var, TYPE_INT)
+        for expr in (node.start, node.stop, node.step): self.expr_type(expr)
+
+        for stmt in node.body: self.visit(stmt)
+
+    # ================= EXPRESSIONS =================
+
+    def expr_type(self, node: Node):
+        kind = type(node)
+
+        if kind is Num:
+            return TYPE_FLOAT if node.is_float else TYPE_INT
+        if kind is Str:
+            return TYPE_STR
+        if kind is Call:
+            return self.call_type(node)
+        if kind is Var:
+            # Biến chưa từng được gán đọc ra int 0 (xem visit_variable_load)
+            if node.name not in self.assigned: return TYPE_INT
+            return self.types.get(node.name)
+        if kind is BinOp:
+            lhs = self.expr_type(node.lhs)
+            rhs = self.expr_type(node.rhs)
+            if node.op in compare_ops:
+                return TYPE_INT
+            return arith(lhs, rhs)
+
+        # Codegen coi mọi giá trị không xác định là int 0 (xem _extract_val)
+        return TYPE_INT
+
+    def call_type(self, node: Call):
+        def_node = self.functions.get(node.name)
+        # Hàm chưa định nghĩa: codegen báo lỗi và dùng int 0
+        if def_node is None: return TYPE_INT
+
+        params = tuple(self.expr_type(arg) for arg in node.args)
+        if None in params or len(params) != len(def_node.params): return None
+        spec = self.specialize(node.name, params)
+        spec.callers[self.current] = True
+        return spec.ret
+
+
+def infer_types(ast):
+    return TypeInfer().run(ast)
@@ -0,0 +1,65 @@
+import subprocess
+import tempfile
+import socket
+import time
+import sys
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+MAIN = os.path.join(ROOT, "src", "main.py")
+CLIENT = os.path.join(ROOT, "src", "client.py")
+PRIMES = os.path.join(ROOT, "benchmarks", "18-jan-26-benchmarks", "3_primes.lae")
+
+# Đệ quy không có điểm dừng: tràn stack, process chết vì SIGSEGV
+CRASH = """func f(x)
+    return f(x+1) + 1
+end
+println f(1)
+"""
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="laetus serve needs Unix sockets")
+
+
+@pytest.fixture
+def server():
+    with tempfile.TemporaryDirectory(prefix="laetus_test_") as directory:
+        path = os.path.join(directory, "laetus.sock")
+        process = subprocess.Popen([sys.executable, MAIN, "serve", "-socket", path, "-j", "2",
+                                    "-idle-timeout=0", "-run-timeout=20", "-no-cache"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 60
+        while not os.path.exists(path):
+            assert process.poll() is None, "laetus serve exited"
+            assert time.monotonic() < deadline, "laetus serve did not start"
+            time.sleep(0.1)
+        try:
+            yield path, directory
+        finally:
+            client(path, "-stop")
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+def client(path, *args):
+    return subprocess.run([sys.executable, CLIENT, *args, "-socket", path], stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_crashing_program_does_not_break_the_server(server):
+    path, directory = server
+    crash = os.path.join(directory, "crash.lae")
+    with open(crash, "w") as f:
+        f.write(CRASH)
+
+    result = client(path, crash, "-jit", "-O0")
+    assert result.returncode != 0
+    assert "killed by signal" in result.stdout
+
+    # Cả hai worker vẫn dùng được sau khi chương trình crash
+    for _ in range(2):
+        result = client(path, PRIMES, "-jit")
+        assert result.returncode == 0
+        assert result.stdout == "1229\n"
@@ -0,0 +1,93 @@
+import subprocess
+import tempfile
+import glob
+import sys
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+MAIN = os.path.join(ROOT, "src", "main.py")
+BENCHMARKS = sorted(glob.glob(os.path.join(ROOT, "benchmarks", "18-jan-26-benchmarks", "*.lae")))
+
+# -jit-tiered phải in ra đúng như -jit. Các vòng lặp quanh HOT_THRESHOLD (50000):
+# heat của main đạt ngưỡng ở back edge thứ 50000, nên vòng for 49999 lần chạy
+# hết trên interpreter (OSR ở vòng while sau đó), 50000 lần vào native đúng lúc
+# vòng lặp kết thúc, 50001 lần còn đúng một lần lặp chạy native.
+OSR_LOOP = """s = 0
+for i = 1, {n}, 1 do
+    s = s + i * 3 - 1
+end
+println s
+println i
+j = 0
+while j < {n} do
+    j = j + 1
+end
+println j
+"""
+
+# Biến đổi kiểu sau khi vòng lặp đã nóng
+TYPE_CHANGE = """x = 0
+for i = 1, 100000, 1 do
+    if i == 60000 then
+        x = 0.5
+    end
+    x = x + 1
+end
+println x
+y = 1
+k = 0
+while k < 100000 do
+    if k == 70000 then y = "str" end
+    k = k + 1
+end
+println y
+"""
+
+# Input sau vòng lặp nóng: phần còn lại của main đọc stdin
+INPUT_AFTER_OSR = """s = 0
+for i = 1, 100000, 1 do
+    s = s + i
+end
+println s
+input int n "n? "
+input float f
+input str t
+println n + s
+println f * 2
+println t
+"""
+STDIN = "7\n2.5\nhello\n"
+
+
+def run(path, *flags, stdin=""):
+    # -jit ghi a.exe vào thư mục hiện tại
+    with tempfile.TemporaryDirectory(prefix="laetus_test_") as directory:
+        result = subprocess.run([sys.executable, MAIN, path, *flags], cwd=directory, input=stdin,
+                                capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+def check_same(path, stdin=""):
+    assert run(path, "-jit-tiered", stdin=stdin) == run(path, "-jit", "-no-cache", stdin=stdin)
+
+def write(directory, source):
+    path = os.path.join(directory, "program.lae")
+    with open(path, "w") as f:
+        f.write(source)
+    return path
+
+
+@pytest.mark.parametrize("path", BENCHMARKS, ids=os.path.basename)
+def test_benchmark(path):
+    check_same(path)
+
+@pytest.mark.parametrize("n", [49999, 50000, 50001])
+def test_osr_boundary(tmp_path, n):
+    check_same(write(tmp_path, OSR_LOOP.format(n=n)))
+
+def test_type_change_in_hot_loop(tmp_path):
+    check_same(write(tmp_path, TYPE_CHANGE))
+
+def test_input_after_osr(tmp_path):
+    check_same(write(tmp_path, INPUT_AFTER_OSR), STDIN)